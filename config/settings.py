@@ -13,18 +13,116 @@ PROCESSED_DATA_DIR = DATA_DIR / "processed"
 EXTERNAL_DATA_DIR = DATA_DIR / "external"
 
 # Modèles
-MODELS_DIR = PROCESSED_DATA_DIR / "models" # SRC_DIR / "models/trained"
+MODELS_DIR = Path(os.environ.get("MODELS_DIR", PROCESSED_DATA_DIR / "models")) # SRC_DIR / "models/trained"
 
 TEMP_DIR = Path(os.environ.get("TEMP_DIR", "/tmp/cats_dogs"))
 
+# Préparation des données dans TEMP_DIR: hardlink, reflink, symlink ou copy
+DATA_STAGING_MODE = os.environ.get("DATA_STAGING_MODE", "hardlink")
+
+# Shards pré-décodés (images uint8 redimensionnées) pour l'entraînement
+SHARDS_DIR = Path(os.environ.get("SHARDS_DIR", PROCESSED_DATA_DIR / "shards"))
+
+# Dataset NumPy mappé en mémoire (images uint8 (N, H, W, 3) + labels)
+MMAP_DATASET_DIR = Path(os.environ.get("MMAP_DATASET_DIR", PROCESSED_DATA_DIR / "mmap"))
+
+# Cache tf.data sur disque (backend "directory"), conservé entre les entraînements.
+# TF_CACHE_DIR="" revient au cache en mémoire.
+TF_CACHE_DIR = os.environ.get("TF_CACHE_DIR", str(TEMP_DIR / "tf_cache"))
+TF_CACHE_DIR = Path(TF_CACHE_DIR) if TF_CACHE_DIR else None
+
+# Embeddings du tronc convolutif (ré-entraînement de la tête seule), par version du tronc
+FEATURES_DIR = Path(os.environ.get("FEATURES_DIR", PROCESSED_DATA_DIR / "features"))
+
+# Checkpoints complets (poids + optimiseur + position) pour reprendre un entraînement interrompu
+CHECKPOINT_DIR = Path(os.environ.get("CHECKPOINT_DIR", TEMP_DIR / "checkpoints"))
+
+# Images envoyées à l'API (stockage adressé par contenu, optionnel)
+IMAGE_STORE_CONFIG = {
+    "enabled": os.environ.get("STORE_UPLOADS", "false").lower() == "true",
+    "root": Path(os.environ.get("FEEDBACK_IMAGES_DIR", PROCESSED_DATA_DIR / "feedback_images")),
+    "downscale": os.environ.get("STORE_UPLOADS_DOWNSCALE", "true").lower() == "true",
+}
+
 # Configuration du modèle
 MODEL_CONFIG = {
     "image_size": (128, 128), # Optimized for speed-up
+    # Filtres des blocs Conv2D + MaxPooling (voir scripts/hparam_search.py)
+    "conv_widths": (32, 64, 128),
     "batch_size": 64,
     "epochs": 3, #10, # Optimized for speed-up
     "learning_rate": 0.001,
+    # Source des données d'entraînement: "directory" (JPEG), "shards" (TFRecord
+    # pré-décodés) ou "mmap" (tableau NumPy mappé en mémoire)
+    "input_backend": os.environ.get("INPUT_BACKEND", "directory"),
+    # Augmentation: "model" (couches dans le graphe) ou "pipeline" (tf.data, workers CPU)
+    "augmentation": os.environ.get("AUGMENTATION_MODE", "model"),
+    "seed": 1337,
+    # Checkpoint de reprise tous les N steps (en plus de chaque fin d'epoch), 0 = epochs seulement
+    "checkpoint_steps": int(os.environ.get("CHECKPOINT_STEPS", 100)),
+    # Ré-entraînement de la tête seule sur les embeddings en cache
+    "head_epochs": int(os.environ.get("HEAD_EPOCHS", 20)),
+    "head_batch_size": 256,
+    # Distribution: "none" ou "multi_worker" (MultiWorkerMirroredStrategy, via TF_CONFIG);
+    # batch_size est alors la taille de lot par worker
+    "distribute": os.environ.get("DISTRIBUTE_STRATEGY", "none"),
+    # Données déjà préparées par le lanceur (scripts/train_distributed.py): les
+    # workers les lisent sans staging, nettoyage ni conversion
+    "data_prepared": os.environ.get("DATA_PREPARED", "false").lower() == "true",
+    # Précision de calcul (entraînement et API): "float32" ou "mixed_bfloat16"
+    # (repli sur float32 si le CPU n'a ni AVX512_BF16 ni AMX)
+    "precision": os.environ.get("MODEL_PRECISION", "float32"),
+}
+
+# Ré-entraînement incrémental: nouveaux feedbacks + rejeu d'un échantillon du dataset de base
+INCREMENTAL_CONFIG = {
+    "replay_size": int(os.environ.get("INCREMENTAL_REPLAY_SIZE", 2000)),
+    "epochs": int(os.environ.get("INCREMENTAL_EPOCHS", 2)),
+    # Identifiants des feedbacks déjà intégrés au modèle en production
+    "state_path": MODELS_DIR / "incremental_state.json",
+}
+
+# Distillation: modèle élève étroit (convolutions séparables) entraîné sur les scores du modèle en production
+DISTILL_CONFIG = {
+    # Largeur de chaque bloc: une convolution d'entrée (pas de 2), puis des blocs séparables
+    "widths": tuple(int(w) for w in os.environ.get("DISTILL_WIDTHS", "16,32,64").split(",")),
+    "separable": os.environ.get("DISTILL_SEPARABLE", "true").lower() == "true",
+    "epochs": int(os.environ.get("DISTILL_EPOCHS", 10)),
+    # Température appliquée aux logits du maître et de l'élève, poids des labels réels
+    "temperature": float(os.environ.get("DISTILL_TEMPERATURE", 2.0)),
+    "alpha": float(os.environ.get("DISTILL_ALPHA", 0.3)),
+    # Scores du maître sur le dataset, calculés une seule fois par (maître, dataset)
+    "cache_dir": Path(os.environ.get("DISTILL_CACHE_DIR", PROCESSED_DATA_DIR / "distillation")),
+}
+
+# Élagage par magnitude (affinage du modèle en production, export .keras.gz)
+PRUNING_CONFIG = {
+    "sparsities": tuple(float(x) for x in os.environ.get("PRUNING_SPARSITIES", "0.5,0.75,0.9").split(",")),
+    "epochs": int(os.environ.get("PRUNING_EPOCHS", 2)),
+    "learning_rate": float(os.environ.get("PRUNING_LEARNING_RATE", 0.0001)),
+    # Recalcul des masques tous les N steps; cible atteinte à end_fraction des steps
+    "frequency": 10,
+    "end_fraction": 0.7,
+    "output_dir": MODELS_DIR / "pruned",
 }
 
+# Recherche d'hyperparamètres (scripts/hparam_search.py): grille entraînée en parallèle sur un sous-échantillon
+SEARCH_CONFIG = {
+    "image_sizes": ((96, 96), (128, 128), (160, 160)),
+    "conv_widths": ((16, 32, 64), (32, 64, 128)),
+    "batch_sizes": (32, 64),
+    "epochs": int(os.environ.get("SEARCH_EPOCHS", 3)),
+    "subsample": float(os.environ.get("SEARCH_SUBSAMPLE", 0.2)),
+    "workers": int(os.environ.get("SEARCH_WORKERS", max(1, (os.cpu_count() or 1) // 2))),
+    "output_dir": Path(os.environ.get("SEARCH_DIR", TEMP_DIR / "hparam_search")),
+}
+
+# Registre des modèles adressé par contenu (fichiers par hash + index.jsonl)
+REGISTRY_DIR = Path(os.environ.get("MODEL_REGISTRY_DIR", MODELS_DIR / "registry"))
+
+# Évaluations du modèle en production, par (hash du modèle, jeu de validation)
+EVAL_CACHE_PATH = MODELS_DIR / "eval_cache.json"
+
 # Configuration API
 API_CONFIG = {
     "host": "127.0.0.1",
@@ -33,6 +131,24 @@ API_CONFIG = {
     "model_path": MODELS_DIR / "cats_dogs_model.keras",
 }
 
+# Évaluation en ombre d'un modèle candidat sur le trafic réel (hors chemin critique).
+# SHADOW_MODEL_PATH vide: dernier modèle ré-entraîné du registre non mis en production.
+SHADOW_CONFIG = {
+    "enabled": os.environ.get("SHADOW_ENABLED", "false").lower() == "true",
+    "model_path": os.environ.get("SHADOW_MODEL_PATH", ""),
+    "sample_rate": float(os.environ.get("SHADOW_SAMPLE_RATE", 0.1)),
+    "max_workers": int(os.environ.get("SHADOW_WORKERS", 1)),
+    # Requêtes en attente au-delà desquelles les échantillons sont abandonnés
+    "max_pending": int(os.environ.get("SHADOW_MAX_PENDING", 32)),
+    "log_path": PROCESSED_DATA_DIR / "monitoring_shadow.csv",
+}
+
+# Routage canari: CANARY_PERCENT % des requêtes /api/predict servies par CANARY_MODEL_PATH
+CANARY_CONFIG = {
+    "model_path": os.environ.get("CANARY_MODEL_PATH", ""),
+    "percent": float(os.environ.get("CANARY_PERCENT", 0)),
+}
+
 # Configuration Base de Données (PostgreSQL)
 DB_CONFIG = {
     "host": os.environ.get("DB_HOST", "localhost"),
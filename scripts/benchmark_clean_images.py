@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark du nettoyage des images corrompues (clean_corrupted_images).
+
+Génère un répertoire synthétique Cat/Dog contenant quelques milliers
+d'images (dont une fraction corrompue), puis mesure la durée du nettoyage
+pour plusieurs nombres de processus. Chaque mesure part d'une copie
+fraîche du répertoire, et l'on vérifie que l'ensemble des fichiers
+supprimés est identique quel que soit le nombre de processus.
+
+Une dernière mesure compare un premier passage avec manifeste de
+validation à un second passage sur le même répertoire inchangé.
+
+Usage:
+    python scripts/benchmark_clean_images.py [--images 4000] [--workers 1 2 4 8]
+"""
+
+import sys
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.data.preprocessing import clean_corrupted_images
+
+
+def build_synthetic_dataset(root: Path, num_images: int, corrupted_rate: float, size: int) -> int:
+    """Crée num_images JPEG aléatoires répartis entre Cat et Dog; retourne le nombre corrompu."""
+    rng = random.Random(1337)
+    num_corrupted = 0
+    for i in range(num_images):
+        folder = root / ("Cat" if i % 2 == 0 else "Dog")
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{i}.jpg"
+
+        if rng.random() < corrupted_rate:
+            # Alternance entre fichier illisible et en-tête JPEG sans JFIF/Exif
+            num_corrupted += 1
+            if i % 2 == 0:
+                path.write_bytes(os.urandom(2048))
+            else:
+                path.write_bytes(b"\xff\xd8\xff\xdb" + os.urandom(2048))
+            continue
+
+        pixels = np.random.RandomState(i).randint(0, 255, (size, size, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(path, format="JPEG", quality=85)
+
+    return num_corrupted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de clean_corrupted_images")
+    parser.add_argument("--images", type=int, default=4000, help="Nombre d'images synthétiques (défaut: 4000)")
+    parser.add_argument("--corrupted-rate", type=float, default=0.02, help="Proportion d'images corrompues (défaut: 0.02)")
+    parser.add_argument("--size", type=int, default=320, help="Côté des images en pixels (défaut: 320)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Taille des lots de vérification (défaut: 256)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help="Nombres de processus à mesurer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="clean_bench_") as tmp:
+        source = Path(tmp) / "source"
+        print(f"Génération de {args.images} images synthétiques...")
+        expected = build_synthetic_dataset(source, args.images, args.corrupted_rate, args.size)
+        print(f"Images corrompues attendues: {expected}")
+
+        results = []
+        reference = None
+        for workers in args.workers:
+            work_dir = Path(tmp) / f"run_{workers}"
+            shutil.copytree(source, work_dir)
+            before = {p.relative_to(work_dir) for p in work_dir.rglob("*.jpg")}
+
+            start = time.perf_counter()
+            removed = clean_corrupted_images(work_dir, workers=workers, chunk_size=args.chunk_size,
+                                             use_manifest=False)
+            elapsed = time.perf_counter() - start
+
+            deleted = before - {p.relative_to(work_dir) for p in work_dir.rglob("*.jpg")}
+            if reference is None:
+                reference = deleted
+            results.append((workers, elapsed, removed, deleted == reference))
+            shutil.rmtree(work_dir)
+
+        # Manifeste: premier passage (tout est vérifié) puis second passage sans changement
+        work_dir = Path(tmp) / "run_manifest"
+        shutil.copytree(source, work_dir)
+        manifest_times = []
+        for _ in range(2):
+            start = time.perf_counter()
+            clean_corrupted_images(work_dir, workers=max(args.workers), chunk_size=args.chunk_size)
+            manifest_times.append(time.perf_counter() - start)
+
+    baseline = results[0][1]
+    print("\n=== RÉSULTATS ===")
+    print(f"{'processus':>10} {'durée (s)':>10} {'images/s':>10} {'accélération':>13} {'supprimées':>11} {'identique':>10}")
+    for workers, elapsed, removed, same in results:
+        print(f"{workers:>10} {elapsed:>10.2f} {args.images / elapsed:>10.0f} "
+              f"{baseline / elapsed:>12.2f}x {removed:>11} {'oui' if same else 'NON':>10}")
+    print(f"\nAvec manifeste: 1er passage {manifest_times[0]:.2f}s, "
+          f"2e passage (inchangé) {manifest_times[1]:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Comparaison float32 / mixed_bfloat16 sur CPU.
+
+Inférence: le modèle en production est converti dans chaque précision
+(comme le fait le CatDogPredictor), puis mesuré en débit (images/s par
+lots), en latence d'une image et en précision de validation, avec le taux
+d'accord des prédictions bfloat16 avec celles du float32.
+
+Entraînement (--train-epochs N): un modèle est entraîné N epochs dans
+chaque précision, même graine; le débit est celui des epochs suivant la
+première (compilation du graphe exclue).
+
+Sur un CPU sans AVX512_BF16 ni AMX, seule la référence float32 est
+mesurée. Le rapport est écrit dans precision_benchmark_*.json.
+
+Usage:
+    python scripts/benchmark_precision.py [--batch-size 64] [--runs 20] [--train-epochs 2]
+"""
+
+import sys
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG
+from src.models.distillation import measure_latency
+from src.models.precision import PRECISIONS, apply_precision, cpu_supports_bfloat16
+from src.models.trainer import CatDogTrainer
+
+
+def batch_throughput(model, image_size, batch_size: int, runs: int, warmup: int = 3) -> float:
+    """Débit d'inférence (images/s) sur des lots de batch_size images."""
+    images = np.random.default_rng(0).integers(0, 256, (batch_size, *image_size, 3)).astype(np.float32)
+    for _ in range(warmup):
+        model(images, training=False)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(images, training=False)
+        timings.append(time.perf_counter() - start)
+    return round(batch_size / float(np.median(timings)), 1)
+
+
+def evaluate(models: dict, val_ds) -> dict:
+    """Précision de validation de chaque modèle et accord de ses prédictions avec le float32."""
+    correct = {precision: 0 for precision in models}
+    agree = {precision: 0 for precision in models}
+    max_diff = {precision: 0.0 for precision in models}
+    total = 0
+    for images, labels in val_ds:
+        labels = labels.numpy().ravel()
+        reference = models["float32"](images, training=False).numpy().ravel()
+        for precision, model in models.items():
+            scores = reference if precision == "float32" else model(images, training=False).numpy().ravel()
+            correct[precision] += int(np.sum((scores > 0.5) == (labels == 1)))
+            agree[precision] += int(np.sum((scores > 0.5) == (reference > 0.5)))
+            max_diff[precision] = max(max_diff[precision], float(np.max(np.abs(scores - reference))))
+        total += len(labels)
+    return {
+        precision: {
+            "val_accuracy": round(correct[precision] / total, 4) if total else None,
+            "agreement": round(agree[precision] / total, 4) if total else None,
+            "max_score_diff": round(max_diff[precision], 5),
+        }
+        for precision in models
+    }
+
+
+def train_benchmark(precision: str, epochs: int) -> dict:
+    """Entraîne un modèle dans la précision donnée; débit mesuré hors première epoch."""
+    trainer = CatDogTrainer(precision=precision, epochs=epochs)
+    tf.keras.utils.set_random_seed(trainer.config["seed"])
+    train_ds, val_ds = trainer.prepare_data()
+    model = trainer.create_model()
+
+    epoch_times = []
+    timer = tf.keras.callbacks.LambdaCallback(
+        on_epoch_begin=lambda epoch, logs: epoch_times.append(time.perf_counter()),
+        on_epoch_end=lambda epoch, logs: epoch_times.__setitem__(-1, time.perf_counter() - epoch_times[-1]),
+    )
+    history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=[timer], verbose=2)
+
+    steady = epoch_times[1:] or epoch_times
+    steps = int(train_ds.cardinality())
+    return {
+        "epoch_seconds": [round(seconds, 2) for seconds in epoch_times],
+        "images_per_second": round(steps * trainer.batch_size / float(np.median(steady)), 1) if steps > 0 else None,
+        "val_accuracy": round(float(history.history["val_accuracy"][-1]), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison float32 / mixed_bfloat16 (débit et précision)")
+    parser.add_argument("--model", type=Path, default=None,
+                        help="Modèle à évaluer (défaut: modèle en production)")
+    parser.add_argument("--batch-size", type=int, default=MODEL_CONFIG["batch_size"],
+                        help=f"Taille des lots pour le débit d'inférence (défaut: {MODEL_CONFIG['batch_size']})")
+    parser.add_argument("--runs", type=int, default=20,
+                        help="Lots mesurés par précision (défaut: 20)")
+    parser.add_argument("--train-epochs", type=int, default=0,
+                        help="Mesurer aussi l'entraînement sur N epochs (défaut: 0, inférence seule)")
+    args = parser.parse_args()
+
+    supported = cpu_supports_bfloat16()
+    precisions = PRECISIONS if supported else ("float32",)
+    if not supported:
+        print("bfloat16 non pris en charge par ce CPU (ni AVX512_BF16 ni AMX): référence float32 seule")
+
+    trainer = CatDogTrainer(precision="float32")
+    model_path = args.model or trainer.models_dir / "cats_dogs_model.keras"
+    if not model_path.exists():
+        print(f"Aucun modèle à évaluer: {model_path} (entraîner d'abord le modèle complet)")
+        sys.exit(1)
+
+    image_size = trainer.config["image_size"]
+    model = tf.keras.models.load_model(model_path)
+    models = {precision: apply_precision(model, precision) for precision in precisions}
+
+    _, val_ds = trainer.prepare_data()
+    accuracy = evaluate(models, val_ds)
+    inference = {}
+    for precision, precision_model in models.items():
+        print(f"Mesure de l'inférence en {precision}...")
+        inference[precision] = {
+            "images_per_second": batch_throughput(precision_model, image_size, args.batch_size, args.runs),
+            **measure_latency(precision_model, image_size),
+            **accuracy[precision],
+        }
+
+    training = {}
+    for precision in precisions if args.train_epochs else ():
+        print(f"\n=== Entraînement en {precision} ===")
+        training[precision] = train_benchmark(precision, args.train_epochs)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "model_path": str(model_path),
+        "bfloat16_supported": supported,
+        "batch_size": args.batch_size,
+        "inference": inference,
+        "training": training,
+    }
+    report_path = trainer.models_dir / f"precision_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== INFÉRENCE ===")
+    print(f"{'précision':>15} {'images/s':>9} {'latence':>9} {'val_acc':>8} {'accord':>7}")
+    for precision, result in inference.items():
+        print(f"{precision:>15} {result['images_per_second']:>9.1f} {result['call_p50_ms']:>7.2f}ms "
+              f"{result['val_accuracy']:>8.4f} {result['agreement']:>7.4f}")
+    if training:
+        print("\n=== ENTRAÎNEMENT ===")
+        for precision, result in training.items():
+            print(f"{precision:>15} {result['images_per_second'] or 0:>9.1f} images/s, "
+                  f"précision {result['val_accuracy']:.4f}")
+    print(f"\nRapport: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
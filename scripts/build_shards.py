@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Conversion du dataset nettoyé en shards TFRecord pré-décodés.
+
+Usage:
+    python scripts/build_shards.py [--images-per-shard 2048] [--force]
+
+L'entraînement lit ensuite ces shards avec INPUT_BACKEND=shards.
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG
+from src.data.preprocessing import clean_corrupted_images, setup_data_directory
+from src.data.shards import DEFAULT_IMAGES_PER_SHARD, build_shards, ensure_shards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversion du dataset en shards TFRecord")
+    parser.add_argument("--images-per-shard", type=int, default=None,
+                        help=f"Nombre d'images par fichier TFRecord (défaut: {DEFAULT_IMAGES_PER_SHARD}); "
+                             "des shards à jour mais découpés autrement sont reconstruits")
+    parser.add_argument("--force", action="store_true",
+                        help="Reconstruire même si les shards sont à jour")
+    args = parser.parse_args()
+
+    data_path = setup_data_directory()
+    clean_corrupted_images(data_path)
+
+    image_size = MODEL_CONFIG["image_size"]
+    if args.force:
+        shards_dir = build_shards(data_path, image_size,
+                                  images_per_shard=args.images_per_shard or DEFAULT_IMAGES_PER_SHARD)
+    else:
+        shards_dir = ensure_shards(data_path, image_size, images_per_shard=args.images_per_shard)
+
+    print(f"Shards disponibles: {shards_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Distillation du modèle en production dans un modèle élève plus léger.
+
+Usage:
+    python scripts/distill.py [--epochs 10] [--widths 16 32 64] [--promote]
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import DISTILL_CONFIG
+from src.models.distillation import StudentDistiller
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distillation du modèle Cats vs Dogs dans un modèle élève")
+    parser.add_argument("--teacher", type=Path, default=None,
+                        help="Modèle maître (défaut: modèle en production)")
+    parser.add_argument("--epochs", type=int, default=None,
+                        help=f"Nombre d'epochs (défaut: {DISTILL_CONFIG['epochs']})")
+    parser.add_argument("--widths", type=int, nargs="+", default=None,
+                        help=f"Filtres de chaque bloc de l'élève (défaut: {' '.join(map(str, DISTILL_CONFIG['widths']))})")
+    parser.add_argument("--standard-conv", action="store_true",
+                        help="Blocs en Conv2D classiques au lieu de convolutions séparables")
+    parser.add_argument("--temperature", type=float, default=None,
+                        help=f"Température de distillation (défaut: {DISTILL_CONFIG['temperature']})")
+    parser.add_argument("--alpha", type=float, default=None,
+                        help=f"Poids des labels réels dans la perte (défaut: {DISTILL_CONFIG['alpha']})")
+    parser.add_argument("--promote", action="store_true",
+                        help="Mettre l'élève en production à la place du maître")
+    args = parser.parse_args()
+
+    overrides = {"widths": tuple(args.widths) if args.widths else None,
+                 "temperature": args.temperature, "alpha": args.alpha}
+    overrides = {key: value for key, value in overrides.items() if value is not None}
+    if args.standard_conv:
+        overrides["separable"] = False
+
+    distiller = StudentDistiller(**overrides)
+    student, report = distiller.distill(teacher_path=args.teacher, epochs=args.epochs, promote=args.promote)
+
+    print("\n=== MAÎTRE / ÉLÈVE ===")
+    for name in ("teacher", "student"):
+        summary = report[name]
+        print(f"{name:8s} précision {summary['val_accuracy']}, {summary['parameters']} paramètres, "
+              f"{summary['macs_per_image'] / 1e6:.1f} M MAC/image, "
+              f"latence {summary['latency']['call_p50_ms']:.2f} ms (predict: {summary['latency']['predict_p50_ms']:.2f} ms)")
+    print(f"Accord élève / maître: {report['agreement']}")
+    print(f"Gain: {report['speedup']['macs']}x en calcul, {report['speedup']['call_p50']}x en latence")
+    print(f"Élève: {report['student_path']}")
+
+
+if __name__ == "__main__":
+    main()
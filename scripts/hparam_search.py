@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Recherche d'hyperparamètres: résolution d'entrée, largeurs des convolutions
+et taille de lot.
+
+Chaque configuration de la grille (SEARCH_CONFIG ou options) est entraînée
+quelques epochs sur un sous-échantillon du dataset, dans des processus
+parallèles qui se partagent les cœurs de la machine. Les données sont
+converties une seule fois par résolution en shards TFRecord pré-décodés
+(sous-échantillon reproductible), relus par tous les essais de même
+résolution.
+
+La latence CPU de chaque modèle est mesurée après les entraînements, un
+modèle à la fois, pour ne pas être faussée par les essais concurrents. Le
+rapport (hparam_search_*.json dans le répertoire des modèles) liste tous
+les essais et la frontière de Pareto précision de validation / latence:
+les configurations qu'aucune autre ne bat à la fois en précision et en
+latence.
+
+Usage:
+    python scripts/hparam_search.py [--image-sizes 96 128 160] [--widths 16,32,64 32,64,128]
+                                    [--batch-sizes 32 64] [--epochs 3] [--subsample 0.2] [--workers 2]
+"""
+
+import sys
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODELS_DIR, SEARCH_CONFIG
+
+
+def trial_name(trial: dict) -> str:
+    height, width = trial["image_size"]
+    return f"{height}x{width}_w{'-'.join(map(str, trial['conv_widths']))}_b{trial['batch_size']}"
+
+
+def run_trial(trial: dict, output_dir: Path):
+    """Mode --trial: entraîne une configuration (processus enfant)."""
+    import tensorflow as tf
+    from src.data.shards import load_shard_datasets
+    from src.models.trainer import CatDogTrainer
+
+    trainer = CatDogTrainer(
+        image_size=tuple(trial["image_size"]),
+        conv_widths=tuple(trial["conv_widths"]),
+        batch_size=trial["batch_size"],
+        epochs=trial["epochs"],
+    )
+    tf.keras.utils.set_random_seed(trainer.config["seed"])
+    train_ds, val_ds = load_shard_datasets(Path(trial["shards_dir"]), trainer.batch_size)
+
+    model = trainer.create_model()
+    start = time.perf_counter()
+    model.fit(train_ds, validation_data=val_ds, epochs=trial["epochs"], verbose=2)
+    train_seconds = time.perf_counter() - start
+
+    # Précision du modèle exporté (poids de la dernière epoch), celui dont la
+    # latence est mesurée: pas le maximum de l'historique
+    model_path = output_dir / "model.keras"
+    inference_model = trainer.export_inference_model(model, model_path)
+    _, val_accuracy = inference_model.evaluate(val_ds, verbose=0)
+    result = {
+        **trial,
+        "name": trial_name(trial),
+        "val_accuracy": round(float(val_accuracy), 4),
+        "parameters": int(model.count_params()),
+        "train_seconds": round(train_seconds, 2),
+        "model_path": str(model_path),
+    }
+    with open(output_dir / "result.json", 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+
+
+def launch_trial(trial: dict, output_dir: Path, threads: int) -> dict:
+    """Lance un essai dans un processus enfant; sa sortie est écrite dans trial.log."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, **{
+        "TF_NUM_INTRAOP_THREADS": str(threads),
+        "TF_NUM_INTEROP_THREADS": "1",
+        "OMP_NUM_THREADS": str(threads),
+    })
+    command = [sys.executable, str(Path(__file__).resolve()),
+               "--trial", json.dumps(trial), "--trial-dir", str(output_dir)]
+    with open(output_dir / "trial.log", 'w') as log_file:
+        code = subprocess.run(command, env=env, stdout=log_file, stderr=subprocess.STDOUT).returncode
+
+    result_path = output_dir / "result.json"
+    if code != 0 or not result_path.exists():
+        print(f"Essai {trial_name(trial)} en erreur (code {code}, voir {output_dir / 'trial.log'})")
+        return {**trial, "name": trial_name(trial), "status": f"exit {code}"}
+    with open(result_path, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    print(f"Essai {result['name']}: précision {result['val_accuracy']:.4f} ({result['train_seconds']:.0f}s)")
+    return {**result, "status": "ok"}
+
+
+def pareto_frontier(results: list) -> list:
+    """Essais non dominés: aucun autre n'est au moins aussi précis et aussi rapide, et strictement meilleur sur l'un."""
+    frontier = []
+    for candidate in results:
+        dominated = any(
+            other["val_accuracy"] >= candidate["val_accuracy"]
+            and other["latency_p50_ms"] <= candidate["latency_p50_ms"]
+            and (other["val_accuracy"] > candidate["val_accuracy"]
+                 or other["latency_p50_ms"] < candidate["latency_p50_ms"])
+            for other in results
+        )
+        if not dominated:
+            frontier.append(candidate)
+    return sorted(frontier, key=lambda result: result["latency_p50_ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche d'hyperparamètres (résolution, largeurs, taille de lot)")
+    parser.add_argument("--image-sizes", type=int, nargs="+", default=None,
+                        help="Résolutions carrées à essayer (défaut: SEARCH_CONFIG)")
+    parser.add_argument("--widths", nargs="+", default=None,
+                        help="Largeurs des convolutions, ex. 16,32,64 32,64,128 (défaut: SEARCH_CONFIG)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=None,
+                        help="Tailles de lot (défaut: SEARCH_CONFIG)")
+    parser.add_argument("--epochs", type=int, default=SEARCH_CONFIG["epochs"],
+                        help=f"Epochs par essai (défaut: {SEARCH_CONFIG['epochs']})")
+    parser.add_argument("--subsample", type=float, default=SEARCH_CONFIG["subsample"],
+                        help=f"Fraction du dataset utilisée (défaut: {SEARCH_CONFIG['subsample']})")
+    parser.add_argument("--workers", type=int, default=SEARCH_CONFIG["workers"],
+                        help=f"Essais entraînés en parallèle (défaut: {SEARCH_CONFIG['workers']})")
+    parser.add_argument("--trial", help=argparse.SUPPRESS)
+    parser.add_argument("--trial-dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trial:
+        run_trial(json.loads(args.trial), args.trial_dir)
+        return
+
+    image_sizes = [(size, size) for size in args.image_sizes] if args.image_sizes else SEARCH_CONFIG["image_sizes"]
+    widths = ([tuple(int(w) for w in spec.split(",")) for spec in args.widths]
+              if args.widths else SEARCH_CONFIG["conv_widths"])
+    batch_sizes = args.batch_sizes or SEARCH_CONFIG["batch_sizes"]
+    output_dir = SEARCH_CONFIG["output_dir"] / datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    # Données préparées une fois, puis un jeu de shards sous-échantillonné par résolution
+    from src.data.shards import ensure_shards
+    from src.models.trainer import CatDogTrainer
+    data_path = CatDogTrainer().prepare_sources()
+    shards = {
+        size: ensure_shards(data_path, size, SEARCH_CONFIG["output_dir"] / "shards" / f"{size[0]}x{size[1]}",
+                            subsample=args.subsample)
+        for size in image_sizes
+    }
+
+    trials = [
+        {"image_size": list(size), "conv_widths": list(width), "batch_size": batch_size,
+         "epochs": args.epochs, "shards_dir": str(shards[size])}
+        for size, width, batch_size in itertools.product(image_sizes, widths, batch_sizes)
+    ]
+    workers = max(1, min(args.workers, len(trials)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"{len(trials)} essais, {workers} en parallèle ({threads} thread(s) chacun), "
+          f"sous-échantillon {args.subsample:.0%}")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda trial: launch_trial(trial, output_dir / trial_name(trial), threads), trials
+        ))
+    search_seconds = time.perf_counter() - start
+
+    # Latences mesurées en séquence, machine au repos
+    import tensorflow as tf
+    from src.models.distillation import measure_latency
+    completed = [result for result in results if result["status"] == "ok"]
+    for result in completed:
+        model = tf.keras.models.load_model(result["model_path"])
+        latency = measure_latency(model, tuple(result["image_size"]))
+        result["latency_p50_ms"] = latency["call_p50_ms"]
+        result["latency_p90_ms"] = latency["call_p90_ms"]
+        result["predict_p50_ms"] = latency["predict_p50_ms"]
+
+    frontier = pareto_frontier(completed)
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "subsample": args.subsample,
+        "epochs": args.epochs,
+        "workers": workers,
+        "search_seconds": round(search_seconds, 2),
+        "trials": results,
+        "pareto_frontier": [result["name"] for result in frontier],
+    }
+    report_path = MODELS_DIR / f"hparam_search_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== FRONTIÈRE DE PARETO (précision / latence) ===")
+    for result in frontier:
+        print(f"{result['name']:28s} précision {result['val_accuracy']:.4f}  "
+              f"latence {result['latency_p50_ms']:.2f} ms  ({result['parameters']} paramètres)")
+    print(f"\nRapport: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,21 @@ CREATE TABLE Feedback_user (
     resultat_prediction float NOT NULL,
     input_user text NOT NULL,
     inference_time_ms float,
-    success boolean
+    success boolean,
+    image_hash VARCHAR(64),
+    model_version VARCHAR(64),
+    predicted_class VARCHAR(8)
 );
 
 -- Migration idempotente pour ajouter colonnes si table déjà créée
 ALTER TABLE IF EXISTS Feedback_user
     ADD COLUMN IF NOT EXISTS inference_time_ms float;
 ALTER TABLE IF EXISTS Feedback_user
-    ADD COLUMN IF NOT EXISTS success boolean;
\ No newline at end of file
+    ADD COLUMN IF NOT EXISTS success boolean;
+ALTER TABLE IF EXISTS Feedback_user
+    ADD COLUMN IF NOT EXISTS image_hash VARCHAR(64);
+ALTER TABLE IF EXISTS Feedback_user
+    ADD COLUMN IF NOT EXISTS model_version VARCHAR(64);
+ALTER TABLE IF EXISTS Feedback_user
+    ADD COLUMN IF NOT EXISTS predicted_class VARCHAR(8);
+CREATE INDEX IF NOT EXISTS idx_feedback_user_image_hash ON Feedback_user(image_hash);
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Élagage par magnitude du modèle à plusieurs niveaux de parcimonie.
+
+Pour chaque niveau, le modèle en production est affiné avec élagage
+progressif, puis exporté dans data/processed/models/pruned/
+(cats_dogs_model_sparsity<NN>.keras et .keras.gz) et enregistré dans le
+registre (type "pruned"). Le rapport pruning_report_*.json compare, au
+modèle d'origine: précision de validation, taille du fichier (brut et
+gzip), temps de chargement et latence CPU d'une image.
+
+Usage:
+    python scripts/prune.py [--sparsity 0.5 0.75 0.9] [--epochs 2]
+"""
+
+import sys
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+import tensorflow as tf
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import PRUNING_CONFIG
+from src.models.eval_cache import file_sha256
+from src.models.pruning import measure_artifact
+from src.models.registry import ModelRegistry
+from src.models.trainer import CatDogTrainer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Élagage du modèle Cats vs Dogs à plusieurs niveaux de parcimonie")
+    parser.add_argument("--sparsity", type=float, nargs="+", default=None,
+                        help=f"Niveaux de parcimonie (défaut: {' '.join(map(str, PRUNING_CONFIG['sparsities']))})")
+    parser.add_argument("--epochs", type=int, default=None,
+                        help=f"Epochs d'affinage par niveau (défaut: {PRUNING_CONFIG['epochs']})")
+    args = parser.parse_args()
+
+    trainer = CatDogTrainer()
+    model_path = trainer.models_dir / "cats_dogs_model.keras"
+    if not model_path.exists():
+        print(f"Aucun modèle à élaguer: {model_path} (entraîner d'abord le modèle complet)")
+        sys.exit(1)
+
+    output_dir = PRUNING_CONFIG["output_dir"]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    image_size = trainer.config["image_size"]
+    parent_sha256 = file_sha256(model_path)
+    registry = ModelRegistry()
+
+    # Données préparées une fois pour tous les niveaux
+    train_ds, val_ds = trainer.prepare_data()
+
+    # Référence: modèle en production (copie locale, pour mesurer aussi son .gz)
+    baseline_model = tf.keras.models.load_model(model_path)
+    _, baseline_accuracy = baseline_model.evaluate(val_ds, verbose=0)
+    baseline_path = output_dir / "cats_dogs_model_sparsity00.keras"
+    baseline_model.save(baseline_path)
+    runs = [{"target_sparsity": 0.0, "val_accuracy": round(float(baseline_accuracy), 4),
+             "path": str(baseline_path), **measure_artifact(baseline_path, image_size)}]
+
+    for sparsity in args.sparsity or PRUNING_CONFIG["sparsities"]:
+        print(f"\n=== Parcimonie {sparsity:.0%} ===")
+        model, _ = trainer.train_pruned(sparsity, epochs=args.epochs, base_model=baseline_model,
+                                        datasets=(train_ds, val_ds))
+        pruned_path = output_dir / f"cats_dogs_model_sparsity{round(sparsity * 100):02d}.keras"
+        Path(f"{pruned_path}.gz").unlink(missing_ok=True)
+        model.save(pruned_path)
+
+        # Précision de l'artefact sauvegardé: masques finaux appliqués (fin de fit)
+        _, accuracy = tf.keras.models.load_model(pruned_path).evaluate(val_ds, verbose=0)
+        accuracy = round(float(accuracy), 4)
+        measures = measure_artifact(pruned_path, image_size)
+        sha256 = registry.register(
+            pruned_path, kind="pruned", parent=parent_sha256,
+            metrics={"accuracy": accuracy, "sparsity": measures["sparsity"]},
+        )
+        runs.append({"target_sparsity": sparsity, "val_accuracy": accuracy,
+                     "path": str(pruned_path), "sha256": sha256, **measures})
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "parent_sha256": parent_sha256,
+        "epochs": args.epochs or PRUNING_CONFIG["epochs"],
+        "runs": runs,
+    }
+    report_path = trainer.models_dir / f"pruning_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== RAPPORT D'ÉLAGAGE ===")
+    print(f"{'parcimonie':>10} {'précision':>9} {'.keras':>10} {'.gz':>10} {'chargement':>11} {'latence':>9}")
+    for run in runs:
+        print(f"{run['sparsity']:>10.0%} {run['val_accuracy']:>9.4f} {run['file_bytes'] / 1024:>8.0f}Ko "
+              f"{run['gzip_bytes'] / 1024:>8.0f}Ko {run['load_ms']:>9.1f}ms {run['latency_p50_ms']:>7.2f}ms")
+    print(f"\nRapport: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
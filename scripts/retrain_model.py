@@ -14,6 +14,12 @@ Exemples:
     
     # Ré-entraînement forcé (ignore les conditions)
     python scripts/retrain_model.py --force
+    
+    # Reprise d'un ré-entraînement interrompu
+    python scripts/retrain_model.py --force --resume
+    
+    # Affinage sur les seuls nouveaux feedbacks (+ rejeu du dataset de base)
+    python scripts/retrain_model.py --incremental
 """
 
 import sys
@@ -26,6 +32,7 @@ from datetime import datetime
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+from config.settings import INCREMENTAL_CONFIG
 from src.models.retrainer import ModelRetrainer
 from src.data.feedback_handler import FeedbackDataHandler
 
@@ -41,6 +48,10 @@ Exemples d'utilisation:
   python scripts/retrain_model.py --days-back 60 --min-feedback 200
   python scripts/retrain_model.py --force --epochs 10
   python scripts/retrain_model.py --dry-run
+  python scripts/retrain_model.py --force --profile --trace-steps 10 20
+  python scripts/retrain_model.py --force --resume
+  python scripts/retrain_model.py --incremental --replay-size 1000
+  python scripts/retrain_model.py --rollback
         """
     )
     
@@ -75,8 +86,8 @@ Exemples d'utilisation:
     parser.add_argument(
         "--epochs",
         type=int,
-        default=5,
-        help="Nombre d'époques pour le ré-entraînement (défaut: 5)"
+        default=None,
+        help=f"Nombre d'époques pour le ré-entraînement (défaut: 5, {INCREMENTAL_CONFIG['epochs']} en incrémental)"
     )
     
     parser.add_argument(
@@ -86,6 +97,39 @@ Exemples d'utilisation:
         help="Taux d'apprentissage pour le ré-entraînement (défaut: 0.0001)"
     )
     
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profiler le ré-entraînement (débit, durée des steps, attente du pipeline, mémoire)"
+    )
+    
+    parser.add_argument(
+        "--trace-steps",
+        type=int,
+        nargs=2,
+        metavar=("DEBUT", "FIN"),
+        help="Capturer une trace du profiler TensorFlow entre deux steps"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reprendre un ré-entraînement interrompu depuis son dernier checkpoint"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Affiner le modèle actuel sur les nouveaux feedbacks seulement, avec rejeu du dataset de base"
+    )
+    
+    parser.add_argument(
+        "--replay-size",
+        type=int,
+        default=INCREMENTAL_CONFIG["replay_size"],
+        help=f"Images du dataset de base rejouées en incrémental (défaut: {INCREMENTAL_CONFIG['replay_size']})"
+    )
+    
     parser.add_argument(
         "--force",
         action="store_true",
@@ -104,6 +148,18 @@ Exemples d'utilisation:
         help="Nettoyer les anciens modèles après le ré-entraînement"
     )
     
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Remettre en production le modèle déployé précédemment"
+    )
+    
+    parser.add_argument(
+        "--results-file",
+        type=Path,
+        help="Fichier JSON des résultats (défaut: data/processed/retrain_results_<date>.json)"
+    )
+    
     parser.add_argument(
         "--history",
         action="store_true",
@@ -111,6 +167,8 @@ Exemples d'utilisation:
     )
     
     args = parser.parse_args()
+    if args.epochs is None:
+        args.epochs = INCREMENTAL_CONFIG["epochs"] if args.incremental else 5
     
     # Afficher l'historique si demandé
     if args.history:
@@ -132,6 +190,14 @@ Exemples d'utilisation:
                 print(f"Durée: {record.get('duration_minutes', 0):.1f} minutes")
         return
     
+    # Retour arrière si demandé
+    if args.rollback:
+        retrainer = ModelRetrainer()
+        print("=== RETOUR ARRIÈRE ===")
+        if retrainer.rollback() is None:
+            sys.exit(1)
+        return
+    
     # Mode simulation
     if args.dry_run:
         print("=== MODE SIMULATION ===")
@@ -157,6 +223,8 @@ Exemples d'utilisation:
             print(f"  Époques: {args.epochs}")
             print(f"  Taux d'apprentissage: {args.learning_rate}")
             print(f"  Jours de feedback: {args.days_back}")
+            if args.incremental:
+                print(f"  Mode incrémental, rejeu: {args.replay_size} images")
         else:
             print("\n❌ Ré-entraînement non nécessaire selon les conditions actuelles.")
             print("   Utilisez --force pour forcer le ré-entraînement.")
@@ -173,6 +241,8 @@ Exemples d'utilisation:
     print(f"  Époques: {args.epochs}")
     print(f"  Taux d'apprentissage: {args.learning_rate}")
     print(f"  Mode forcé: {'OUI' if args.force else 'NON'}")
+    print(f"  Reprise: {'OUI' if args.resume else 'NON'}")
+    print(f"  Incrémental: {'OUI (rejeu: ' + str(args.replay_size) + ' images)' if args.incremental else 'NON'}")
     print()
     
     retrainer = ModelRetrainer()
@@ -191,7 +261,12 @@ Exemples d'utilisation:
             min_negative_feedback=args.min_negative_feedback,
             min_positive_rate=args.min_positive_rate,
             retrain_epochs=args.epochs,
-            learning_rate=args.learning_rate
+            learning_rate=args.learning_rate,
+            profile=args.profile,
+            trace_steps=tuple(args.trace_steps) if args.trace_steps else None,
+            resume=args.resume,
+            incremental=args.incremental,
+            replay_size=args.replay_size
         )
         
         # Afficher les résultats
@@ -204,6 +279,9 @@ Exemples d'utilisation:
             print(f"Précision ancien modèle: {results.get('old_model_accuracy', 0):.4f}")
             print(f"Amélioration: {results.get('improvement', 0):.4f}")
             print(f"Nombre de feedbacks traités: {results.get('feedback_count', 0)}")
+            if results.get('mode') == 'incremental':
+                print(f"Nouveaux feedbacks intégrés: {results.get('new_feedback_count', 0)}, "
+                      f"rejeu: {results.get('replay_count', 0)} images")
             print(f"Durée: {results.get('duration_minutes', 0):.1f} minutes")
             
             if results.get('deployment_status') == 'deployed':
@@ -227,7 +305,7 @@ Exemples d'utilisation:
             print("Nettoyage terminé")
         
         # Sauvegarder les résultats
-        results_file = ROOT_DIR / "data" / "processed" / f"retrain_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        results_file = args.results_file or ROOT_DIR / "data" / "processed" / f"retrain_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         results_file.parent.mkdir(parents=True, exist_ok=True)
         
         with open(results_file, 'w') as f:
@@ -8,6 +8,28 @@ données de feedback disponibles.
 
 Usage:
     python scripts/retrain_scheduler.py [--config CONFIG_FILE]
+    python scripts/retrain_scheduler.py --daemon [--config CONFIG_FILE]
+
+En mode --daemon, le planificateur reste actif et vérifie les conditions
+toutes les `check_interval_hours` (section "scheduler" du fichier de
+configuration), sans relancer d'agrégation sur toute la fenêtre de
+feedbacks: seuls les feedbacks arrivés depuis la dernière vérification sont
+comptés (par identifiant croissant) et ajoutés à des compteurs conservés
+depuis le dernier ré-entraînement. Ces compteurs et les dates de dernière
+vérification et de dernier ré-entraînement sont sauvegardés dans
+logs/retrain_scheduler_state.json: un redémarrage reprend où le démon
+s'était arrêté. Deux ré-entraînements sont espacés d'au moins
+`retrain_interval_hours`.
+
+Chaque ré-entraînement s'exécute dans un processus enfant
+(scripts/retrain_model.py) sous le verrou data/processed/models/retrain.lock
+(verrou du système, libéré même si le planificateur est tué): deux
+invocations qui se chevauchent ne lancent jamais deux ré-entraînements à
+la fois. L'enfant est limité en threads (`cpu_threads`), en priorité
+(`niceness`) et, hors Windows, en mémoire (`max_memory_mb`); il est arrêté
+au-delà de `timeout_minutes` et sa sortie est relayée dans les logs. Après
+un arrêt pour délai dépassé, la tentative suivante reprend depuis les
+checkpoints (--resume).
 
 Configuration via variables d'environnement:
     RETRAIN_DAYS_BACK=30
@@ -24,20 +46,56 @@ import sys
 import os
 import argparse
 import logging
+import signal
+import subprocess
+import threading
+import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 
 # Ajouter le répertoire racine au path
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from src.models.retrainer import ModelRetrainer
+from config.settings import MODELS_DIR, REGISTRY_DIR, TEMP_DIR
 from src.data.feedback_handler import FeedbackDataHandler
 
+IS_WINDOWS = os.name == "nt"
+if IS_WINDOWS:
+    import msvcrt
+else:
+    import fcntl
+    import resource
+
+# État du mode --daemon (compteurs incrémentaux, dates des derniers passages)
+STATE_FILE = ROOT_DIR / "logs" / "retrain_scheduler_state.json"
+
+# Verrou: un seul ré-entraînement à la fois (cron qui se chevauchent, démon)
+LOCK_FILE = MODELS_DIR / "retrain.lock"
+
+# Dernier ré-entraînement arrêté pour délai dépassé: le suivant reprend ses checkpoints
+RESUME_FILE = MODELS_DIR / "retrain.resume.json"
+
+# Délai entre SIGTERM et SIGKILL quand le ré-entraînement dépasse son délai
+KILL_GRACE_SECONDS = 30
+
+DEFAULT_SCHEDULER = {
+    "check_interval_hours": 6,
+    "retrain_interval_hours": 24,
+    "timeout_minutes": 60,
+    # Limites du processus de ré-entraînement (0: pas de limite)
+    "max_memory_mb": 0,
+    "cpu_threads": 0,
+    "niceness": 10,
+}
+
 
 def setup_logging(log_level: str = "INFO"):
     """Configure le système de logging."""
+    # Créer le répertoire de logs avant d'y ouvrir le fichier
+    (ROOT_DIR / "logs").mkdir(exist_ok=True)
+    
     logging.basicConfig(
         level=getattr(logging, log_level.upper()),
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -46,9 +104,6 @@ def setup_logging(log_level: str = "INFO"):
             logging.FileHandler(ROOT_DIR / "logs" / "retrain_scheduler.log", mode='a')
         ]
     )
-    
-    # Créer le répertoire de logs s'il n'existe pas
-    (ROOT_DIR / "logs").mkdir(exist_ok=True)
 
 
 def load_config(config_file: Path = None) -> dict:
@@ -62,7 +117,8 @@ def load_config(config_file: Path = None) -> dict:
         "learning_rate": float(os.environ.get("RETRAIN_LEARNING_RATE", "0.0001")),
         "cleanup": os.environ.get("RETRAIN_CLEANUP", "true").lower() == "true",
         "log_level": os.environ.get("RETRAIN_LOG_LEVEL", "INFO"),
-        "force_retrain": os.environ.get("RETRAIN_FORCE", "false").lower() == "true"
+        "force_retrain": os.environ.get("RETRAIN_FORCE", "false").lower() == "true",
+        "scheduler": dict(DEFAULT_SCHEDULER)
     }
     
     # Charger depuis un fichier de configuration si fourni
@@ -74,6 +130,7 @@ def load_config(config_file: Path = None) -> dict:
         except Exception as e:
             logging.warning(f"Erreur lors du chargement de la configuration {config_file}: {e}")
     
+    config["scheduler"] = {**DEFAULT_SCHEDULER, **config.get("scheduler", {})}
     return config
 
 
@@ -90,22 +147,236 @@ def check_retrain_conditions(config: dict) -> tuple[bool, dict]:
     return should_retrain or config["force_retrain"], stats
 
 
+def acquire_lock(lock_file: Path = LOCK_FILE):
+    """
+    Prend le verrou de ré-entraînement (verrou consultatif du système).
+    
+    Le fichier reste en place; le verrou est attaché au descripteur ouvert
+    et libéré par le système si le processus meurt, sans reprise de verrou
+    orphelin à arbitrer entre deux planificateurs.
+    
+    Returns:
+        (fichier verrouillé ou None, pid du détenteur)
+    """
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(lock_file, 'a+')
+    try:
+        handle.seek(0)
+        if IS_WINDOWS:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None, _lock_holder(lock_file)
+    
+    # pid du détenteur, à titre informatif
+    handle.seek(0)
+    handle.truncate()
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle, os.getpid()
+
+
+def release_lock(handle):
+    """Libère le verrou (le fichier est conservé)."""
+    if handle is None:
+        return
+    try:
+        handle.seek(0)
+        if IS_WINDOWS:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
+    finally:
+        handle.close()
+
+
+def _lock_holder(lock_file: Path) -> int:
+    try:
+        return int(lock_file.read_text().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _limit_resources(max_memory_mb: int, niceness: int):
+    """
+    Limites appliquées au processus enfant (POSIX), avant le chargement de TensorFlow.
+    
+    La mémoire est bornée par RLIMIT_DATA (tas et allocations anonymes) et
+    non RLIMIT_AS: TensorFlow réserve beaucoup d'espace d'adressage (piles
+    des threads, arènes des allocateurs) sans l'utiliser, et une limite
+    d'espace virtuel échouerait sur les machines à nombreux cœurs.
+    """
+    def apply():
+        if niceness:
+            os.nice(niceness)
+        if max_memory_mb:
+            limit = max_memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    return apply
+
+
+def _popen_isolation(scheduler: dict, logger: logging.Logger) -> dict:
+    """Arguments de Popen isolant l'enfant dans son propre groupe de processus."""
+    if IS_WINDOWS:
+        if scheduler["max_memory_mb"]:
+            logger.warning("max_memory_mb ignoré sous Windows (pas de limite de ressources)")
+        flags = subprocess.CREATE_NEW_PROCESS_GROUP
+        if scheduler["niceness"]:
+            flags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        return {"creationflags": flags}
+    return {
+        "start_new_session": True,
+        "preexec_fn": _limit_resources(scheduler["max_memory_mb"], scheduler["niceness"]),
+    }
+
+
+def _stop_process(process: subprocess.Popen):
+    """Arrête l'enfant: SIGTERM au groupe puis SIGKILL après le délai de grâce (kill sous Windows)."""
+    if IS_WINDOWS:
+        process.kill()
+        process.wait()
+        return
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def cleanup_partial_artefacts(started_at: float, logger: logging.Logger):
+    """
+    Supprime les fichiers laissés par un ré-entraînement interrompu: modèle
+    candidat et fichiers temporaires créés depuis `started_at`.
+    
+    Les checkpoints de reprise, écrits atomiquement, sont conservés.
+    """
+    candidates = list(MODELS_DIR.glob("cats_dogs_model_retrained_*.keras"))
+    for root in {MODELS_DIR, REGISTRY_DIR}:
+        if root.exists():
+            candidates.extend(root.rglob("*.tmp"))
+    for path in candidates:
+        try:
+            if path.stat().st_mtime >= started_at:
+                path.unlink()
+                logger.info(f"Artefact partiel supprimé: {path}")
+        except OSError:
+            continue
+
+
+def run_retrain_subprocess(config: dict, logger: logging.Logger) -> dict:
+    """
+    Lance scripts/retrain_model.py dans un processus enfant isolé.
+    
+    - limites: mémoire (max_memory_mb, hors Windows), threads TensorFlow
+      (cpu_threads) et priorité (niceness);
+    - la sortie de l'enfant est relayée ligne par ligne dans les logs;
+    - au-delà de timeout_minutes, le groupe de processus reçoit SIGTERM puis,
+      après un délai de grâce, SIGKILL (kill sous Windows); les artefacts
+      partiels sont supprimés et l'arrêt est noté dans RESUME_FILE: la
+      tentative suivante est lancée avec --resume et repart des checkpoints.
+    """
+    scheduler = config["scheduler"]
+    timeout_seconds = scheduler["timeout_minutes"] * 60
+    results_file = TEMP_DIR / f"retrain_results_{os.getpid()}.json"
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    results_file.unlink(missing_ok=True)
+    
+    # Conditions déjà vérifiées par le planificateur: --force
+    command = [
+        sys.executable, str(ROOT_DIR / "scripts" / "retrain_model.py"),
+        "--force",
+        "--days-back", str(config["days_back"]),
+        "--epochs", str(config["epochs"]),
+        "--learning-rate", str(config["learning_rate"]),
+        "--results-file", str(results_file),
+    ]
+    if config["cleanup"]:
+        command.append("--cleanup")
+    if RESUME_FILE.exists():
+        logger.info("Tentative précédente arrêtée pour délai dépassé: reprise depuis les checkpoints")
+        command.append("--resume")
+    
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    if scheduler["cpu_threads"]:
+        env.update({
+            "TF_NUM_INTRAOP_THREADS": str(scheduler["cpu_threads"]),
+            "TF_NUM_INTEROP_THREADS": "1",
+            "OMP_NUM_THREADS": str(scheduler["cpu_threads"]),
+        })
+    
+    started_at = time.time()
+    process = subprocess.Popen(
+        command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        **_popen_isolation(scheduler, logger),
+    )
+    logger.info(f"Ré-entraînement lancé (pid {process.pid}, délai maximal {scheduler['timeout_minutes']} min)")
+    
+    def stream_output():
+        for line in process.stdout:
+            logger.info(f"[retrain] {line.rstrip()}")
+    reader = threading.Thread(target=stream_output, daemon=True)
+    reader.start()
+    
+    timed_out = False
+    try:
+        process.wait(timeout=timeout_seconds)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        logger.error(f"Délai dépassé ({scheduler['timeout_minutes']} min): arrêt du ré-entraînement")
+        _stop_process(process)
+    reader.join(timeout=5)
+    
+    if timed_out or process.returncode < 0:
+        cleanup_partial_artefacts(started_at, logger)
+    
+    # Checkpoints conservés après un délai dépassé: à reprendre jusqu'à une exécution complète
+    if timed_out:
+        RESUME_FILE.write_text(json.dumps({"timed_out_at": datetime.now().isoformat()}))
+    elif process.returncode == 0:
+        RESUME_FILE.unlink(missing_ok=True)
+    
+    results = None
+    if results_file.exists():
+        try:
+            results = json.loads(results_file.read_text())
+        except ValueError:
+            results = None
+        results_file.unlink(missing_ok=True)
+    
+    if results is None:
+        reason = (f"Délai dépassé ({scheduler['timeout_minutes']} min)" if timed_out
+                  else f"Processus de ré-entraînement terminé avec le code {process.returncode}")
+        results = {
+            "status": "failed",
+            "error": reason,
+            "timestamp": datetime.now().isoformat()
+        }
+    results["timed_out"] = timed_out
+    results["exit_code"] = process.returncode
+    return results
+
+
 def execute_retraining(config: dict, logger: logging.Logger) -> dict:
-    """Exécute le ré-entraînement du modèle."""
-    retrainer = ModelRetrainer()
+    """Exécute le ré-entraînement du modèle dans un processus isolé, sous verrou."""
+    lock, holder = acquire_lock(LOCK_FILE)
+    if lock is None:
+        logger.warning(f"Ré-entraînement déjà en cours (pid {holder}): ignoré")
+        return {
+            "status": "skipped",
+            "reason": f"Ré-entraînement déjà en cours (pid {holder})",
+            "timestamp": datetime.now().isoformat()
+        }
     
     logger.info("Début du ré-entraînement automatique")
     logger.info(f"Configuration: {config}")
     
     try:
-        results = retrainer.retrain_with_feedback(
-            days_back=config["days_back"],
-            min_feedback_count=config["min_feedback"],
-            min_negative_feedback=config["min_negative_feedback"],
-            min_positive_rate=config["min_positive_rate"],
-            retrain_epochs=config["epochs"],
-            learning_rate=config["learning_rate"]
-        )
+        results = run_retrain_subprocess(config, logger)
         
         # Logging des résultats
         if results.get("status") == "completed":
@@ -125,12 +396,6 @@ def execute_retraining(config: dict, logger: logging.Logger) -> dict:
         elif results.get("status") == "failed":
             logger.error(f"Échec du ré-entraînement: {results.get('error', 'N/A')}")
         
-        # Nettoyage si configuré
-        if config["cleanup"] and results.get("status") == "completed":
-            logger.info("Nettoyage des anciens modèles...")
-            retrainer.cleanup_old_models()
-            logger.info("Nettoyage terminé")
-        
         return results
         
     except Exception as e:
@@ -140,6 +405,8 @@ def execute_retraining(config: dict, logger: logging.Logger) -> dict:
             "error": str(e),
             "timestamp": datetime.now().isoformat()
         }
+    finally:
+        release_lock(lock)
 
 
 def save_execution_log(results: dict, config: dict):
@@ -156,6 +423,132 @@ def save_execution_log(results: dict, config: dict):
         f.write(json.dumps(log_entry) + '\n')
 
 
+def load_state(state_file: Path = STATE_FILE) -> dict:
+    """État du démon (état initial si absent ou illisible)."""
+    state = {
+        "last_seen_id": 0,
+        "since_retrain": {"total_feedback": 0, "positive_feedback": 0, "negative_feedback": 0},
+        "last_check": None,
+        "last_retrain": None,
+    }
+    if state_file.exists():
+        try:
+            with open(state_file, 'r') as f:
+                state.update(json.load(f))
+        except Exception as e:
+            logging.warning(f"État du planificateur illisible, réinitialisé: {e}")
+    return state
+
+
+def save_state(state: dict, state_file: Path = STATE_FILE):
+    """Écriture atomique de l'état du démon."""
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = state_file.with_name(f"{state_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def update_counters(state: dict, feedback_handler: FeedbackDataHandler, config: dict) -> dict:
+    """
+    Ajoute aux compteurs les feedbacks arrivés depuis la dernière vérification.
+    
+    Au premier passage (last_seen_id = 0), la requête couvre toute la
+    fenêtre `days_back`, comme le mode ponctuel; ensuite, seules les
+    nouvelles lignes sont lues.
+    """
+    delta = feedback_handler.get_feedback_counts_since(state["last_seen_id"], config["days_back"])
+    counters = state["since_retrain"]
+    for key in ("total_feedback", "positive_feedback", "negative_feedback"):
+        counters[key] += delta[key]
+    state["last_seen_id"] = delta["last_id"]
+    state["last_check"] = datetime.now().isoformat()
+    return delta
+
+
+def counters_to_stats(state: dict) -> dict:
+    """Compteurs du démon au format de FeedbackDataHandler.should_retrain."""
+    counters = state["since_retrain"]
+    total = counters["total_feedback"]
+    return {
+        **counters,
+        "positive_rate": counters["positive_feedback"] / total if total > 0 else 0.0,
+        "since": state["last_retrain"],
+        "last_seen_id": state["last_seen_id"],
+    }
+
+
+def daemon_should_retrain(state: dict, config: dict, now: datetime) -> tuple[bool, str]:
+    """Mêmes seuils que should_retrain, sur les compteurs, et intervalle minimal entre ré-entraînements."""
+    stats = counters_to_stats(state)
+    if state["last_retrain"]:
+        next_retrain = datetime.fromisoformat(state["last_retrain"]) + timedelta(
+            hours=config["scheduler"]["retrain_interval_hours"]
+        )
+        if now < next_retrain:
+            return False, f"Intervalle minimal non écoulé (prochain: {next_retrain.isoformat()})"
+    if config["force_retrain"]:
+        return True, "Ré-entraînement forcé"
+    conditions_met = (
+        stats["total_feedback"] >= config["min_feedback"] and
+        stats["negative_feedback"] >= config["min_negative_feedback"] and
+        stats["positive_rate"] < config["min_positive_rate"]
+    )
+    return conditions_met, "Conditions remplies" if conditions_met else "Conditions non remplies"
+
+
+def run_daemon(config: dict, args, logger: logging.Logger):
+    """
+    Boucle du mode --daemon: vérification incrémentale à chaque intervalle.
+    
+    Le gestionnaire de feedbacks est créé une seule fois et réutilisé; chaque
+    ré-entraînement tourne dans un processus enfant (run_retrain_subprocess).
+    SIGTERM/SIGINT arrêtent le démon entre deux vérifications (un
+    ré-entraînement en cours va à son terme, dans son délai maximal).
+    """
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    
+    interval_seconds = config["scheduler"]["check_interval_hours"] * 3600
+    feedback_handler = FeedbackDataHandler()
+    state = load_state(STATE_FILE)
+    logger.info(f"Mode démon: vérification toutes les {config['scheduler']['check_interval_hours']}h, "
+                f"état: {STATE_FILE}")
+    
+    while not stop.is_set():
+        try:
+            delta = update_counters(state, feedback_handler, config)
+            save_state(state, STATE_FILE)
+            should_retrain, reason = daemon_should_retrain(state, config, datetime.now())
+            stats = counters_to_stats(state)
+            logger.info(f"Nouveaux feedbacks: {delta['total_feedback']}, depuis le dernier ré-entraînement: {stats}")
+            logger.info(f"Ré-entraînement nécessaire: {'OUI' if should_retrain else 'NON'} ({reason})")
+            
+            if should_retrain and not args.check_only:
+                if args.dry_run:
+                    results = {
+                        "status": "simulated",
+                        "reason": "Mode simulation",
+                        "timestamp": datetime.now().isoformat()
+                    }
+                else:
+                    results = execute_retraining(config, logger)
+                    if results.get("status") == "completed":
+                        # Les feedbacks comptés ont servi: nouveau départ des compteurs
+                        state["since_retrain"] = {key: 0 for key in state["since_retrain"]}
+                        state["last_retrain"] = datetime.now().isoformat()
+                        save_state(state, STATE_FILE)
+                save_execution_log(results, config)
+        except Exception as e:
+            # Base indisponible, etc.: nouvelle tentative au prochain intervalle
+            logger.error(f"Erreur lors de la vérification: {e}")
+        
+        stop.wait(interval_seconds)
+    
+    logger.info("=== ARRÊT DU DÉMON ===")
+
+
 def main():
     """Fonction principale du planificateur."""
     parser = argparse.ArgumentParser(
@@ -181,6 +574,12 @@ def main():
         help="Vérifier seulement les conditions sans exécuter le ré-entraînement"
     )
     
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Rester actif et vérifier les conditions à chaque check_interval_hours"
+    )
+    
     args = parser.parse_args()
     
     # Charger la configuration
@@ -193,6 +592,10 @@ def main():
     logger.info("=== DÉMARRAGE DU PLANIFICATEUR DE RÉ-ENTRAÎNEMENT ===")
     logger.info(f"Configuration: {config}")
     
+    if args.daemon:
+        run_daemon(config, args, logger)
+        return
+    
     try:
         # Vérifier les conditions de ré-entraînement
         should_retrain, stats = check_retrain_conditions(config)
@@ -2,6 +2,7 @@
 """Script d'entraînement du modèle"""
 
 import sys
+import argparse
 from pathlib import Path
 
 # Ajouter le répertoire racine au path
@@ -11,12 +12,37 @@ sys.path.insert(0, str(ROOT_DIR))
 from src.models.trainer import CatDogTrainer
 
 def main():
+    parser = argparse.ArgumentParser(description="Entraînement du modèle Cats vs Dogs")
+    parser.add_argument("--epochs", type=int, default=None,
+                        help="Nombre d'epochs (défaut: MODEL_CONFIG)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Taille de lot (par worker en multi-worker, défaut: MODEL_CONFIG)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profiler l'entraînement (débit, durée des steps, attente du pipeline, mémoire)")
+    parser.add_argument("--trace-steps", type=int, nargs=2, metavar=("DEBUT", "FIN"),
+                        help="Capturer une trace du profiler TensorFlow entre deux steps")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre un entraînement interrompu depuis son dernier checkpoint")
+    parser.add_argument("--head-only", action="store_true",
+                        help="Ré-entraîner la tête seule du modèle actuel sur les embeddings en cache")
+    args = parser.parse_args()
+    
     print("Début de l'entraînement du modèle Cats vs Dogs")
     
-    trainer = CatDogTrainer()
-    model, history = trainer.train()
+    overrides = {"epochs": args.epochs, "batch_size": args.batch_size}
+    trainer = CatDogTrainer(**{key: value for key, value in overrides.items() if value})
+    if args.head_only:
+        model, history = trainer.train_head(epochs=args.epochs)
+        print("Ré-entraînement de la tête terminé avec succès!")
+        return
+    
+    model, history = trainer.train(
+        profile=args.profile,
+        trace_steps=tuple(args.trace_steps) if args.trace_steps else None,
+        resume=args.resume,
+    )
     
     print("Entraînement terminé avec succès!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
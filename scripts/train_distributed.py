@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Entraînement data-parallèle multi-worker sur une machine (ou plusieurs).
+
+Lance N processus scripts/train.py configurés pour une
+MultiWorkerMirroredStrategy (TF_CONFIG, DISTRIBUTE_STRATEGY=multi_worker).
+Les données sont préparées une seule fois par le lanceur avant le
+démarrage des workers, qui les lisent sans les préparer à nouveau
+(DATA_PREPARED=true). Le worker 0 est le chef: sa sortie est affichée,
+celle des autres est écrite dans TEMP_DIR/workers/worker_<i>.log.
+
+Avec --scaling, l'entraînement est répété pour plusieurs nombres de
+workers (modèles et checkpoints dans des répertoires temporaires) et un
+rapport de passage à l'échelle est produit.
+
+Usage:
+    python scripts/train_distributed.py --workers 2 [--epochs 3] [--resume]
+    python scripts/train_distributed.py --scaling 1 2 4 [--epochs 1] [--batch-size 32]
+"""
+
+import sys
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG, MODELS_DIR, TEMP_DIR
+from src.models.distributed import make_tf_config
+
+
+def free_ports(count: int) -> list:
+    """Ports TCP libres sur localhost pour les workers."""
+    sockets = []
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("localhost", 0))
+        sockets.append(sock)
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets:
+        sock.close()
+    return ports
+
+
+def prepare_data_once():
+    """Staging, nettoyage et conversions avant le démarrage des workers."""
+    from src.models.trainer import CatDogTrainer
+    CatDogTrainer().prepare_sources()
+
+
+def run_workers(num_workers: int, train_args: list, extra_env: dict = None) -> int:
+    """Lance les workers locaux et attend leur fin; retourne le code de sortie du chef."""
+    ports = free_ports(num_workers)
+    log_dir = TEMP_DIR / "workers"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    # Les workers se partagent les cœurs de la machine
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ, **(extra_env or {}))
+        env.update({
+            "DISTRIBUTE_STRATEGY": "multi_worker",
+            # Données préparées par prepare_data_once(): lecture seule dans les workers
+            "DATA_PREPARED": "true",
+            "TF_CONFIG": make_tf_config(num_workers, index, ports),
+            "TF_NUM_INTRAOP_THREADS": str(threads),
+            "TF_NUM_INTEROP_THREADS": "1",
+        })
+        command = [sys.executable, str(ROOT_DIR / "scripts" / "train.py"), *train_args]
+        if index == 0:
+            processes.append((subprocess.Popen(command, env=env), None))
+        else:
+            log_file = open(log_dir / f"worker_{index}.log", 'w')
+            processes.append((subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT), log_file))
+
+    return_codes = []
+    for process, log_file in processes:
+        return_codes.append(process.wait())
+        if log_file:
+            log_file.close()
+
+    if any(return_codes[1:]):
+        print(f"Workers en erreur: {[i for i, code in enumerate(return_codes) if code]} (voir {log_dir})")
+    return return_codes[0] or max(return_codes)
+
+
+def scaling_report(worker_counts: list, epochs: int, batch_size: int) -> dict:
+    """Entraîne avec chaque nombre de workers et compare débits et durées."""
+    runs = []
+    for num_workers in worker_counts:
+        run_dir = TEMP_DIR / "scaling" / f"{num_workers}_workers"
+        if run_dir.exists():
+            shutil.rmtree(run_dir)
+        models_dir = run_dir / "models"
+        models_dir.mkdir(parents=True)
+
+        print(f"\n=== {num_workers} worker(s) ===")
+        start = time.perf_counter()
+        code = run_workers(
+            num_workers,
+            ["--epochs", str(epochs), "--batch-size", str(batch_size), "--profile"],
+            {"MODELS_DIR": str(models_dir), "CHECKPOINT_DIR": str(run_dir / "checkpoints")},
+        )
+        elapsed = time.perf_counter() - start
+
+        profiles = sorted(models_dir.glob("training_profile_*.json"))
+        profile = json.loads(profiles[-1].read_text()) if profiles else {}
+        # Dernière epoch: hors compilation et remplissage du cache
+        last_epoch = (profile.get("epochs") or [{}])[-1]
+        runs.append({
+            "workers": num_workers,
+            "status": "ok" if code == 0 else f"exit {code}",
+            "global_batch_size": profile.get("batch_size"),
+            "wall_seconds": round(elapsed, 2),
+            "train_seconds": profile.get("total_seconds"),
+            "images_per_sec": last_epoch.get("images_per_sec"),
+            "step_time_ms": last_epoch.get("step_time_ms"),
+        })
+
+    baseline = next((run for run in runs if run["images_per_sec"]), None)
+    for run in runs:
+        if baseline and run["images_per_sec"]:
+            speedup = run["images_per_sec"] / baseline["images_per_sec"]
+            run["speedup"] = round(speedup, 2)
+            run["efficiency"] = round(speedup * baseline["workers"] / run["workers"], 2)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "cpu_count": os.cpu_count(),
+        "per_worker_batch_size": batch_size,
+        "epochs": epochs,
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement multi-worker (MultiWorkerMirroredStrategy)")
+    parser.add_argument("--workers", type=int, default=2, help="Nombre de workers locaux (défaut: 2)")
+    parser.add_argument("--epochs", type=int, default=None, help="Nombre d'epochs (défaut: MODEL_CONFIG)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help=f"Taille de lot par worker (défaut: {MODEL_CONFIG['batch_size']})")
+    parser.add_argument("--resume", action="store_true", help="Reprendre depuis le dernier checkpoint")
+    parser.add_argument("--profile", action="store_true", help="Profiler l'entraînement (chef)")
+    parser.add_argument("--scaling", type=int, nargs="+", metavar="N",
+                        help="Rapport de passage à l'échelle pour ces nombres de workers (ex: 1 2 4)")
+    args = parser.parse_args()
+
+    print("Préparation des données (une seule fois pour tous les workers)...")
+    prepare_data_once()
+
+    if args.scaling:
+        report = scaling_report(args.scaling, args.epochs or 1, args.batch_size or MODEL_CONFIG["batch_size"])
+        print("\n=== PASSAGE À L'ÉCHELLE ===")
+        print(f"{'workers':>8} {'lot global':>11} {'durée (s)':>10} {'images/s':>10} {'accélération':>13} {'efficacité':>11}")
+        for run in report["runs"]:
+            print(f"{run['workers']:>8} {str(run['global_batch_size']):>11} {run['wall_seconds']:>10.1f} "
+                  f"{str(run['images_per_sec']):>10} {str(run.get('speedup', '-')):>13} "
+                  f"{str(run.get('efficiency', '-')):>11}  {run['status']}")
+
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        report_path = MODELS_DIR / f"distributed_scaling_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRapport sauvegardé: {report_path}")
+        return
+
+    train_args = []
+    if args.epochs:
+        train_args += ["--epochs", str(args.epochs)]
+    if args.batch_size:
+        train_args += ["--batch-size", str(args.batch_size)]
+    if args.resume:
+        train_args.append("--resume")
+    if args.profile:
+        train_args.append("--profile")
+
+    print(f"Lancement de {args.workers} workers...")
+    sys.exit(run_workers(args.workers, train_args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 import sys
@@ -6,7 +7,7 @@ from pathlib import Path
 import time
 from enum import Enum
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import importlib
 
 # Ajouter le répertoire racine au path
@@ -15,8 +16,12 @@ sys.path.insert(0, str(ROOT_DIR))
 
 from .auth import verify_token
 from src.models.predictor import CatDogPredictor
-from src.monitoring.metrics import time_inference, log_inference_time, read_last_inference_metrics
-from config.settings import DB_CONFIG, API_CONFIG
+from src.monitoring.metrics import (
+    MODEL_VERSION_HEADER, time_inference, log_inference_time, read_last_inference_metrics, summarize_by_version,
+)
+from src.monitoring.shadow import create_shadow_evaluator
+from src.data.image_store import IMAGE_HASH_PATTERN
+from config.settings import DB_CONFIG, API_CONFIG, IMAGE_STORE_CONFIG
 
 # Configuration des templates
 TEMPLATES_DIR = ROOT_DIR / "src" / "web" / "templates"
@@ -27,6 +32,15 @@ router = APIRouter()
 # Initialisation du prédicteur
 predictor = CatDogPredictor()
 
+# Stockage optionnel des images envoyées (pour le ré-entraînement)
+image_store = None
+if IMAGE_STORE_CONFIG["enabled"]:
+    from src.data.image_store import ImageBlobStore
+    image_store = ImageBlobStore()
+
+# Évaluation en ombre d'un modèle candidat (optionnelle, en arrière-plan)
+shadow_evaluator = create_shadow_evaluator()
+
 @router.get("/", response_class=HTMLResponse)
 async def welcome(request: Request):
     """Page d'accueil avec interface web"""
@@ -73,9 +87,19 @@ async def predict_api(
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Format d'image invalide")
     
+    # Version choisie avant l'appel: un échec est aussi attribué à cette version
+    version = predictor.route()
     try:
         image_data = await file.read()
-        result = predictor.predict(image_data)
+        start_time = time.perf_counter()
+        # Calculs et E/S synchrones hors de la boucle d'événements
+        result = await run_in_threadpool(predictor.predict, image_data, version)
+        production_ms = (time.perf_counter() - start_time) * 1000
+        
+        if shadow_evaluator is not None:
+            shadow_evaluator.submit(image_data, result["raw_score"], production_ms,
+                                    served_version=result["model_version"],
+                                    production_version=predictor.version)
         
         response_data = {
             "filename": file.filename,
@@ -84,13 +108,22 @@ async def predict_api(
             "probabilities": {
                 "cat": f"{result['probabilities']['cat']:.2%}",
                 "dog": f"{result['probabilities']['dog']:.2%}"
-            }
+            },
+            "model_version": result["model_version"]
         }
         
+        if image_store is not None:
+            try:
+                response_data["image_hash"] = await run_in_threadpool(image_store.put, image_data)
+            except Exception as e:
+                # Le stockage ne doit pas faire échouer la prédiction
+                print(f"Erreur lors du stockage de l'image: {e}")
+        
         return response_data
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur de prédiction: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur de prédiction: {str(e)}",
+                            headers={MODEL_VERSION_HEADER: version})
 
 @router.get("/api/info")
 async def api_info():
@@ -99,9 +132,22 @@ async def api_info():
         "model_loaded": predictor.is_loaded(),
         "model_path": str(predictor.model_path),
         "version": "1.0.0",
-        "parameters": predictor.model.count_params() if predictor.is_loaded() else 0
+        "parameters": predictor.model.count_params() if predictor.is_loaded() else 0,
+        "model_version": predictor.version,
+        "precision": predictor.precision,
+        "canary": {
+            "model_version": predictor.canary_version,
+            "percent": predictor.canary_percent if predictor.canary_version else 0
+        }
     }
 
+@router.get("/api/shadow/summary")
+async def shadow_summary():
+    """Accord et latences du modèle candidat évalué en ombre."""
+    if shadow_evaluator is None:
+        return {"enabled": False}
+    return shadow_evaluator.summary()
+
 @router.get("/health")
 async def health_check():
     """Vérification de l'état de l'API"""
@@ -115,11 +161,22 @@ class FeedbackType(str, Enum):
     negative = "negative"
 
 
+class PredictedClass(str, Enum):
+    cat = "cat"
+    dog = "dog"
+
+
 class FeedbackRequest(BaseModel):
     feedback: FeedbackType
+    # Confiance de la classe prédite (toujours >= 0.5): ne donne pas la classe
     resultat_prediction: float
     input_user: str
     filename: Optional[str] = None
+    # Colonnes VARCHAR(64); le hash sert aussi de chemin dans le magasin d'images
+    image_hash: Optional[str] = Field(None, pattern=IMAGE_HASH_PATTERN)
+    model_version: Optional[str] = Field(None, max_length=64)
+    # Classe prédite, confirmée ou infirmée par le feedback (label de ré-entraînement)
+    predicted_class: Optional[PredictedClass] = None
 
 
 class FeedbackResponse(BaseModel):
@@ -168,8 +225,8 @@ async def feedback_api(payload: FeedbackRequest, token: str = Depends(verify_tok
 
                 cur.execute(
                     """
-                    INSERT INTO feedback_user (feedback, date_feedback, resultat_prediction, input_user, inference_time_ms, success)
-                    VALUES (%s, CURRENT_DATE, %s, %s, %s, %s)
+                    INSERT INTO feedback_user (feedback, date_feedback, resultat_prediction, input_user, inference_time_ms, success, image_hash, model_version, predicted_class)
+                    VALUES (%s, CURRENT_DATE, %s, %s, %s, %s, %s, %s, %s)
                     RETURNING id_feedback_user
                     """,
                     (
@@ -178,6 +235,9 @@ async def feedback_api(payload: FeedbackRequest, token: str = Depends(verify_tok
                         payload.input_user,
                         inference_time_ms,
                         success,
+                        payload.image_hash,
+                        payload.model_version,
+                        payload.predicted_class.value if payload.predicted_class else None,
                     ),
                 )
                 feedback_id = cur.fetchone()[0]
@@ -300,5 +360,53 @@ async def metrics_7d():
         raise HTTPException(status_code=500, detail=f"Erreur métriques: {e}")
 
 
+@router.get("/api/metrics/versions")
+async def metrics_versions():
+    """Comparaison par version de modèle (production / canari): latences et feedback."""
+    versions = summarize_by_version()
+
+    # Taux de feedback par version (optionnel: la base peut être indisponible)
+    try:
+        try:
+            dbmod = importlib.import_module("psycopg")
+            connect = dbmod.connect
+        except Exception:
+            dbmod = importlib.import_module("psycopg2")
+            connect = dbmod.connect
+
+        query = (
+            """
+            SELECT
+              model_version,
+              SUM(CASE WHEN feedback IS TRUE THEN 1 ELSE 0 END) AS feedback_pos,
+              SUM(CASE WHEN feedback IS FALSE THEN 1 ELSE 0 END) AS feedback_neg
+            FROM Feedback_user
+            WHERE model_version IS NOT NULL
+            GROUP BY model_version
+            """
+        )
 
+        with connect(
+            host=DB_CONFIG["host"],
+            port=DB_CONFIG["port"],
+            dbname=DB_CONFIG["dbname"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+        ) as conn:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                for version, feedback_pos, feedback_neg in cur.fetchall():
+                    item = versions.setdefault(version, {})
+                    total = int(feedback_pos) + int(feedback_neg)
+                    item["feedback_pos"] = int(feedback_pos)
+                    item["feedback_neg"] = int(feedback_neg)
+                    item["feedback_pos_rate"] = round(int(feedback_pos) / total, 4) if total else None
+    except Exception as e:
+        print(f"Feedback par version indisponible: {e}")
 
+    return {
+        "production": predictor.version,
+        "canary": predictor.canary_version,
+        "canary_percent": predictor.canary_percent if predictor.canary_version else 0,
+        "versions": versions,
+    }
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Augmentation de données dans le pipeline tf.data (sur les workers CPU).
+
+Reproduit RandomFlip("horizontal"), RandomRotation(0.1) et RandomZoom(0.1)
+du modèle avec des opérations sans état (stateless): chaque lot reçoit une
+graine dérivée de la graine globale, si bien que l'augmentation est
+reproductible d'une exécution à l'autre tout en s'exécutant en parallèle
+(num_parallel_calls=AUTOTUNE).
+"""
+
+import math
+
+import tensorflow as tf
+
+ROTATION_FACTOR = 0.1  # fraction de 2π, comme RandomRotation(0.1)
+ZOOM_FACTOR = 0.1      # comme RandomZoom(0.1)
+
+
+def _rotation_zoom_transforms(batch_size, height, width, seed):
+    """Matrices projectives (sortie -> entrée) rotation puis zoom, format ImageProjectiveTransformV3."""
+    rotation_seed, zoom_seed = tf.unstack(tf.random.experimental.stateless_split(seed, 2))
+    angles = tf.random.stateless_uniform(
+        [batch_size], rotation_seed,
+        minval=-ROTATION_FACTOR * 2 * math.pi, maxval=ROTATION_FACTOR * 2 * math.pi,
+    )
+    zooms = 1.0 + tf.random.stateless_uniform(
+        [batch_size], zoom_seed, minval=-ZOOM_FACTOR, maxval=ZOOM_FACTOR,
+    )
+
+    h = tf.cast(height, tf.float32) - 1.0
+    w = tf.cast(width, tf.float32) - 1.0
+    cos, sin = tf.cos(angles), tf.sin(angles)
+    zeros, ones = tf.zeros_like(angles), tf.ones_like(angles)
+
+    # Rotation autour du centre (mêmes conventions que RandomRotation)
+    rotation = tf.reshape(tf.stack([
+        cos, -sin, (w - (cos * w - sin * h)) / 2.0,
+        sin, cos, (h - (sin * w + cos * h)) / 2.0,
+        zeros, zeros, ones,
+    ], axis=1), [-1, 3, 3])
+    # Zoom centré (même facteur en hauteur et largeur, comme RandomZoom)
+    zoom = tf.reshape(tf.stack([
+        zooms, zeros, w / 2.0 * (1.0 - zooms),
+        zeros, zooms, h / 2.0 * (1.0 - zooms),
+        zeros, zeros, ones,
+    ], axis=1), [-1, 3, 3])
+
+    # L'image finale est zoom(rotation(image)): coordonnées d'entrée = R·Z·sortie
+    combined = tf.matmul(rotation, zoom)
+    return tf.reshape(combined, [-1, 9])[:, :8]
+
+
+def augment_batch(images, seed):
+    """Augmente un lot d'images float32 (B, H, W, 3) avec une graine [2] int64."""
+    flip_seed, transform_seed = tf.unstack(tf.random.experimental.stateless_split(seed, 2))
+    shape = tf.shape(images)
+    batch_size, height, width = shape[0], shape[1], shape[2]
+
+    flip = tf.random.stateless_uniform([batch_size], flip_seed) < 0.5
+    images = tf.where(flip[:, None, None, None], tf.image.flip_left_right(images), images)
+
+    transforms = _rotation_zoom_transforms(batch_size, height, width, transform_seed)
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=tf.stack([height, width]),
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="REFLECT",
+    )
+
+
+def apply_augmentation(dataset, seed: int = 1337):
+    """
+    Applique l'augmentation à un dataset de lots (images, labels).
+
+    Les graines par lot proviennent de tf.data.Dataset.random(seed), retirées
+    à chaque epoch: reproductible pour une graine donnée, différente d'une
+    epoch à l'autre.
+    """
+    seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True).batch(2)
+    return (
+        tf.data.Dataset.zip((dataset, seeds))
+        .map(
+            lambda batch, batch_seed: (augment_batch(batch[0], batch_seed), batch[1]),
+            num_parallel_calls=tf.data.AUTOTUNE,
+        )
+        .prefetch(buffer_size=tf.data.AUTOTUNE)
+    )
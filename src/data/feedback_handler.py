@@ -4,9 +4,10 @@ Gestionnaire des données de feedback pour le ré-entraînement du modèle.
 """
 
 import sys
+import random
 from pathlib import Path
 import importlib
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Iterable, Set
 from datetime import datetime, timedelta
 import numpy as np
 from PIL import Image
@@ -17,7 +18,26 @@ import base64
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from config.settings import DB_CONFIG, MODEL_CONFIG
+from config.settings import DB_CONFIG, MODEL_CONFIG, IMAGE_STORE_CONFIG
+
+
+def reservoir_sample(items: Iterable, k: int, seed: int = 1337) -> list:
+    """
+    Échantillon uniforme de `k` éléments en un seul passage (algorithme R).
+    
+    La mémoire utilisée est bornée par `k`, quelle que soit la taille de
+    `items`; l'ordre de l'échantillon n'est pas significatif.
+    """
+    rng = random.Random(seed)
+    reservoir = []
+    for index, item in enumerate(items):
+        if index < k:
+            reservoir.append(item)
+        else:
+            slot = rng.randint(0, index)
+            if slot < k:
+                reservoir[slot] = item
+    return reservoir
 
 
 class FeedbackDataHandler:
@@ -27,6 +47,15 @@ class FeedbackDataHandler:
         self.db_config = DB_CONFIG
         self.image_size = MODEL_CONFIG["image_size"]
         self._connect_db = self._get_db_connection()
+        self._image_store = None
+    
+    @property
+    def image_store(self):
+        """Magasin des images envoyées à l'API (chargé à la demande)."""
+        if self._image_store is None and IMAGE_STORE_CONFIG["root"].exists():
+            from src.data.image_store import ImageBlobStore
+            self._image_store = ImageBlobStore(image_size=self.image_size)
+        return self._image_store
     
     def _get_db_connection(self):
         """Récupère la fonction de connexion à la base de données."""
@@ -60,7 +89,9 @@ class FeedbackDataHandler:
             resultat_prediction,
             input_user,
             inference_time_ms,
-            success
+            success,
+            image_hash,
+            predicted_class
         FROM Feedback_user 
         WHERE date_feedback >= %s
         AND resultat_prediction >= %s
@@ -143,75 +174,265 @@ class FeedbackDataHandler:
         
         return {}
     
+    def get_feedback_counts_since(self, last_id: int = 0, days_back: int = 30) -> Dict[str, int]:
+        """
+        Compte les feedbacks arrivés après `last_id` (identifiant croissant).
+
+        Requête incrémentale, par la clé primaire: seules les nouvelles
+        lignes sont lues, quelle que soit la taille de la table.
+
+        Args:
+            last_id: Dernier identifiant déjà compté (0: tout le dernier intervalle)
+            days_back: Ancienneté maximale des feedbacks comptés
+
+        Returns:
+            Dictionnaire {last_id, total_feedback, positive_feedback, negative_feedback}
+        """
+        query = """
+        SELECT 
+            COALESCE(MAX(id_feedback_user), %s) as last_id,
+            COUNT(*) as total_feedback,
+            SUM(CASE WHEN feedback = true THEN 1 ELSE 0 END) as positive_feedback,
+            SUM(CASE WHEN feedback = false THEN 1 ELSE 0 END) as negative_feedback
+        FROM Feedback_user 
+        WHERE id_feedback_user > %s
+        AND date_feedback >= %s
+        """
+        
+        cutoff_date = datetime.now().date() - timedelta(days=days_back)
+        
+        with self._connect_db(
+            host=self.db_config["host"],
+            port=self.db_config["port"],
+            dbname=self.db_config["dbname"],
+            user=self.db_config["user"],
+            password=self.db_config["password"],
+        ) as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, (last_id, last_id, cutoff_date))
+                row = cur.fetchone()
+        
+        return {
+            'last_id': int(row[0]),
+            'total_feedback': int(row[1] or 0),
+            'positive_feedback': int(row[2] or 0),
+            'negative_feedback': int(row[3] or 0),
+        }
+    
     def prepare_training_data_from_feedback(self, 
                                           feedback_data: List[Dict[str, Any]],
-                                          data_dir: Path) -> Tuple[np.ndarray, np.ndarray]:
+                                          data_dir: Path,
+                                          batch_size: Optional[int] = None,
+                                          shuffle_buffer: int = 1000):
         """
-        Prépare les données d'entraînement à partir des feedbacks.
+        Prépare un pipeline tf.data paresseux à partir des feedbacks.
+        
+        Les images du répertoire sont lues une par une (sans matérialiser le
+        dataset en mémoire) puis entrelacées avec les échantillons issus des
+        feedbacks négatifs, au prorata de leurs tailles respectives.
         
         Args:
             feedback_data: Données de feedback
             data_dir: Répertoire de données existant
+            batch_size: Taille des lots (défaut: MODEL_CONFIG["batch_size"])
+            shuffle_buffer: Taille du tampon de mélange
             
         Returns:
-            Tuple (images, labels) pour l'entraînement
+            tf.data.Dataset de lots (images, labels) pour l'entraînement
         """
-        images = []
-        labels = []
-        
-        # Charger les données existantes
         import tensorflow as tf
-        train_ds, _ = tf.keras.utils.image_dataset_from_directory(
+        AUTOTUNE = tf.data.AUTOTUNE
+        batch_size = batch_size or MODEL_CONFIG["batch_size"]
+        
+        # Données existantes, non batchées: le décodage est fait à la demande
+        train_ds = tf.keras.utils.image_dataset_from_directory(
             data_dir,
             validation_split=0.2,
             subset="training",
             seed=1337,
             image_size=self.image_size,
-            batch_size=1,  # Un par un pour traiter les feedbacks
+            batch_size=None,
+        )
+        train_ds = train_ds.map(
+            lambda image, label: (image, tf.cast(label, tf.int32)),
+            num_parallel_calls=AUTOTUNE,
         )
         
-        # Convertir en listes pour manipulation
-        existing_images = []
-        existing_labels = []
+        # Traiter les feedbacks négatifs comme données d'entraînement supplémentaires
+        feedback_samples = self._feedback_samples(feedback_data)
+        print(f"Traitement de {len(feedback_samples)} feedbacks négatifs...")
+        stored = sum(1 for _, _, image_hash in feedback_samples if image_hash)
+        if feedback_samples and stored < len(feedback_samples):
+            print(f"{len(feedback_samples) - stored} feedbacks sans image stockée (image synthétique utilisée)")
         
-        for batch_images, batch_labels in train_ds:
-            for img, label in zip(batch_images, batch_labels):
-                existing_images.append(img.numpy())
-                existing_labels.append(label.numpy())
+        if feedback_samples:
+            feedback_ds = tf.data.Dataset.from_generator(
+                lambda: self._iter_feedback_images(feedback_samples),
+                output_signature=(
+                    tf.TensorSpec(shape=(*self.image_size, 3), dtype=tf.float32),
+                    tf.TensorSpec(shape=(), dtype=tf.int32),
+                ),
+            )
+            
+            # Entrelacement proportionnel: les feedbacks sont répartis sur tout l'epoch
+            existing_count = int(train_ds.cardinality())
+            if existing_count <= 0:
+                existing_count = len(feedback_samples)
+            total = existing_count + len(feedback_samples)
+            dataset = tf.data.Dataset.sample_from_datasets(
+                [train_ds, feedback_ds],
+                weights=[existing_count / total, len(feedback_samples) / total],
+                seed=1337,
+                stop_on_empty_dataset=False,
+            )
+        else:
+            dataset = train_ds
         
-        # Ajouter les données existantes
-        images.extend(existing_images)
-        labels.extend(existing_labels)
+        return (
+            dataset
+            .shuffle(shuffle_buffer, seed=1337)
+            .batch(batch_size)
+            .prefetch(buffer_size=AUTOTUNE)
+        )
+    
+    def prepare_incremental_data(self,
+                                 feedback_data: List[Dict[str, Any]],
+                                 data_path: Path,
+                                 consumed_ids: Set[Any],
+                                 replay_size: int,
+                                 batch_size: Optional[int] = None,
+                                 seed: int = 1337):
+        """
+        Prépare le dataset d'un ré-entraînement incrémental.
         
-        # Traiter les feedbacks négatifs comme données d'entraînement supplémentaires
-        negative_feedbacks = [f for f in feedback_data if not f['feedback']]
+        Seuls les feedbacks pas encore intégrés au modèle (absents de
+        `consumed_ids`) et dont l'image est stockée sont utilisés: négatifs
+        avec le label corrigé, positifs avec le label confirmé. Ils sont
+        mélangés à un échantillon de rejeu de `replay_size` images du
+        découpage d'entraînement du dataset de base, tiré par réservoir,
+        pour limiter l'oubli des données d'origine.
         
-        print(f"Traitement de {len(negative_feedbacks)} feedbacks négatifs...")
+        Args:
+            feedback_data: Données de feedback
+            data_path: Répertoire du dataset de base (nettoyé)
+            consumed_ids: Identifiants des feedbacks déjà intégrés
+            replay_size: Nombre d'images de rejeu du dataset de base
+            batch_size: Taille des lots (défaut: MODEL_CONFIG["batch_size"])
+            seed: Graine du tirage et du mélange
+            
+        Returns:
+            Tuple (dataset de lots (images, labels), ids des feedbacks utilisés,
+            nombre d'images de rejeu)
+        """
+        import tensorflow as tf
+        from src.data.shards import list_labeled_files
+        AUTOTUNE = tf.data.AUTOTUNE
+        batch_size = batch_size or MODEL_CONFIG["batch_size"]
+        image_size = self.image_size
         
-        for feedback in negative_feedbacks:
-            try:
-                # Pour les feedbacks négatifs, on inverse la prédiction
-                # Si le modèle a prédit "dog" avec confiance élevée mais c'était "cat"
-                predicted_class = "dog" if feedback['resultat_prediction'] > 0.5 else "cat"
-                correct_class = "cat" if predicted_class == "dog" else "dog"
-                
-                # Créer une image synthétique basée sur la classe correcte
-                # (Dans un vrai système, on aurait l'image originale)
-                synthetic_image = self._create_synthetic_image(correct_class)
-                
-                images.append(synthetic_image)
-                labels.append(1 if correct_class == "dog" else 0)  # 1 pour dog, 0 pour cat
-                
-            except Exception as e:
-                print(f"Erreur lors du traitement du feedback {feedback['id_feedback_user']}: {e}")
-                continue
+        new_feedback = [f for f in feedback_data if f['id_feedback_user'] not in consumed_ids]
+        store = self.image_store
+        samples = [
+            sample for sample in self._feedback_samples(new_feedback, include_positive=True)
+            if store is not None and store.exists(sample[2])
+        ]
+        print(f"{len(samples)} nouveaux feedbacks avec image "
+              f"({len(feedback_data) - len(new_feedback)} déjà intégrés)")
+        if not samples:
+            return None, [], 0
+        
+        # Même découpage que les backends shards/mmap: la validation reste inédite
+        train_files, _ = list_labeled_files(data_path, validation_split=0.2, seed=seed)
+        replay = reservoir_sample(train_files, replay_size, seed=seed)
+        print(f"Rejeu de {len(replay)} images du dataset de base")
+        
+        def decode(path, label):
+            image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+            image = tf.image.resize(image, image_size)
+            image.set_shape((*image_size, 3))
+            return image, label
+        
+        feedback_ds = tf.data.Dataset.from_generator(
+            lambda: self._iter_feedback_images(samples),
+            output_signature=(
+                tf.TensorSpec(shape=(*image_size, 3), dtype=tf.float32),
+                tf.TensorSpec(shape=(), dtype=tf.int32),
+            ),
+        ).apply(tf.data.experimental.assert_cardinality(len(samples)))
+        
+        dataset = feedback_ds
+        if replay:
+            replay_ds = tf.data.Dataset.from_tensor_slices((
+                tf.constant([str(fpath) for fpath, _ in replay], dtype=tf.string),
+                tf.constant([label for _, label in replay], dtype=tf.int32),
+            )).map(decode, num_parallel_calls=AUTOTUNE)
+            dataset = replay_ds.concatenate(feedback_ds)
+        
+        dataset = (
+            dataset
+            .shuffle(len(samples) + len(replay), seed=seed)
+            .batch(batch_size)
+            .prefetch(buffer_size=AUTOTUNE)
+        )
+        return dataset, [sample[0] for sample in samples], len(replay)
+    
+    def _feedback_samples(self,
+                          feedback_data: List[Dict[str, Any]],
+                          include_positive: bool = False) -> List[Tuple[Any, int, Optional[str]]]:
+        """
+        Extrait (id_feedback, label corrigé, hash de l'image) des feedbacks négatifs.
+        
+        Pour les feedbacks négatifs, on inverse la classe prédite: si le modèle a
+        prédit "dog" mais que l'utilisateur l'a infirmé, le label est "cat".
+        Avec `include_positive`, les feedbacks positifs sont aussi retenus,
+        avec le label prédit (confirmé par l'utilisateur).
         
-        return np.array(images), np.array(labels)
+        La classe prédite est lue dans `predicted_class`: `resultat_prediction`
+        est la confiance de la classe prédite (>= 0.5 pour un chat comme pour
+        un chien) et ne permet pas de la retrouver. Les feedbacks sans classe
+        enregistrée (antérieurs à la colonne) sont ignorés.
+        """
+        samples = []
+        skipped = 0
+        for feedback in feedback_data:
+            if feedback['feedback'] and not include_positive:
+                continue
+            predicted_class = feedback.get('predicted_class')
+            if predicted_class not in ("cat", "dog"):
+                skipped += 1
+                continue
+            if feedback['feedback']:
+                correct_class = predicted_class
+            else:
+                correct_class = "cat" if predicted_class == "dog" else "dog"
+            samples.append((
+                feedback['id_feedback_user'],
+                1 if correct_class == "dog" else 0,  # 1 pour dog, 0 pour cat
+                feedback.get('image_hash'),
+            ))
+        if skipped:
+            print(f"{skipped} feedbacks ignorés: classe prédite non enregistrée")
+        return samples
+    
+    def _iter_feedback_images(self, feedback_samples: List[Tuple[Any, int, Optional[str]]]):
+        """Générateur (image, label) pour les échantillons issus des feedbacks."""
+        store = self.image_store
+        for feedback_id, label, image_hash in feedback_samples:
+            if store is not None and store.exists(image_hash):
+                try:
+                    yield store.load_array(image_hash).astype(np.float32), label
+                    continue
+                except Exception as e:
+                    print(f"Image illisible pour le feedback {feedback_id}: {e}")
+            
+            # Image originale indisponible: image synthétique de la classe correcte
+            class_name = "dog" if label == 1 else "cat"
+            yield self._create_synthetic_image(class_name), label
     
     def _create_synthetic_image(self, class_name: str) -> np.ndarray:
         """
         Crée une image synthétique pour la classe donnée.
-        Dans un vrai système, on récupérerait l'image originale.
+        Utilisée uniquement lorsque l'image originale n'a pas été stockée.
         """
         # Créer une image aléatoire avec des patterns différents selon la classe
         if class_name == "dog":
@@ -227,7 +448,9 @@ class FeedbackDataHandler:
             image[30:50, 30:50] = [200, 150, 100]  # Zone "museau"
             image[70:90, 70:90] = [150, 100, 75]   # Zone "corps"
         
-        return image.astype(np.float32) / 255.0
+        # Même échelle [0, 255] que image_dataset_from_directory: la
+        # normalisation est faite par la couche Rescaling du modèle
+        return image.astype(np.float32)
     
     def should_retrain(self, 
                       min_feedback_count: int = 100,
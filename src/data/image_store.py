@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Stockage des images envoyées à l'API, adressé par contenu.
+
+Chaque image est rangée sous le hash SHA-256 de ses octets d'origine:
+deux envois identiques ne produisent qu'un seul fichier, et le hash sert
+de référence dans la table Feedback_user pour retrouver l'image au
+moment du ré-entraînement.
+"""
+
+import hashlib
+import io
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import IMAGE_STORE_CONFIG, MODEL_CONFIG
+
+# Hash SHA-256 hexadécimal: seule forme de clé acceptée (pas de chemin arbitraire)
+IMAGE_HASH_PATTERN = r"^[0-9a-f]{64}$"
+
+
+class ImageBlobStore:
+    """Magasin d'images dédupliqué, clé = SHA-256 des octets envoyés."""
+
+    def __init__(self,
+                 root: Optional[Path] = None,
+                 downscale: Optional[bool] = None,
+                 image_size: Optional[Tuple[int, int]] = None):
+        self.root = Path(root or IMAGE_STORE_CONFIG["root"])
+        self.downscale = IMAGE_STORE_CONFIG["downscale"] if downscale is None else downscale
+        self.image_size = tuple(image_size or MODEL_CONFIG["image_size"])
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(image_data: bytes) -> str:
+        """Hash SHA-256 (hexadécimal) des octets d'une image."""
+        return hashlib.sha256(image_data).hexdigest()
+
+    @staticmethod
+    def is_valid_hash(image_hash: Optional[str]) -> bool:
+        return isinstance(image_hash, str) and re.fullmatch(IMAGE_HASH_PATTERN, image_hash) is not None
+
+    def path_for(self, image_hash: str) -> Path:
+        """Chemin de l'objet: objects/<2 premiers caractères>/<hash>."""
+        if not self.is_valid_hash(image_hash):
+            raise ValueError(f"Hash d'image invalide: {image_hash!r}")
+        return self.objects_dir / image_hash[:2] / image_hash
+
+    def exists(self, image_hash: Optional[str]) -> bool:
+        return self.is_valid_hash(image_hash) and self.path_for(image_hash).exists()
+
+    def put(self, image_data: bytes) -> str:
+        """
+        Enregistre une image et retourne son hash.
+
+        Si l'image est déjà présente, aucune écriture n'est faite. En mode
+        `downscale`, seule une copie JPEG à la taille du modèle est conservée.
+        """
+        image_hash = self.hash_bytes(image_data)
+        target = self.path_for(image_hash)
+        if target.exists():
+            return image_hash
+
+        payload = self._downscaled_copy(image_data) if self.downscale else image_data
+
+        # Écriture atomique: un lecteur ne voit jamais un fichier partiel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f".{image_hash}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, target)
+
+        return image_hash
+
+    def get_bytes(self, image_hash: str) -> bytes:
+        with open(self.path_for(image_hash), 'rb') as f:
+            return f.read()
+
+    def load_array(self, image_hash: str) -> np.ndarray:
+        """Charge l'image en uint8 (H, W, 3) à la taille du modèle."""
+        with Image.open(self.path_for(image_hash)) as image:
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            if image.size != self.image_size:
+                image = image.resize(self.image_size)
+            return np.asarray(image, dtype=np.uint8)
+
+    def _downscaled_copy(self, image_data: bytes) -> bytes:
+        with Image.open(io.BytesIO(image_data)) as image:
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image = image.resize(self.image_size)
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=95)
+            return buffer.getvalue()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Manifeste de validation du dataset d'images.
+
+Le manifeste est un fichier JSON rangé à côté du répertoire de données
+(`<dataset>.manifest.json`). Pour chaque image il mémorise la taille, la
+date de modification, le hash du contenu, le résultat de la vérification
+et les dimensions, de sorte que seules les images nouvelles ou modifiées
+soient revérifiées d'une exécution à l'autre.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(data_path: Path) -> Path:
+    """Chemin du manifeste associé à un répertoire de données."""
+    data_path = Path(data_path)
+    return data_path.parent / f"{data_path.name}.manifest.json"
+
+
+class ValidationManifest:
+    """Résultats de vérification indexés par chemin relatif."""
+
+    def __init__(self, data_path: Path, manifest_path: Optional[Path] = None):
+        self.data_path = Path(data_path)
+        self.path = Path(manifest_path) if manifest_path else manifest_path_for(self.data_path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self):
+        """Charge le manifeste s'il existe (un fichier illisible est ignoré)."""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data.get("entries", {})
+        except Exception as e:
+            print(f"Manifeste illisible, reconstruction complète: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Écrit le manifeste de façon atomique."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def relative(self, fpath: Path) -> str:
+        return Path(fpath).relative_to(self.data_path).as_posix()
+
+    def lookup(self, fpath: Path, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Entrée existante si la taille et la date de modification n'ont pas changé."""
+        entry = self.entries.get(self.relative(fpath))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+        return None
+
+    def update(self, fpath: Path, stat: os.stat_result, result: Dict[str, Any]):
+        self.entries[self.relative(fpath)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": result.get("sha256"),
+            "valid": bool(result.get("valid")),
+            "width": result.get("width"),
+            "height": result.get("height"),
+        }
+
+    def prune(self, present: set):
+        """
+        Retire les entrées des fichiers disparus.
+
+        Les entrées invalides sont conservées: un fichier corrompu supprimé
+        puis remis en place à l'identique est reconnu sans être relu.
+        """
+        self.entries = {
+            rel: entry for rel, entry in self.entries.items()
+            if rel in present or not entry["valid"]
+        }
+
+    def digest(self) -> str:
+        """Empreinte du contenu valide du dataset (chemins + hash des images)."""
+        h = hashlib.sha256()
+        for rel in sorted(self.entries):
+            entry = self.entries[rel]
+            if entry["valid"]:
+                h.update(f"{rel}:{entry['sha256']}\n".encode('utf-8'))
+        return h.hexdigest()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Dataset NumPy mappé en mémoire pour l'entraînement et l'évaluation.
+
+Toutes les images sont stockées dans un unique tableau uint8 de forme
+(N, H, W, 3) (`images.npy`) accompagné de `labels.npy`. Les lots sont des
+tranches contiguës lues via np.load(mmap_mode='r'): le cache de pages du
+système sert les epochs et les évaluations successives, y compris entre
+processus, sans que chacun conserve sa propre copie décodée.
+"""
+
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MMAP_DATASET_DIR
+from src.data.manifest import ValidationManifest
+from src.data.shards import list_labeled_files, load_resized
+
+META_NAME = "meta.json"
+META_VERSION = 1
+
+
+def mmap_dir_for(image_size: Tuple[int, int], root: Optional[Path] = None) -> Path:
+    """Répertoire du dataset mappé pour une taille d'image donnée."""
+    return Path(root or MMAP_DATASET_DIR) / f"{image_size[0]}x{image_size[1]}"
+
+
+def read_meta(dataset_dir: Path) -> Optional[dict]:
+    meta_path = Path(dataset_dir) / META_NAME
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if meta.get("version") == META_VERSION else None
+    except Exception:
+        return None
+
+
+def build_mmap_dataset(data_path: Path,
+                       image_size: Tuple[int, int],
+                       output_dir: Optional[Path] = None,
+                       validation_split: float = 0.2,
+                       seed: int = 1337,
+                       workers: Optional[int] = None) -> Path:
+    """
+    Écrit images.npy / labels.npy (train puis val) à partir du dataset nettoyé.
+
+    Le découpage train/val est celui de list_labeled_files, identique à
+    celui des shards TFRecord.
+    """
+    output_dir = Path(output_dir) if output_dir else mmap_dir_for(image_size)
+    tmp_dir = output_dir.with_name(f".{output_dir.name}.{os.getpid()}.tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    train_files, val_files = list_labeled_files(data_path, validation_split, seed)
+    samples = train_files + val_files
+    height, width = image_size
+
+    images = np.lib.format.open_memmap(
+        tmp_dir / "images.npy", mode='w+', dtype=np.uint8, shape=(len(samples), height, width, 3)
+    )
+    labels = np.lib.format.open_memmap(
+        tmp_dir / "labels.npy", mode='w+', dtype=np.int32, shape=(len(samples),)
+    )
+
+    def load(sample):
+        try:
+            return load_resized(sample[0], image_size)
+        except Exception as e:
+            print(f"Image ignorée {sample[0]}: {e}")
+            return None
+
+    # Les images illisibles sont sautées: on compacte au fil de l'écriture
+    cursor = 0
+    counts = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for split, split_samples in (("train", train_files), ("val", val_files)):
+            start = cursor
+            for (_, label), image in zip(split_samples, executor.map(load, split_samples)):
+                if image is None:
+                    continue
+                images[cursor] = image
+                labels[cursor] = label
+                cursor += 1
+            counts[split] = cursor - start
+    images.flush()
+    labels.flush()
+    del images, labels
+
+    meta = {
+        "version": META_VERSION,
+        "image_size": list(image_size),
+        "num_train": counts["train"],
+        "num_val": counts["val"],
+        "validation_split": validation_split,
+        "seed": seed,
+        "source_digest": ValidationManifest(data_path).digest(),
+    }
+    with open(tmp_dir / META_NAME, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    print(f"Dataset mappé écrit dans {output_dir}: {counts['train']} train, {counts['val']} val")
+    return output_dir
+
+
+def ensure_mmap_dataset(data_path: Path, image_size: Tuple[int, int], output_dir: Optional[Path] = None) -> Path:
+    """Retourne le dataset mappé à jour, en le (re)construisant si les données ont changé."""
+    output_dir = Path(output_dir) if output_dir else mmap_dir_for(image_size)
+    meta = read_meta(output_dir)
+    if (meta is not None
+            and meta["image_size"] == list(image_size)
+            and meta["source_digest"] == ValidationManifest(data_path).digest()):
+        return output_dir
+
+    print("Dataset mappé absent ou obsolète, conversion...")
+    return build_mmap_dataset(data_path, image_size, output_dir)
+
+
+class MmapDataset:
+    """Accès en lecture seule au dataset mappé (images uint8 + labels)."""
+
+    def __init__(self, dataset_dir: Path):
+        self.dataset_dir = Path(dataset_dir)
+        self.meta = read_meta(self.dataset_dir)
+        if self.meta is None:
+            raise FileNotFoundError(f"Dataset mappé introuvable dans {self.dataset_dir}")
+        self.images = np.load(self.dataset_dir / "images.npy", mmap_mode='r')
+        self.labels = np.load(self.dataset_dir / "labels.npy", mmap_mode='r')
+
+    def split(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vues (sans copie) sur les images et labels d'un split."""
+        num_train, num_val = self.meta["num_train"], self.meta["num_val"]
+        bounds = {"train": (0, num_train), "val": (num_train, num_train + num_val)}[name]
+        return self.images[bounds[0]:bounds[1]], self.labels[bounds[0]:bounds[1]]
+
+    def as_tf_dataset(self, split: str, batch_size: int, shuffle: bool = False, seed: Optional[int] = None):
+        """
+        tf.data.Dataset de lots (images float32 [0, 255], labels int32).
+
+        Chaque lot est une tranche contiguë du tableau mappé. Avec `shuffle`,
+        l'ordre des lots est mélangé à chaque epoch; l'ordre des images a
+        déjà été mélangé une fois pour toutes à la construction.
+        """
+        import tensorflow as tf
+        AUTOTUNE = tf.data.AUTOTUNE
+
+        images, labels = self.split(split)
+        height, width = self.meta["image_size"]
+        num_batches = -(-len(images) // batch_size)
+
+        def read_batch(i):
+            start = int(i) * batch_size
+            return images[start:start + batch_size], labels[start:start + batch_size]
+
+        def to_tensors(i):
+            batch_images, batch_labels = tf.numpy_function(read_batch, [i], (tf.uint8, tf.int32))
+            batch_images.set_shape([None, height, width, 3])
+            batch_labels.set_shape([None])
+            return tf.cast(batch_images, tf.float32), batch_labels
+
+        ds = tf.data.Dataset.range(num_batches)
+        if shuffle:
+            ds = ds.shuffle(num_batches, seed=seed, reshuffle_each_iteration=True)
+        ds = ds.map(to_tensors, num_parallel_calls=AUTOTUNE, deterministic=not shuffle)
+        return ds.prefetch(buffer_size=AUTOTUNE)
+
+
+def load_mmap_datasets(dataset_dir: Path, batch_size: int):
+    """Datasets (train, val) lus depuis le dataset mappé."""
+    dataset = MmapDataset(dataset_dir)
+    return (
+        dataset.as_tf_dataset("train", batch_size, shuffle=True),
+        dataset.as_tf_dataset("val", batch_size),
+    )
@@ -1,50 +1,258 @@
 import os
+import io
+import hashlib
 from PIL import Image, ImageFile
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
 import shutil
 import sys
 
 # Ajouter le répertoire config au path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from config.settings import RAW_DATA_DIR, TEMP_DIR
+from config.settings import RAW_DATA_DIR, TEMP_DIR, DATA_STAGING_MODE
+from src.data.manifest import ValidationManifest
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
-def clean_corrupted_images(data_path: Path) -> int:
-    """Nettoyage des images corrompues"""
-    num_skipped = 0
-    total_files = 0
+STAGING_MODES = ("hardlink", "reflink", "symlink", "copy")
+
+def _inspect_image(fpath: Path) -> Dict[str, Any]:
+    """
+    Vérifie qu'une image est lisible (et que l'en-tête JPEG est cohérent)
+    
+    Retourne le résultat de la vérification, le hash du contenu et les
+    dimensions, tels qu'enregistrés dans le manifeste de validation.
+    """
+    result = {"valid": False, "sha256": None, "width": None, "height": None}
+    try:
+        with open(fpath, 'rb') as f:
+            content = f.read()
+        result["sha256"] = hashlib.sha256(content).hexdigest()
+        
+        with Image.open(io.BytesIO(content)) as img:
+            result["width"], result["height"] = img.size
+            img.verify()
+        
+        if fpath.suffix.lower() in ['.jpg', '.jpeg']:
+            if not (b"JFIF" in content[:20] or b"Exif" in content[:20]):
+                raise Exception("JPEG invalide")
+                
+    except Exception:
+        return result
+    result["valid"] = True
+    return result
+
+def _verify_chunk(paths: List[Path]) -> List[Dict[str, Any]]:
+    """Vérifie un lot d'images (exécuté dans un processus du pool)"""
+    return [_inspect_image(fpath) for fpath in paths]
+
+def clean_corrupted_images(data_path: Path,
+                           workers: Optional[int] = None,
+                           chunk_size: int = 256,
+                           use_manifest: bool = True) -> int:
+    """
+    Nettoyage des images corrompues
+    
+    La vérification est répartie par lots sur un pool de processus; les
+    suppressions sont faites par le processus principal. `workers=1` force
+    l'exécution séquentielle.
+    
+    Avec `use_manifest`, les résultats sont conservés dans le manifeste de
+    validation (voir src/data/manifest.py) et seules les images nouvelles
+    ou modifiées depuis la dernière exécution sont relues.
+    """
+    manifest = ValidationManifest(data_path) if use_manifest else None
     
+    files = []
     for folder_name in ("Cat", "Dog"):
         folder_path = data_path / folder_name
         if not folder_path.exists():
             continue
-            
-        files = list(folder_path.glob("*"))
-        total_files += len(files)
-        
-        for fpath in files:
+        files.extend(sorted(folder_path.glob("*")))
+    
+    total_files = len(files)
+    corrupted = []
+    to_check = []
+    stats = {}
+    for fpath in files:
+        if manifest is not None:
             try:
-                with Image.open(fpath) as img:
-                    img.verify()
-                
-                if fpath.suffix.lower() in ['.jpg', '.jpeg']:
-                    with open(fpath, 'rb') as f:
-                        content = f.read(20)
-                        if not (b"JFIF" in content or b"Exif" in content):
-                            raise Exception("JPEG invalide")
-                            
-            except Exception:
-                num_skipped += 1
-                fpath.unlink()
-                if num_skipped % 100 == 0:
-                    print(f"Nettoyage: {num_skipped} images supprimées")
+                stats[fpath] = fpath.stat()
+            except OSError:
+                to_check.append(fpath)
+                continue
+            entry = manifest.lookup(fpath, stats[fpath])
+            if entry is not None:
+                if not entry["valid"]:
+                    corrupted.append(fpath)
+                continue
+        to_check.append(fpath)
+    
+    if manifest is not None:
+        print(f"Manifeste: {total_files - len(to_check)}/{total_files} images déjà vérifiées")
+    
+    def record(chunk, results):
+        for fpath, result in zip(chunk, results):
+            if not result["valid"]:
+                corrupted.append(fpath)
+            if manifest is not None and fpath in stats:
+                manifest.update(fpath, stats[fpath], result)
+    
+    workers = workers or os.cpu_count() or 1
+    chunks = [to_check[i:i + chunk_size] for i in range(0, len(to_check), chunk_size)]
+    
+    checked = 0
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            record(chunk, _verify_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            futures = {executor.submit(_verify_chunk, chunk): chunk for chunk in chunks}
+            for done, future in enumerate(as_completed(futures), 1):
+                chunk = futures[future]
+                record(chunk, future.result())
+                checked += len(chunk)
+                if done % 10 == 0 or done == len(chunks):
+                    print(f"Vérification: {checked}/{len(to_check)} images")
+    
+    if manifest is not None:
+        manifest.prune({manifest.relative(fpath) for fpath in files})
+        manifest.save()
+    
+    num_skipped = 0
+    for fpath in sorted(corrupted):
+        # Déjà supprimée par un autre processus (workers concurrents)
+        fpath.unlink(missing_ok=True)
+        num_skipped += 1
+        if num_skipped % 100 == 0:
+            print(f"Nettoyage: {num_skipped} images supprimées")
     
     print(f"Nettoyage terminé: {num_skipped}/{total_files} images supprimées")
     return num_skipped
 
-def setup_data_directory() -> Path:
-    """Configuration du répertoire de données"""
+def _reflink(src: Path, dst: Path):
+    """Clone copy-on-write (ioctl FICLONE: btrfs, XFS, ...)"""
+    import fcntl
+    FICLONE = 0x40049409
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        raise
+    shutil.copystat(src, dst)
+
+def _stage_file(src: Path, dst: Path, mode: str) -> str:
+    """
+    Place src en dst selon le mode; retourne le mode effectivement utilisé
+    
+    Un dst déjà à jour (placé entre-temps par un autre processus) est
+    accepté tel quel; la copie de repli est écrite à côté puis renommée.
+    """
+    if mode != "copy":
+        try:
+            if mode == "hardlink":
+                os.link(src, dst)
+            elif mode == "reflink":
+                _reflink(src, dst)
+            elif mode == "symlink":
+                os.symlink(src, dst)
+            return mode
+        except FileExistsError:
+            if _is_staged(src, dst, src.stat()):
+                return mode
+        except (OSError, ImportError):
+            # Autre système de fichiers, FS sans reflink, droits insuffisants...
+            pass
+    tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return "copy"
+
+def _is_staged(src: Path, dst: Path, src_stat: os.stat_result) -> bool:
+    """Vérifie si dst est déjà à jour par rapport à src"""
+    if dst.is_symlink():
+        return os.readlink(dst) == str(src)
+    try:
+        dst_stat = dst.stat()
+    except FileNotFoundError:
+        return False
+    if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        return True
+    return dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+def sync_data_directory(source_path: Path, target_path: Path, mode: str = "hardlink",
+                        manifest: Optional[ValidationManifest] = None) -> Dict[str, int]:
+    """
+    Synchronisation incrémentale de source_path vers target_path
+    
+    Seuls les fichiers nouveaux ou modifiés sont placés (lien physique,
+    clone reflink, lien symbolique ou copie selon `mode`, avec repli sur
+    la copie); les fichiers disparus de la source sont retirés de la cible.
+    
+    Avec le manifeste de validation de target_path, les images déjà
+    reconnues invalides (même taille, même date de modification) ne sont
+    pas replacées: clean_corrupted_images les a supprimées de la cible.
+    """
+    if mode not in STAGING_MODES:
+        raise ValueError(f"Mode de préparation inconnu: {mode} (attendu: {', '.join(STAGING_MODES)})")
+    
+    source_path = source_path.resolve()
+    stats = {"unchanged": 0, "staged": 0, "copied": 0, "removed": 0, "invalid": 0}
+    seen = set()
+    
+    for dirpath, _, filenames in os.walk(source_path):
+        rel_dir = Path(dirpath).relative_to(source_path)
+        (target_path / rel_dir).mkdir(parents=True, exist_ok=True)
+        for name in filenames:
+            src = Path(dirpath) / name
+            dst = target_path / rel_dir / name
+            
+            src_stat = src.stat()
+            if manifest is not None:
+                entry = manifest.lookup(dst, src_stat)
+                if entry is not None and not entry["valid"]:
+                    stats["invalid"] += 1
+                    continue
+            seen.add(rel_dir / name)
+            
+            if _is_staged(src, dst, src_stat):
+                stats["unchanged"] += 1
+                continue
+            if dst.is_symlink() or dst.exists():
+                dst.unlink(missing_ok=True)
+            
+            used = _stage_file(src, dst, mode)
+            stats["copied" if used == "copy" else "staged"] += 1
+    
+    for dirpath, _, filenames in os.walk(target_path):
+        rel_dir = Path(dirpath).relative_to(target_path)
+        for name in filenames:
+            if rel_dir / name not in seen:
+                (Path(dirpath) / name).unlink(missing_ok=True)
+                stats["removed"] += 1
+    
+    return stats
+
+def data_directory() -> Path:
+    """Répertoire de données préparé (TEMP_DIR), à défaut les images brutes"""
+    target_path = TEMP_DIR / "PetImages"
+    return target_path if target_path.exists() else RAW_DATA_DIR / "PetImages"
+
+def setup_data_directory(mode: Optional[str] = None) -> Path:
+    """
+    Configuration du répertoire de données
+    
+    Les images brutes sont exposées dans TEMP_DIR sans copie intégrale
+    (DATA_STAGING_MODE: hardlink par défaut, reflink, symlink ou copy), puis
+    resynchronisées à chaque appel pour suivre les changements de RAW_DATA_DIR.
+    """
+    mode = mode or DATA_STAGING_MODE
+    
     # Créer le répertoire temporaire
     TEMP_DIR.mkdir(parents=True, exist_ok=True)
     
@@ -52,8 +260,12 @@ def setup_data_directory() -> Path:
     source_path = RAW_DATA_DIR / "PetImages"
     target_path = TEMP_DIR / "PetImages"
     
-    if source_path.exists() and not target_path.exists():
-        shutil.copytree(source_path, target_path)
-        print(f"Données copiées vers {target_path}")
+    if source_path.exists():
+        # Images invalides déjà supprimées de la cible: non replacées
+        stats = sync_data_directory(source_path, target_path, mode, ValidationManifest(target_path))
+        if stats["staged"] or stats["copied"] or stats["removed"]:
+            print(f"Données préparées dans {target_path} (mode {mode}): "
+                  f"{stats['staged']} liées, {stats['copied']} copiées, "
+                  f"{stats['removed']} retirées, {stats['unchanged']} inchangées")
     
-    return target_path if target_path.exists() else source_path
\ No newline at end of file
+    return data_directory()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Shards TFRecord pré-décodés pour l'entraînement.
+
+Le dataset nettoyé est converti une seule fois en images uint8 déjà
+redimensionnées (octets bruts, sans JPEG), réparties en fichiers TFRecord
+train/val accompagnés d'un index JSON. Chaque epoch relit ainsi des
+données compactes sans décodage ni redimensionnement.
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import SHARDS_DIR
+from src.data.manifest import ValidationManifest
+
+CLASS_NAMES = ("Cat", "Dog")
+IMAGE_EXTENSIONS = ('.bmp', '.gif', '.jpeg', '.jpg', '.png')
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+DEFAULT_IMAGES_PER_SHARD = 2048
+
+
+def list_labeled_files(data_path: Path,
+                       validation_split: float = 0.2,
+                       seed: int = 1337) -> Tuple[List[Tuple[Path, int]], List[Tuple[Path, int]]]:
+    """
+    Liste (chemin, label) du dataset et le découpe en train/val.
+
+    Le découpage est déterministe pour une graine et un contenu donnés:
+    fichiers triés, mélangés avec `seed`, les derniers `validation_split`
+    formant la validation.
+    """
+    samples = []
+    for label, class_name in enumerate(CLASS_NAMES):
+        folder_path = Path(data_path) / class_name
+        if not folder_path.exists():
+            continue
+        samples.extend(
+            (fpath, label) for fpath in sorted(folder_path.iterdir())
+            if fpath.suffix.lower() in IMAGE_EXTENSIONS
+        )
+
+    random.Random(seed).shuffle(samples)
+    num_val = int(validation_split * len(samples))
+    return samples[:len(samples) - num_val], samples[len(samples) - num_val:]
+
+
+def load_resized(fpath: Path, image_size: Tuple[int, int]) -> np.ndarray:
+    """Décode une image en RGB uint8 à la taille du modèle (comme CatDogPredictor)."""
+    with Image.open(fpath) as image:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image = image.resize(tuple(image_size))
+        return np.asarray(image, dtype=np.uint8)
+
+
+def shards_dir_for(image_size: Tuple[int, int], root: Optional[Path] = None) -> Path:
+    """Répertoire des shards pour une taille d'image donnée."""
+    return Path(root or SHARDS_DIR) / f"{image_size[0]}x{image_size[1]}"
+
+
+def read_index(shards_dir: Path) -> Optional[dict]:
+    index_path = Path(shards_dir) / INDEX_NAME
+    if not index_path.exists():
+        return None
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        return index if index.get("version") == INDEX_VERSION else None
+    except Exception:
+        return None
+
+
+def build_shards(data_path: Path,
+                 image_size: Tuple[int, int],
+                 output_dir: Optional[Path] = None,
+                 images_per_shard: int = DEFAULT_IMAGES_PER_SHARD,
+                 validation_split: float = 0.2,
+                 seed: int = 1337,
+                 workers: Optional[int] = None,
+                 subsample: float = 1.0) -> Path:
+    """
+    Convertit le dataset nettoyé en shards TFRecord uint8.
+
+    Les shards sont écrits dans un répertoire temporaire puis mis en place
+    par renommage: un entraînement concurrent ne lit jamais un jeu partiel.
+    Avec `subsample` < 1, seule cette fraction (aléatoire, reproductible)
+    de chaque split est convertie.
+
+    Returns:
+        Répertoire contenant les shards et leur index
+    """
+    import tensorflow as tf
+
+    output_dir = Path(output_dir) if output_dir else shards_dir_for(image_size)
+    tmp_dir = output_dir.with_name(f".{output_dir.name}.{os.getpid()}.tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    train_files, val_files = list_labeled_files(data_path, validation_split, seed)
+    if subsample < 1.0:
+        # Listes déjà mélangées avec `seed`: les premiers fichiers forment l'échantillon
+        train_files = train_files[:max(1, int(len(train_files) * subsample))]
+        val_files = val_files[:max(1, int(len(val_files) * subsample))]
+    index = {
+        "version": INDEX_VERSION,
+        "image_size": list(image_size),
+        "class_names": list(CLASS_NAMES),
+        "validation_split": validation_split,
+        "seed": seed,
+        "subsample": subsample,
+        "images_per_shard": images_per_shard,
+        "source_digest": ValidationManifest(data_path).digest(),
+        "splits": {},
+    }
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for split, samples in (("train", train_files), ("val", val_files)):
+            shard_files = []
+            count = 0
+            for start in range(0, len(samples), images_per_shard):
+                chunk = samples[start:start + images_per_shard]
+                shard_name = f"{split}-{start // images_per_shard:05d}.tfrecord"
+                images = executor.map(
+                    lambda sample: _load_or_none(sample[0], image_size), chunk
+                )
+                with tf.io.TFRecordWriter(str(tmp_dir / shard_name)) as writer:
+                    for (fpath, label), image in zip(chunk, images):
+                        if image is None:
+                            continue
+                        writer.write(_serialize(tf, image, label))
+                        count += 1
+                shard_files.append(shard_name)
+            index["splits"][split] = {"files": shard_files, "count": count}
+            print(f"Shards {split}: {count} images dans {len(shard_files)} fichiers")
+
+    with open(tmp_dir / INDEX_NAME, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    print(f"Shards écrits dans {output_dir}")
+    return output_dir
+
+
+def ensure_shards(data_path: Path, image_size: Tuple[int, int], output_dir: Optional[Path] = None,
+                  subsample: float = 1.0, images_per_shard: Optional[int] = None) -> Path:
+    """
+    Retourne les shards à jour, en les (re)construisant si le dataset a changé.
+
+    Sans `images_per_shard`, des shards existants conviennent quel que soit
+    leur découpage (DEFAULT_IMAGES_PER_SHARD s'ils sont reconstruits); sinon
+    le découpage doit aussi correspondre.
+    """
+    output_dir = Path(output_dir) if output_dir else shards_dir_for(image_size)
+    index = read_index(output_dir)
+    if (index is not None
+            and index["image_size"] == list(image_size)
+            and index.get("subsample", 1.0) == subsample
+            and images_per_shard in (None, index.get("images_per_shard"))
+            and index["source_digest"] == ValidationManifest(data_path).digest()):
+        return output_dir
+
+    print("Shards absents ou obsolètes, conversion du dataset...")
+    return build_shards(data_path, image_size, output_dir, subsample=subsample,
+                        images_per_shard=images_per_shard or DEFAULT_IMAGES_PER_SHARD)
+
+
+def load_shard_datasets(shards_dir: Path, batch_size: int, shuffle_buffer: int = 1000):
+    """
+    Datasets (train, val) lus depuis les shards.
+
+    Les images sont produites en float32 dans [0, 255], comme avec
+    image_dataset_from_directory (la normalisation reste dans le modèle).
+    """
+    import tensorflow as tf
+    AUTOTUNE = tf.data.AUTOTUNE
+
+    index = read_index(shards_dir)
+    if index is None:
+        raise FileNotFoundError(f"Index de shards introuvable dans {shards_dir}")
+    height, width = index["image_size"]
+
+    feature_spec = {
+        "image": tf.io.FixedLenFeature([], tf.string),
+        "label": tf.io.FixedLenFeature([], tf.int64),
+    }
+
+    def parse_batch(serialized):
+        features = tf.io.parse_example(serialized, feature_spec)
+        images = tf.io.decode_raw(features["image"], tf.uint8)
+        images = tf.reshape(images, [-1, height, width, 3])
+        return tf.cast(images, tf.float32), tf.cast(features["label"], tf.int32)
+
+    def make_dataset(split, training):
+        files = [str(Path(shards_dir) / name) for name in index["splits"][split]["files"]]
+        ds = tf.data.Dataset.from_tensor_slices(tf.constant(files, dtype=tf.string))
+        if training:
+            ds = ds.shuffle(len(files))
+        ds = ds.interleave(
+            tf.data.TFRecordDataset,
+            cycle_length=max(1, min(len(files), 4)),
+            num_parallel_calls=AUTOTUNE,
+            deterministic=not training,
+        )
+        if training:
+            ds = ds.shuffle(shuffle_buffer)
+        # Décodage vectorisé par lot plutôt qu'image par image
+        ds = ds.batch(batch_size).map(parse_batch, num_parallel_calls=AUTOTUNE)
+        # Cardinalité connue via l'index (barre de progression Keras, steps par epoch)
+        num_batches = -(-index["splits"][split]["count"] // batch_size)
+        ds = ds.apply(tf.data.experimental.assert_cardinality(num_batches))
+        return ds.prefetch(buffer_size=AUTOTUNE)
+
+    return make_dataset("train", training=True), make_dataset("val", training=False)
+
+
+def _load_or_none(fpath: Path, image_size: Tuple[int, int]) -> Optional[np.ndarray]:
+    try:
+        return load_resized(fpath, image_size)
+    except Exception as e:
+        print(f"Image ignorée {fpath}: {e}")
+        return None
+
+
+def _serialize(tf, image: np.ndarray, label: int) -> bytes:
+    example = tf.train.Example(features=tf.train.Features(feature={
+        "image": tf.train.Feature(bytes_list=tf.train.BytesList(value=[image.tobytes()])),
+        "label": tf.train.Feature(int64_list=tf.train.Int64List(value=[label])),
+    }))
+    return example.SerializeToString()
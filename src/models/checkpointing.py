@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Checkpoints de reprise pour l'entraînement et le ré-entraînement.
+
+Contrairement à ModelCheckpoint (meilleur modèle seulement), l'état
+complet est sauvegardé périodiquement: poids du modèle et de l'optimiseur
+(`state.weights.h5`), epoch et step atteints, état des callbacks
+(EarlyStopping, ReduceLROnPlateau, ModelCheckpoint). Un entraînement
+interrompu (crash, timeout du planificateur, préemption) reprend ainsi à
+l'epoch en cours, les steps déjà faits de cette epoch étant sautés.
+
+Le répertoire est supprimé à la fin normale de l'entraînement.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional
+
+import tensorflow as tf
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import CHECKPOINT_DIR
+
+WEIGHTS_NAME = "state.weights.h5"
+STATE_NAME = "state.json"
+
+# Attributs des callbacks Keras à conserver d'une exécution à l'autre
+CALLBACK_STATE = {
+    "EarlyStopping": ("wait", "best", "best_epoch", "stopped_epoch"),
+    "ReduceLROnPlateau": ("wait", "best", "cooldown_counter"),
+    "ModelCheckpoint": ("best",),
+}
+
+
+def checkpoint_dir_for(run_name: str) -> Path:
+    """Répertoire de reprise d'un type d'entraînement ("train", "retrain")."""
+    return CHECKPOINT_DIR / run_name
+
+
+def model_fingerprint(model) -> str:
+    """
+    Empreinte de l'architecture (noms courts et formes des poids, dans l'ordre).
+
+    Les chemins complets des poids contiennent les noms générés des couches
+    (dense_3/kernel), qui changent selon le nombre de modèles déjà créés
+    dans le processus: ils ne font pas partie de l'empreinte.
+    """
+    signature = ";".join(f"{w.name}:{tuple(w.shape)}" for w in model.weights)
+    return hashlib.sha256(signature.encode("utf-8")).hexdigest()[:16]
+
+
+def _to_json(value):
+    """Valeurs numpy/TF -> types JSON natifs."""
+    if hasattr(value, "numpy"):
+        value = value.numpy()
+    if hasattr(value, "item"):
+        value = value.item()
+    return value
+
+
+class ResumableCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Sauvegarde périodique de l'état complet de l'entraînement.
+
+    À placer en dernier dans la liste des callbacks: son on_train_begin
+    restaure l'état des callbacks précédents après leur réinitialisation.
+
+    Args:
+        checkpoint_dir: Répertoire des checkpoints de reprise
+        save_steps: Sauvegarde tous les N steps (0: fin d'epoch seulement)
+        callbacks: Autres callbacks du fit() dont l'état est sauvegardé
+    """
+
+    def __init__(self, checkpoint_dir: Path, save_steps: int = 0, callbacks: Optional[list] = None):
+        super().__init__()
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.save_steps = save_steps
+        self.tracked_callbacks = [cb for cb in (callbacks or []) if cb is not self]
+        self.state = None
+        self._epoch = 0
+        self._step_offset = 0
+        self._step_in_epoch = 0
+
+    @property
+    def weights_path(self) -> Path:
+        return self.checkpoint_dir / WEIGHTS_NAME
+
+    @property
+    def state_path(self) -> Path:
+        return self.checkpoint_dir / STATE_NAME
+
+    def clear(self):
+        """Supprime un éventuel checkpoint (entraînement repris de zéro)."""
+        if self.checkpoint_dir.exists():
+            shutil.rmtree(self.checkpoint_dir)
+
+    def restore(self, model) -> int:
+        """
+        Restaure poids et optimiseur dans `model` avant fit().
+
+        Returns:
+            Epoch initiale à passer à fit() (0 si aucun checkpoint utilisable)
+        """
+        if not (self.state_path.exists() and self.weights_path.exists()):
+            print("Aucun checkpoint de reprise, entraînement depuis le début")
+            return 0
+
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get("fingerprint") != model_fingerprint(model):
+            print("Checkpoint de reprise incompatible avec le modèle, ignoré")
+            return 0
+
+        # Variables de l'optimiseur créées avant le chargement
+        if model.optimizer is not None and not model.optimizer.built:
+            model.optimizer.build(model.trainable_variables)
+        model.load_weights(self.weights_path)
+
+        self.state = state
+        self._epoch = state["epoch"]
+        self._step_offset = state["step"]
+        print(f"Reprise à l'epoch {state['epoch'] + 1}, step {state['step']}")
+        return state["epoch"]
+
+    def on_train_begin(self, logs=None):
+        if not self.state:
+            return
+        for callback in self.tracked_callbacks:
+            for attr in CALLBACK_STATE.get(callback.__class__.__name__, ()):
+                key = f"{callback.__class__.__name__}.{attr}"
+                if key in self.state["callbacks"]:
+                    setattr(callback, attr, self.state["callbacks"][key])
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._step_in_epoch = self._step_offset
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._step_in_epoch = self._step_offset + batch + 1
+        if self.save_steps and self._step_in_epoch % self.save_steps == 0:
+            self._save(self._epoch, self._step_in_epoch)
+
+    def on_epoch_end(self, epoch, logs=None):
+        self._step_offset = 0
+        self._save(epoch + 1, 0)
+
+    def _save(self, epoch: int, step: int):
+        """Écriture atomique: poids puis état, chacun via un fichier temporaire."""
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_weights = self.checkpoint_dir / f"tmp.{os.getpid()}.weights.h5"
+        self.model.save_weights(tmp_weights)
+        os.replace(tmp_weights, self.weights_path)
+
+        callbacks = {}
+        for callback in self.tracked_callbacks:
+            for attr in CALLBACK_STATE.get(callback.__class__.__name__, ()):
+                if hasattr(callback, attr):
+                    callbacks[f"{callback.__class__.__name__}.{attr}"] = _to_json(getattr(callback, attr))
+
+        state = {
+            "epoch": epoch,
+            "step": step,
+            "fingerprint": model_fingerprint(self.model),
+            "callbacks": callbacks,
+        }
+        tmp_state = self.checkpoint_dir / f"{STATE_NAME}.{os.getpid()}.tmp"
+        with open(tmp_state, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_state, self.state_path)
+        self.state = state
+
+
+def fit_resumable(model, train_ds, val_ds, epochs: int, callbacks: list, run_name: str,
+                  resume: bool = False, save_steps: int = 0,
+                  checkpoint_dir: Optional[Path] = None, verbose: int = 1):
+    """
+    model.fit() avec checkpoints de reprise.
+
+    Sans `resume`, un checkpoint existant est effacé. Avec `resume`, l'état
+    sauvegardé est restauré; si l'interruption a eu lieu en cours d'epoch,
+    les lots restants de cette epoch sont d'abord entraînés seuls, puis
+    l'entraînement continue normalement. Le checkpoint est supprimé quand
+    l'entraînement se termine sans erreur.
+
+    Returns:
+        History de l'entraînement (epochs reprises incluses)
+    """
+    checkpoint = ResumableCheckpoint(checkpoint_dir or checkpoint_dir_for(run_name), save_steps, callbacks)
+    initial_epoch = 0
+    if resume:
+        initial_epoch = checkpoint.restore(model)
+    else:
+        checkpoint.clear()
+
+    partial = None
+    if checkpoint.state and checkpoint.state["step"] and initial_epoch < epochs:
+        # Fin de l'epoch interrompue: lots restants seulement, avec les
+        # callbacks dont l'état est sauvegardé (pas de profilage partiel)
+        skip = checkpoint.state["step"]
+        remaining = train_ds.skip(skip)
+        num_batches = int(train_ds.cardinality())
+        if num_batches > 0:
+            remaining = remaining.apply(tf.data.experimental.assert_cardinality(max(num_batches - skip, 0)))
+        stateful = [cb for cb in callbacks if cb.__class__.__name__ in CALLBACK_STATE]
+        partial = model.fit(
+            remaining,
+            epochs=initial_epoch + 1,
+            initial_epoch=initial_epoch,
+            callbacks=stateful + [checkpoint],
+            validation_data=val_ds,
+            verbose=verbose,
+        )
+        initial_epoch += 1
+
+    history = partial
+    if partial is None or (initial_epoch < epochs and not model.stop_training):
+        history = model.fit(
+            train_ds,
+            epochs=epochs,
+            initial_epoch=initial_epoch,
+            callbacks=list(callbacks) + [checkpoint],
+            validation_data=val_ds,
+            verbose=verbose,
+        )
+        if partial is not None:
+            for key, values in partial.history.items():
+                history.history[key] = values + history.history.get(key, [])
+            history.epoch = partial.epoch + history.epoch
+
+    # Entraînement terminé: plus rien à reprendre
+    checkpoint.clear()
+    return history
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Distillation du modèle en production dans un modèle élève plus léger.
+
+L'élève est un CNN plus étroit et moins profond: une convolution d'entrée
+de pas 2, puis des blocs de convolutions séparables en profondeur
+(SeparableConv2D), de largeurs configurables (DISTILL_CONFIG["widths"]).
+Il apprend à la fois les labels réels et les scores du modèle maître,
+adoucis par une température:
+
+    perte = alpha * BCE(label, élève) + (1 - alpha) * T² * BCE(σ(z_maître / T), σ(z_élève / T))
+
+Les scores du maître sur tout le dataset (train et validation) sont
+calculés une seule fois et rangés sur disque sous une clé dérivée du hash
+du fichier du maître et du dataset: les epochs de l'élève, et les
+distillations suivantes avec le même maître, ne font plus passer les
+images dans le maître. Comme pour la tête seule, les images ne sont pas
+augmentées (les scores du maître portent sur les images d'origine).
+
+Le rapport compare maître et élève: précision de validation, accord des
+prédictions, paramètres, multiplications-additions par image et latence
+CPU (appel direct et chemin predict() du CatDogPredictor).
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import tensorflow as tf
+from keras import layers
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import DISTILL_CONFIG
+from src.data.manifest import ValidationManifest
+from src.data.shards import list_labeled_files
+from src.models.eval_cache import file_sha256
+from src.models.feature_cache import META_NAME, META_VERSION, read_meta, save_array
+from src.models.registry import ModelRegistry, atomic_link
+
+# Bornes des probabilités avant passage aux logits
+EPSILON = 1e-6
+
+
+def build_student(image_size: Tuple[int, int], widths: Sequence[int] = (16, 32, 64),
+                  separable: bool = True) -> tf.keras.Model:
+    """
+    Modèle élève: même entrée et même sortie (sigmoïde) que le maître.
+
+    Args:
+        image_size: Taille des images d'entrée
+        widths: Filtres de la convolution d'entrée puis de chaque bloc
+        separable: Blocs en SeparableConv2D (sinon Conv2D classiques)
+    """
+    conv = layers.SeparableConv2D if separable else layers.Conv2D
+    inputs = tf.keras.Input(shape=tuple(image_size) + (3,))
+    x = layers.Rescaling(1.0/255)(inputs)
+    x = layers.Conv2D(widths[0], 3, strides=2, activation='relu')(x)
+    x = layers.MaxPooling2D()(x)
+    for width in widths[1:]:
+        x = conv(width, 3, activation='relu')(x)
+        x = layers.MaxPooling2D()(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    outputs = layers.Dense(1, activation='sigmoid')(x)
+    return tf.keras.Model(inputs, outputs, name="student")
+
+
+def _logit(probability):
+    probability = tf.clip_by_value(probability, EPSILON, 1.0 - EPSILON)
+    return tf.math.log(probability) - tf.math.log1p(-probability)
+
+
+def distillation_loss(temperature: float, alpha: float):
+    """
+    Perte de distillation; y_true contient [label, score du maître].
+
+    Le facteur T² garde la contribution des cibles adoucies comparable
+    quelle que soit la température.
+    """
+    def loss(y_true, y_pred):
+        labels, teacher = y_true[:, :1], y_true[:, 1:]
+        hard_loss = tf.keras.losses.binary_crossentropy(labels, y_pred)
+        soft_teacher = tf.sigmoid(_logit(teacher) / temperature)
+        soft_student = tf.sigmoid(_logit(y_pred) / temperature)
+        soft_loss = tf.keras.losses.binary_crossentropy(soft_teacher, soft_student)
+        return alpha * hard_loss + (1.0 - alpha) * temperature ** 2 * soft_loss
+    return loss
+
+
+def hard_accuracy(y_true, y_pred):
+    """Précision par rapport aux labels réels."""
+    return tf.keras.metrics.binary_accuracy(y_true[:, :1], y_pred)
+
+
+def teacher_agreement(y_true, y_pred):
+    """Part des prédictions de même classe que le maître."""
+    return tf.keras.metrics.binary_accuracy(tf.cast(y_true[:, 1:] > 0.5, y_pred.dtype), y_pred)
+
+
+def teacher_cache_dir(teacher_sha256: str, data_path: Path, image_size: Tuple[int, int],
+                      seed: int, root: Optional[Path] = None) -> Path:
+    """Répertoire des scores d'un maître pour un dataset et un découpage donnés."""
+    key_source = "|".join([
+        teacher_sha256,
+        ValidationManifest(data_path).digest(),
+        "x".join(str(d) for d in image_size),
+        str(seed),
+    ])
+    key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:16]
+    return Path(root or DISTILL_CONFIG["cache_dir"]) / key
+
+
+def build_teacher_scores(teacher, datasets: Dict[str, Any], cache_dir: Path, teacher_sha256: str) -> Path:
+    """
+    Calcule et écrit les scores du maître de chaque split.
+
+    Args:
+        teacher: Modèle maître (sortie sigmoïde)
+        datasets: {split: dataset de lots d'images, dans l'ordre de list_labeled_files}
+        cache_dir: Répertoire de sortie
+        teacher_sha256: Hash du fichier du maître (enregistré dans meta.json)
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    counts = {}
+    for split, images_ds in datasets.items():
+        print(f"Calcul des scores du maître ({split})...")
+        scores = teacher.predict(images_ds, verbose=0).reshape(-1).astype(np.float32)
+        save_array(cache_dir / f"{split}_scores.npy", scores)
+        counts[split] = len(scores)
+
+    # meta.json en dernier: un cache incomplet n'est jamais considéré valide
+    meta = {"version": META_VERSION, "teacher_sha256": teacher_sha256, "counts": counts}
+    tmp_meta = cache_dir / f"{META_NAME}.{os.getpid()}.tmp"
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, cache_dir / META_NAME)
+    return cache_dir
+
+
+def load_teacher_scores(cache_dir: Path, split: str) -> np.ndarray:
+    return np.load(Path(cache_dir) / f"{split}_scores.npy", mmap_mode='r')
+
+
+def estimate_macs(model) -> int:
+    """Multiplications-additions par image des couches de convolution et denses."""
+    total = 0
+    for layer in model.layers:
+        if isinstance(layer, (layers.Conv2D, layers.SeparableConv2D, layers.Dense)):
+            input_channels = layer.input.shape[-1]
+            output_size = int(np.prod(layer.output.shape[1:-1])) if len(layer.output.shape) > 2 else 1
+            if isinstance(layer, layers.SeparableConv2D):
+                kernel = int(np.prod(layer.kernel_size))
+                total += output_size * (kernel * input_channels + input_channels * layer.filters)
+            elif isinstance(layer, layers.Conv2D):
+                kernel = int(np.prod(layer.kernel_size))
+                total += output_size * kernel * input_channels * layer.filters
+            else:
+                total += input_channels * layer.units
+    return int(total)
+
+
+def measure_latency(model, image_size: Tuple[int, int], runs: int = 50, warmup: int = 5) -> Dict[str, float]:
+    """
+    Latence CPU d'une image (ms, médiane et p90).
+
+    "call": appel direct du modèle; "predict": model.predict(), le chemin
+    du CatDogPredictor, qui ajoute un surcoût fixe par appel.
+    """
+    image = np.random.default_rng(0).integers(0, 256, (1, *image_size, 3)).astype(np.float32)
+    latencies = {}
+    for name, run in (
+        ("call", lambda: model(image, training=False)),
+        ("predict", lambda: model.predict(image, verbose=0)),
+    ):
+        for _ in range(warmup):
+            run()
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        latencies[f"{name}_p50_ms"] = round(float(np.percentile(timings, 50)), 3)
+        latencies[f"{name}_p90_ms"] = round(float(np.percentile(timings, 90)), 3)
+    return latencies
+
+
+class StudentDistiller:
+    """
+    Distillation du modèle en production (maître) dans un modèle élève.
+
+    Args:
+        trainer: CatDogTrainer fournissant les données et l'export
+        **overrides: Surcharges ponctuelles de DISTILL_CONFIG
+    """
+
+    def __init__(self, trainer=None, **overrides):
+        if trainer is None:
+            from src.models.trainer import CatDogTrainer
+            trainer = CatDogTrainer()
+        self.trainer = trainer
+        self.config = dict(DISTILL_CONFIG, **overrides)
+        self.image_size = trainer.config["image_size"]
+        self.seed = trainer.config["seed"]
+
+    def teacher_scores(self, teacher, teacher_sha256: str, data_path: Path) -> Path:
+        """Scores du maître en cache (calculés au premier appel pour ce maître et ce dataset)."""
+        cache_dir = teacher_cache_dir(teacher_sha256, data_path, self.image_size, self.seed, self.config["cache_dir"])
+        if read_meta(cache_dir) is None:
+            train_ds, val_ds = self.trainer._decode_datasets(data_path)
+            build_teacher_scores(teacher, {
+                "train": train_ds.map(lambda image, label: image),
+                "val": val_ds.map(lambda image, label: image),
+            }, cache_dir, teacher_sha256)
+        else:
+            print(f"Scores du maître réutilisés: {cache_dir}")
+        return cache_dir
+
+    def _datasets(self, data_path: Path, cache_dir: Path):
+        """Datasets (images, [label, score du maître]), alignés sur list_labeled_files."""
+        train_ds, val_ds = self.trainer._decode_datasets(data_path)
+        train_files, val_files = list_labeled_files(data_path, validation_split=0.2, seed=self.seed)
+        batch_size = self.trainer.batch_size
+
+        def with_targets(images_ds, samples, split):
+            labels = np.asarray([label for _, label in samples], dtype=np.float32)
+            targets = np.stack([labels, np.asarray(load_teacher_scores(cache_dir, split))], axis=1)
+            targets_ds = tf.data.Dataset.from_tensor_slices(targets).batch(batch_size)
+            return tf.data.Dataset.zip((images_ds.map(lambda image, label: image), targets_ds))
+
+        train_ds = (
+            with_targets(train_ds, train_files, "train")
+            .unbatch()
+            .shuffle(1000, seed=self.seed)
+            .batch(batch_size)
+            .apply(tf.data.experimental.assert_cardinality(-(-len(train_files) // batch_size)))
+            .prefetch(tf.data.AUTOTUNE)
+        )
+        val_ds = with_targets(val_ds, val_files, "val").prefetch(tf.data.AUTOTUNE)
+        return train_ds, val_ds, len(train_files), len(val_files)
+
+    def distill(self, teacher_path: Optional[Path] = None, epochs: Optional[int] = None,
+                promote: bool = False) -> Tuple[tf.keras.Model, Dict[str, Any]]:
+        """
+        Entraîne l'élève et produit le rapport maître / élève.
+
+        L'élève est enregistré dans le registre (type "student", parent: le
+        maître) et exposé sous cats_dogs_model_student.keras, utilisable
+        comme canari ou en ombre; avec `promote`, il est mis en production.
+
+        Returns:
+            (modèle élève, rapport)
+        """
+        models_dir = self.trainer.models_dir
+        teacher_path = Path(teacher_path or models_dir / "cats_dogs_model.keras")
+        if not teacher_path.exists():
+            raise FileNotFoundError(f"Aucun modèle maître: {teacher_path} (entraîner d'abord le modèle complet)")
+        epochs = epochs or self.config["epochs"]
+
+        teacher_sha256 = file_sha256(teacher_path)
+        teacher = tf.keras.models.load_model(teacher_path)
+        data_path = self.trainer.prepare_sources()
+        cache_dir = self.teacher_scores(teacher, teacher_sha256, data_path)
+        train_ds, val_ds, train_count, val_count = self._datasets(data_path, cache_dir)
+
+        student = build_student(self.image_size, self.config["widths"], self.config["separable"])
+        student.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=self.trainer.config["learning_rate"]),
+            loss=distillation_loss(self.config["temperature"], self.config["alpha"]),
+            metrics=[hard_accuracy, teacher_agreement],
+        )
+        print(f"Distillation sur {train_count} images: élève {student.count_params()} paramètres, "
+              f"maître {teacher.count_params()}")
+        start = time.perf_counter()
+        history = student.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=epochs,
+            callbacks=[tf.keras.callbacks.EarlyStopping(
+                monitor='val_hard_accuracy',
+                mode='max',
+                patience=3,
+                restore_best_weights=True
+            )],
+            verbose=2,
+        )
+        train_seconds = time.perf_counter() - start
+
+        report = self.compare(teacher, student, val_ds, val_count)
+        report.update({
+            "timestamp": datetime.now().isoformat(),
+            "teacher_sha256": teacher_sha256,
+            "config": {
+                "widths": list(self.config["widths"]),
+                "separable": self.config["separable"],
+                "temperature": self.config["temperature"],
+                "alpha": self.config["alpha"],
+                "epochs_run": len(history.history["loss"]),
+            },
+            "train_images": train_count,
+            "train_seconds": round(train_seconds, 2),
+        })
+
+        # Export sans la perte de distillation: rechargeable sans objets personnalisés
+        student.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=self.trainer.config["learning_rate"]),
+            loss='binary_crossentropy',
+            metrics=['accuracy']
+        )
+        student.optimizer.build(student.trainable_variables)
+        candidate_path = models_dir / "cats_dogs_model_student_candidate.keras"
+        student.save(candidate_path)
+        registry = ModelRegistry()
+        student_sha256 = registry.register(
+            candidate_path, kind="student", parent=teacher_sha256,
+            metrics={"accuracy": report["student"]["val_accuracy"]},
+        )
+        candidate_path.unlink(missing_ok=True)
+        student_path = models_dir / "cats_dogs_model_student.keras"
+        atomic_link(registry.blob_path(student_sha256), student_path)
+        report["student_sha256"] = student_sha256
+        report["student_path"] = str(student_path)
+        if promote:
+            registry.promote(student_sha256, models_dir / "cats_dogs_model.keras")
+            report["promoted"] = True
+
+        report_path = models_dir / f"distillation_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Rapport de distillation: {report_path}")
+        return student, report
+
+    def compare(self, teacher, student, val_ds, val_count: int) -> Dict[str, Any]:
+        """Précision, accord, coût et latence du maître et de l'élève."""
+        labels, teacher_scores, student_scores = [], [], []
+        for images, targets in val_ds:
+            labels.append(targets[:, 0].numpy())
+            teacher_scores.append(targets[:, 1].numpy())
+            student_scores.append(student(images, training=False).numpy().reshape(-1))
+        labels = np.concatenate(labels) if labels else np.zeros(0)
+        teacher_scores = np.concatenate(teacher_scores) if teacher_scores else np.zeros(0)
+        student_scores = np.concatenate(student_scores) if student_scores else np.zeros(0)
+
+        def accuracy(scores):
+            return round(float(np.mean((scores > 0.5) == (labels > 0.5))), 4) if len(labels) else None
+
+        summary = {}
+        for name, model, scores in (("teacher", teacher, teacher_scores), ("student", student, student_scores)):
+            summary[name] = {
+                "val_accuracy": accuracy(scores),
+                "parameters": int(model.count_params()),
+                "macs_per_image": estimate_macs(model),
+                "latency": measure_latency(model, self.image_size),
+            }
+
+        teacher_cost, student_cost = summary["teacher"], summary["student"]
+        summary["val_images"] = val_count
+        summary["agreement"] = (
+            round(float(np.mean((teacher_scores > 0.5) == (student_scores > 0.5))), 4) if len(labels) else None
+        )
+        summary["speedup"] = {
+            "macs": round(teacher_cost["macs_per_image"] / max(student_cost["macs_per_image"], 1), 2),
+            "call_p50": round(teacher_cost["latency"]["call_p50_ms"] / student_cost["latency"]["call_p50_ms"], 2),
+            "predict_p50": round(teacher_cost["latency"]["predict_p50_ms"] / student_cost["latency"]["predict_p50_ms"], 2),
+        }
+        return summary
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Entraînement data-parallèle sur CPU avec tf.distribute.
+
+Avec DISTRIBUTE_STRATEGY=multi_worker, chaque processus est un worker
+d'une MultiWorkerMirroredStrategy décrite par la variable TF_CONFIG
+(voir scripts/train_distributed.py, qui lance des workers locaux). Les
+poids sont synchronisés à chaque step par all-reduce; chaque worker
+traite une partie de chaque lot global.
+
+Seul le worker chef écrit les artefacts partagés (modèle, checkpoints de
+reprise, rapports); les autres écrivent dans un répertoire temporaire.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import tensorflow as tf
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import TEMP_DIR
+
+STRATEGIES = ("none", "multi_worker")
+
+# Point d'entrée interne de Keras surchargé par adapt_model_to_strategy (Keras 3.15,
+# version figée dans requirements/base.txt; vérifié par tests/test_distributed.py)
+SYMBOLIC_BUILD_HOOK = "_maybe_symbolic_build"
+
+
+def get_strategy(name: str = "none"):
+    """
+    Stratégie de distribution configurée.
+
+    La MultiWorkerMirroredStrategy doit être créée au démarrage du
+    programme, avant toute autre opération TensorFlow.
+    """
+    if name not in STRATEGIES:
+        raise ValueError(f"Stratégie inconnue: {name} (attendu: {', '.join(STRATEGIES)})")
+    if name == "multi_worker":
+        if "TF_CONFIG" not in os.environ:
+            raise RuntimeError("DISTRIBUTE_STRATEGY=multi_worker nécessite la variable TF_CONFIG")
+        return tf.distribute.MultiWorkerMirroredStrategy()
+    return tf.distribute.get_strategy()
+
+
+def worker_task(strategy) -> tuple:
+    """(type, index) de la tâche courante; ("worker", 0) hors multi-worker."""
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None or resolver.task_type is None:
+        return "worker", 0
+    return resolver.task_type, resolver.task_id
+
+
+def is_chief(strategy) -> bool:
+    """Le chef est la tâche "chief" ou, à défaut, le worker 0."""
+    task_type, task_id = worker_task(strategy)
+    if task_type == "chief":
+        return True
+    resolver = getattr(strategy, "cluster_resolver", None)
+    has_chief = resolver is not None and "chief" in resolver.cluster_spec().as_dict()
+    return task_type == "worker" and task_id == 0 and not has_chief
+
+
+def num_workers(strategy) -> int:
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None:
+        return 1
+    cluster = resolver.cluster_spec().as_dict()
+    return len(cluster.get("worker", [])) + len(cluster.get("chief", []))
+
+
+def global_batch_size(per_worker_batch_size: int, strategy) -> int:
+    """Taille de lot globale: le lot par worker est conservé, le lot global croît."""
+    return per_worker_batch_size * strategy.num_replicas_in_sync
+
+
+def distribute_dataset(strategy, dataset, global_batch_size: int):
+    """
+    Répartit un dataset de lots globaux entre les workers.
+
+    Chaque worker lit le même dataset, en garde un élément sur N (les
+    datasets viennent de caches, tableaux mappés ou générateurs: le partage
+    par fichiers ne s'applique pas) et le regroupe en lots par réplique.
+    Tous les workers font le même nombre de steps: le dernier lot global,
+    éventuellement incomplet, est écarté (un worker recevrait sinon un lot
+    vide). Au plus un lot global est perdu par epoch.
+
+    Les lots en trop sont filtrés plutôt que coupés par take(): chaque
+    worker lit ainsi son dataset jusqu'au bout, sans quoi un cache tf.data
+    en cours d'écriture serait tronqué.
+    """
+    steps = int(dataset.cardinality()) - 1
+    if steps < 1:
+        raise ValueError(
+            "Dataset trop petit (ou de taille inconnue) pour le multi-worker: "
+            "au moins deux lots globaux sont nécessaires"
+        )
+
+    # Partage explicite ci-dessous: pas de partage automatique en plus
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+
+    def dataset_fn(input_context):
+        batch_size = input_context.get_per_replica_batch_size(global_batch_size)
+        return (
+            dataset.unbatch()
+            .shard(input_context.num_input_pipelines, input_context.input_pipeline_id)
+            .batch(batch_size, drop_remainder=True)
+            .enumerate()
+            .filter(lambda index, batch: index < steps)
+            .map(lambda index, batch: batch)
+            .apply(tf.data.experimental.assert_cardinality(steps))
+            .prefetch(tf.data.AUTOTUNE)
+            .with_options(options)
+        )
+
+    return strategy.distribute_datasets_from_function(dataset_fn)
+
+
+def _vector_logs(step_function):
+    """Métriques scalaires -> vecteurs [1], réductibles avec axis=0."""
+    def step(data):
+        logs = step_function(data)
+        return tf.nest.map_structure(
+            lambda value: tf.reshape(value, [-1]) if value.shape.rank == 0 else value, logs
+        )
+    return step
+
+
+def adapt_model_to_strategy(model, strategy):
+    """
+    Contournements Keras 3 pour la MultiWorkerMirroredStrategy.
+
+    - le build symbolique de fit() réduit le premier lot entre workers
+      (échec sur des PerReplica): on le construit à partir du lot local;
+    - les logs des steps sont réduits avec strategy.reduce(axis=0), qui
+      échoue sur des scalaires: les métriques sont renvoyées en vecteurs [1].
+
+    Les surcharges sont posées sur l'instance et ne sont pas sérialisées
+    avec le modèle. Le build symbolique n'a pas de point d'entrée public:
+    la méthode interne est surchargée, et son absence (autre version de
+    Keras) est signalée explicitement plutôt que de laisser fit() échouer.
+    """
+    if not isinstance(strategy, tf.distribute.MultiWorkerMirroredStrategy):
+        return model
+
+    symbolic_build = getattr(model, SYMBOLIC_BUILD_HOOK, None)
+    if symbolic_build is None:
+        raise RuntimeError(
+            f"Keras {tf.keras.__version__}: {SYMBOLIC_BUILD_HOOK} introuvable, contournement "
+            "multi-worker à adapter (version prise en charge: voir requirements/base.txt)"
+        )
+
+    def maybe_symbolic_build(iterator=None, data_batch=None):
+        if iterator is not None and data_batch is None:
+            for _, _, batch_iterator in iterator:
+                data_batch = tf.nest.map_structure(
+                    lambda value: strategy.experimental_local_results(value)[0]
+                    if isinstance(value, tf.distribute.DistributedValues) else value,
+                    next(batch_iterator),
+                )
+                break
+        symbolic_build(data_batch=data_batch)
+
+    setattr(model, SYMBOLIC_BUILD_HOOK, maybe_symbolic_build)
+    model.train_step = _vector_logs(model.train_step)
+    model.test_step = _vector_logs(model.test_step)
+    return model
+
+
+def worker_dir(strategy, path: Path) -> Path:
+    """Chemin d'écriture: `path` pour le chef, un répertoire temporaire sinon."""
+    if is_chief(strategy):
+        return Path(path)
+    task_type, task_id = worker_task(strategy)
+    return TEMP_DIR / "workers" / f"{task_type}_{task_id}" / Path(path).name
+
+
+def make_tf_config(num_workers: int, index: int, ports: list) -> str:
+    """TF_CONFIG d'un worker local (le worker 0 est le chef)."""
+    return json.dumps({
+        "cluster": {"worker": [f"localhost:{port}" for port in ports[:num_workers]]},
+        "task": {"type": "worker", "index": index},
+    })
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Cache des évaluations du modèle en production.
+
+Une évaluation est identifiée par le hash SHA-256 du fichier du modèle et
+par une clé du jeu de validation (empreinte du manifeste de validation,
+découpage, taille d'image): tant que ni le modèle ni les données ne
+changent, la précision de référence n'est calculée qu'une seule fois,
+d'un ré-entraînement à l'autre.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import EVAL_CACHE_PATH
+
+# Nombre d'évaluations conservées (les plus récentes)
+MAX_ENTRIES = 50
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Hash SHA-256 (hexadécimal) du contenu d'un fichier."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EvaluationCache:
+    """Évaluations (accuracy, loss) indexées par (hash du modèle, clé de validation)."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or EVAL_CACHE_PATH)
+        self.entries: Dict[str, dict] = {}
+        self.load()
+
+    @staticmethod
+    def key(model_sha256: str, validation_key: str) -> str:
+        return f"{model_sha256}:{validation_key}"
+
+    def load(self):
+        """Charge le cache s'il existe (un fichier illisible est ignoré)."""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get("entries", {})
+        except Exception as e:
+            print(f"Cache d'évaluation illisible, ignoré: {e}")
+            self.entries = {}
+
+    def get(self, model_sha256: str, validation_key: str) -> Optional[Dict[str, float]]:
+        entry = self.entries.get(self.key(model_sha256, validation_key))
+        if entry is None:
+            return None
+        return {"accuracy": entry["accuracy"], "loss": entry["loss"]}
+
+    def put(self, model_sha256: str, validation_key: str, metrics: Dict[str, float]):
+        """Enregistre une évaluation et réécrit le cache."""
+        self.entries[self.key(model_sha256, validation_key)] = {
+            "accuracy": float(metrics["accuracy"]),
+            "loss": float(metrics["loss"]),
+            "evaluated_at": datetime.now().isoformat(),
+        }
+        if len(self.entries) > MAX_ENTRIES:
+            recent = sorted(self.entries.items(), key=lambda item: item[1]["evaluated_at"], reverse=True)
+            self.entries = dict(recent[:MAX_ENTRIES])
+        self.save()
+
+    def save(self):
+        """Écriture atomique."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"entries": self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
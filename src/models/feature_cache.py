@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Cache des embeddings du tronc convolutif, pour ré-entraîner la tête seule.
+
+Le modèle est découpé après la couche GlobalAveragePooling2D: le tronc
+(convolutions) est gelé, ses embeddings sont calculés une seule fois pour
+tout le dataset et rangés dans des tableaux float32 (N, D) sur disque,
+sous une clé dérivée des poids du tronc et du dataset. La tête (Dropout +
+Dense) est ensuite entraînée directement sur ces embeddings: chaque epoch
+ne lit que quelques Mo au lieu de faire passer les images dans le réseau.
+
+Les couches de la tête sont partagées avec le modèle complet: les poids
+appris y sont donc greffés sans copie. Les embeddings étant calculés une
+fois pour toutes, l'augmentation de données ne s'applique pas.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import FEATURES_DIR
+from src.data.manifest import ValidationManifest
+
+META_NAME = "meta.json"
+META_VERSION = 1
+# Versions de tronc conservées (les plus récentes)
+KEEP_VERSIONS = 3
+
+
+def split_at_embedding(model) -> Tuple[tf.keras.Model, tf.keras.Model]:
+    """
+    Découpe le modèle en (tronc, tête) au niveau de GlobalAveragePooling2D.
+
+    Le tronc va de l'entrée aux embeddings; la tête réutilise les couches
+    suivantes (mêmes objets, mêmes poids) sur une entrée de la taille des
+    embeddings.
+    """
+    pooling_index = next(
+        (i for i, layer in enumerate(model.layers) if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D)),
+        None,
+    )
+    if pooling_index is None:
+        raise ValueError("Le modèle n'a pas de couche GlobalAveragePooling2D")
+
+    pooling = model.layers[pooling_index]
+    backbone = tf.keras.Model(model.inputs, pooling.output, name="backbone")
+
+    head_inputs = tf.keras.Input(shape=pooling.output.shape[1:])
+    x = head_inputs
+    for layer in model.layers[pooling_index + 1:]:
+        x = layer(x)
+    head = tf.keras.Model(head_inputs, x, name="head")
+    return backbone, head
+
+
+def backbone_version(backbone) -> str:
+    """Version du tronc: hash de l'architecture et des valeurs de ses poids."""
+    digest = hashlib.sha256()
+    for weight in backbone.weights:
+        digest.update(f"{weight.path}:{tuple(weight.shape)}".encode("utf-8"))
+        digest.update(np.ascontiguousarray(weight.numpy()).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def features_dir_for(version: str, data_path: Path, image_size: Tuple[int, int],
+                     root: Optional[Path] = None) -> Path:
+    """Répertoire des embeddings d'une version de tronc pour un dataset donné."""
+    key_source = "|".join([
+        version,
+        ValidationManifest(data_path).digest(),
+        "x".join(str(d) for d in image_size),
+    ])
+    key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:16]
+    return Path(root or FEATURES_DIR) / key
+
+
+def read_meta(features_dir: Path) -> Optional[dict]:
+    meta_path = Path(features_dir) / META_NAME
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return meta if meta.get("version") == META_VERSION else None
+    except Exception:
+        return None
+
+
+def save_array(path: Path, array: np.ndarray):
+    """np.save atomique (fichier temporaire puis os.replace)."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def build_features(backbone, datasets: dict, features_dir: Path, version: str) -> Path:
+    """
+    Calcule et écrit les embeddings de chaque split.
+
+    Args:
+        backbone: Tronc gelé (images -> embeddings)
+        datasets: {split: (dataset de lots d'images non mélangé, labels)}
+        features_dir: Répertoire de sortie
+        version: Version du tronc (enregistrée dans meta.json)
+    """
+    features_dir = Path(features_dir)
+    features_dir.mkdir(parents=True, exist_ok=True)
+
+    counts = {}
+    for split, (images_ds, labels) in datasets.items():
+        print(f"Calcul des embeddings ({split}: {len(labels)} images)...")
+        features = backbone.predict(images_ds, verbose=0).astype(np.float32)
+        if len(features) != len(labels):
+            raise RuntimeError(f"{split}: {len(features)} embeddings pour {len(labels)} labels")
+        save_array(features_dir / f"{split}_features.npy", features)
+        save_array(features_dir / f"{split}_labels.npy", np.asarray(labels, dtype=np.int32))
+        counts[split] = len(labels)
+
+    # meta.json en dernier: un cache incomplet n'est jamais considéré valide
+    meta = {
+        "version": META_VERSION,
+        "backbone_version": version,
+        "embedding_dim": int(backbone.output.shape[-1]),
+        "counts": counts,
+    }
+    tmp_meta = features_dir / f"{META_NAME}.{os.getpid()}.tmp"
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, features_dir / META_NAME)
+    return features_dir
+
+
+def load_features(features_dir: Path, split: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(embeddings, labels) d'un split, mappés en mémoire."""
+    features_dir = Path(features_dir)
+    return (
+        np.load(features_dir / f"{split}_features.npy", mmap_mode='r'),
+        np.load(features_dir / f"{split}_labels.npy", mmap_mode='r'),
+    )
+
+
+def prune_feature_caches(keep: Path, root: Optional[Path] = None, keep_last: int = KEEP_VERSIONS):
+    """Supprime les caches les plus anciens, en conservant `keep`."""
+    root = Path(root or FEATURES_DIR)
+    if not root.exists():
+        return
+    caches = sorted(
+        (d for d in root.iterdir() if d.is_dir() and d != Path(keep)),
+        key=lambda d: d.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in caches[max(keep_last - 1, 0):]:
+        shutil.rmtree(stale, ignore_errors=True)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Précision de calcul des modèles: float32 ou mixed_bfloat16.
+
+Avec la politique Keras "mixed_bfloat16", les couches calculent en
+bfloat16 tandis que les poids restent stockés en float32. La couche de
+sortie (sigmoïde) reste en float32: scores et perte gardent leur
+précision. Le bfloat16 ayant la même plage d'exposants que le float32,
+aucune mise à l'échelle de la perte n'est nécessaire.
+
+Sur CPU, le gain suppose les instructions AVX512_BF16 ou AMX; ailleurs le
+bfloat16 est émulé et plus lent que le float32: resolve_precision()
+revient alors au float32.
+"""
+
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import tensorflow as tf
+from keras import mixed_precision
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+PRECISIONS = ("float32", "mixed_bfloat16")
+BF16_CPU_FLAGS = ("avx512_bf16", "amx_bf16")
+
+
+def cpu_supports_bfloat16() -> bool:
+    """Le CPU dispose-t-il d'instructions bfloat16 natives (AVX512_BF16, AMX)?"""
+    try:
+        with open("/proc/cpuinfo", 'r') as f:
+            flags = set()
+            for line in f:
+                if line.startswith("flags"):
+                    flags.update(line.split(":", 1)[1].split())
+    except OSError:
+        # Plateforme sans /proc (macOS, Windows): pas de détection possible
+        return False
+    return any(flag in flags for flag in BF16_CPU_FLAGS)
+
+
+def resolve_precision(requested: str) -> str:
+    """Précision effective: mixed_bfloat16 seulement si le CPU le permet, sinon float32."""
+    if requested not in PRECISIONS:
+        raise ValueError(f"Précision inconnue: {requested} (attendu: {', '.join(PRECISIONS)})")
+    if requested == "mixed_bfloat16" and not cpu_supports_bfloat16():
+        print("bfloat16 non pris en charge par ce CPU (ni AVX512_BF16 ni AMX), repli sur float32")
+        return "float32"
+    return requested
+
+
+@contextmanager
+def precision_policy(precision: str):
+    """Politique Keras appliquée aux couches créées dans le bloc (restaurée en sortie)."""
+    previous = mixed_precision.global_policy()
+    mixed_precision.set_global_policy(precision)
+    try:
+        yield
+    finally:
+        mixed_precision.set_global_policy(previous)
+
+
+def model_precision(model) -> str:
+    """Politique des couches de calcul du modèle (hors entrée, sous-modèles et sortie)."""
+    policies = {
+        layer.dtype_policy.name for layer in model.layers[:-1]
+        if not isinstance(layer, (tf.keras.layers.InputLayer, tf.keras.Model))
+    }
+    return policies.pop() if len(policies) == 1 else "mixed"
+
+
+def apply_precision(model, precision: str):
+    """
+    Modèle calculant dans la précision demandée, sortie en float32.
+
+    Le modèle est cloné couche par couche avec la nouvelle politique et
+    reçoit les mêmes poids; il est retourné tel quel s'il est déjà dans
+    cette précision. Le clone n'est pas compilé (inférence).
+    """
+    output_layer = model.layers[-1]
+    if model_precision(model) == precision and output_layer.dtype_policy.name == "float32":
+        return model
+
+    def clone_layer(layer):
+        config = layer.get_config()
+        if not isinstance(layer, tf.keras.Model):
+            config["dtype"] = "float32" if layer is output_layer else precision
+        return layer.__class__.from_config(config)
+
+    cast_model = tf.keras.models.clone_model(model, clone_function=clone_layer)
+    cast_model.set_weights(model.get_weights())
+    return cast_model
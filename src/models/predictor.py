@@ -1,33 +1,73 @@
 import sys
+import random
 from pathlib import Path
 import tensorflow as tf
 import numpy as np
 from PIL import Image
 import io
+from typing import Dict, Optional
 
 # Ajouter les chemins nécessaires
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from config.settings import MODEL_CONFIG, API_CONFIG
+from config.settings import MODEL_CONFIG, API_CONFIG, CANARY_CONFIG
+from src.models.eval_cache import file_sha256
+from src.models.precision import apply_precision, resolve_precision
+
+def model_version_for(model_path: Path) -> str:
+    """Version d'un modèle: début du hash SHA-256 de son fichier (comme le registre)"""
+    return file_sha256(model_path)[:12]
 
 class CatDogPredictor:
-    def __init__(self):
+    def __init__(self, model_path: Optional[Path] = None, canary_path: Optional[Path] = None,
+                 canary_percent: Optional[float] = None, precision: Optional[str] = None):
         self.image_size = MODEL_CONFIG["image_size"]
-        self.model_path = API_CONFIG["model_path"]
+        # Précision d'inférence: les modèles chargés sont convertis (sortie toujours en float32)
+        self.precision = resolve_precision(precision or MODEL_CONFIG["precision"])
+        self.model_path = Path(model_path) if model_path else API_CONFIG["model_path"]
         self.model = None
+        self.version = None
+        # Versions chargées: {version: modèle}; le canari reçoit canary_percent % du trafic
+        self.models: Dict[str, tf.keras.Model] = {}
+        self.canary_version = None
+        self.canary_percent = CANARY_CONFIG["percent"] if canary_percent is None else canary_percent
         self.load_model()
+        
+        canary_path = canary_path or CANARY_CONFIG["model_path"]
+        if canary_path and self.canary_percent > 0:
+            self.load_canary(Path(canary_path))
     
     def load_model(self):
         """Chargement du modèle"""
         try:
             if self.model_path.exists():
-                self.model = tf.keras.models.load_model(self.model_path)
-                print(f"Modèle chargé: {self.model_path}")
+                self.model = apply_precision(tf.keras.models.load_model(self.model_path), self.precision)
+                self.version = model_version_for(self.model_path)
+                self.models[self.version] = self.model
+                print(f"Modèle chargé: {self.model_path} (version {self.version}, {self.precision})")
             else:
                 print(f"Modèle non trouvé: {self.model_path}")
         except Exception as e:
             print(f"Erreur de chargement du modèle: {e}")
             self.model = None
     
+    def load_canary(self, canary_path: Path):
+        """Chargement d'une version canari, servie pour canary_percent % des requêtes"""
+        try:
+            version = model_version_for(canary_path)
+            if version != self.version:
+                self.models[version] = apply_precision(tf.keras.models.load_model(canary_path), self.precision)
+            self.canary_version = version
+            print(f"Canari chargé: {canary_path} (version {version}, {self.canary_percent:g}% du trafic)")
+        except Exception as e:
+            print(f"Erreur de chargement du canari: {e}")
+            self.canary_version = None
+    
+    def route(self) -> str:
+        """Version qui sert la requête: canari pour canary_percent % du trafic"""
+        if self.canary_version is not None and random.random() * 100 < self.canary_percent:
+            return self.canary_version
+        return self.version
+    
     def preprocess_image(self, image_data: bytes):
         """Préprocessing de l'image"""
         image = Image.open(io.BytesIO(image_data))
@@ -41,13 +81,14 @@ class CatDogPredictor:
         
         return img_array
     
-    def predict(self, image_data: bytes):
-        """Prédiction"""
+    def predict(self, image_data: bytes, version: Optional[str] = None):
+        """Prédiction (par la version indiquée, sinon selon le routage canari)"""
         if self.model is None:
             raise ValueError("Modèle non chargé")
         
+        version = version or self.route()
         processed_image = self.preprocess_image(image_data)
-        prediction = self.model.predict(processed_image, verbose=0)
+        prediction = self.models[version].predict(processed_image, verbose=0)
         score = float(prediction[0][0])
         
         if score > 0.5:
@@ -64,7 +105,8 @@ class CatDogPredictor:
                 "cat": 1 - score,
                 "dog": score
             },
-            "raw_score": score
+            "raw_score": score,
+            "model_version": version
         }
     
     def is_loaded(self):
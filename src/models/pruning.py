@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Élagage par magnitude des poids Conv2D / Dense, et export compressé.
+
+Pendant l'affinage, le callback MagnitudePruning met à zéro les poids de
+plus faible valeur absolue de chaque noyau, selon une parcimonie qui
+croît progressivement (polynomiale, d'ordre 3) jusqu'à la cible, puis
+reste fixe pour les derniers steps. Les masques sont réappliqués après
+chaque step: les poids élagués ne sont pas ranimés par l'optimiseur.
+
+Les couches du modèle ne sont pas enveloppées (le module
+tensorflow_model_optimization ne prend pas en charge Keras 3): le modèle
+élagué est un modèle Keras ordinaire dont les noyaux contiennent des
+zéros. Le format .keras stockant les poids sans compression, l'artefact
+compressé est le fichier .keras passé au gzip; sa taille décroît avec la
+parcimonie. Les noyaux restent denses en mémoire: la latence CPU n'en
+bénéficie pas, seuls le stockage et le transfert des modèles.
+"""
+
+import gzip
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import tensorflow as tf
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def prunable_layers(model) -> List[tf.keras.layers.Layer]:
+    """Couches Conv2D et Dense du modèle (le noyau est élagué, pas le biais)."""
+    return [
+        layer for layer in model.layers
+        if isinstance(layer, (tf.keras.layers.Conv2D, tf.keras.layers.Dense))
+    ]
+
+
+def polynomial_sparsity(step: int, target: float, begin_step: int, end_step: int,
+                        initial: float = 0.0, power: int = 3) -> float:
+    """Parcimonie au step donné: de `initial` à `target` entre begin_step et end_step."""
+    if step <= begin_step:
+        return initial
+    if step >= end_step:
+        return target
+    progress = (step - begin_step) / max(end_step - begin_step, 1)
+    return target + (initial - target) * (1.0 - progress) ** power
+
+
+def kernel_sparsity(model) -> float:
+    """Part des poids nuls dans les noyaux élaguables."""
+    kernels = [layer.kernel.numpy() for layer in prunable_layers(model)]
+    total = sum(kernel.size for kernel in kernels)
+    return float(sum(np.sum(kernel == 0) for kernel in kernels) / total) if total else 0.0
+
+
+class MagnitudePruning(tf.keras.callbacks.Callback):
+    """
+    Élagage progressif par magnitude pendant fit().
+
+    Args:
+        target_sparsity: Part des poids mis à zéro à la fin du calendrier
+        end_step: Step auquel la cible est atteinte
+        frequency: Recalcul des masques tous les `frequency` steps
+        begin_step: Premier step d'élagage
+    """
+
+    def __init__(self, target_sparsity: float, end_step: int, frequency: int = 10, begin_step: int = 0):
+        super().__init__()
+        self.target_sparsity = target_sparsity
+        self.begin_step = begin_step
+        self.end_step = max(end_step, begin_step + 1)
+        self.frequency = max(frequency, 1)
+        self.step = 0
+        self.masks: Dict[str, np.ndarray] = {}
+
+    def _update_masks(self):
+        sparsity = polynomial_sparsity(self.step, self.target_sparsity, self.begin_step, self.end_step)
+        for layer in prunable_layers(self.model):
+            magnitudes = np.abs(layer.kernel.numpy())
+            pruned = int(round(sparsity * magnitudes.size))
+            mask = np.ones_like(magnitudes)
+            if pruned:
+                # Seuil: plus petite magnitude conservée (les ex aequo sont élagués ensemble)
+                threshold = np.partition(magnitudes.reshape(-1), pruned - 1)[pruned - 1]
+                mask = (magnitudes > threshold).astype(magnitudes.dtype)
+            self.masks[layer.name] = mask
+
+    def _apply_masks(self):
+        for layer in prunable_layers(self.model):
+            mask = self.masks.get(layer.name)
+            if mask is not None:
+                layer.kernel.assign(layer.kernel * mask)
+
+    def on_train_begin(self, logs=None):
+        self._update_masks()
+        self._apply_masks()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step += 1
+        if self.step <= self.end_step and self.step % self.frequency == 0:
+            self._update_masks()
+        self._apply_masks()
+
+    def on_train_end(self, logs=None):
+        # Cible atteinte même si l'entraînement s'arrête avant end_step
+        self.step = max(self.step, self.end_step)
+        self._update_masks()
+        self._apply_masks()
+
+
+def gzip_file(path: Path, output: Optional[Path] = None) -> Path:
+    """Compresse un fichier (export .keras.gz)."""
+    output = Path(output or f"{path}.gz")
+    with open(path, 'rb') as source, gzip.open(output, 'wb', compresslevel=9) as target:
+        shutil.copyfileobj(source, target)
+    return output
+
+
+def load_gzipped_model(path: Path):
+    """Charge un modèle exporté en .keras.gz."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = Path(tmp_dir) / Path(path).name[:-len(".gz")]
+        with gzip.open(path, 'rb') as source, open(model_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        return tf.keras.models.load_model(model_path)
+
+
+def measure_artifact(model_path: Path, image_size, runs: int = 30, loads: int = 3) -> Dict[str, float]:
+    """Tailles (.keras et .keras.gz), temps de chargement et latence CPU d'une image."""
+    model_path = Path(model_path)
+    gz_path = Path(f"{model_path}.gz")
+    if not gz_path.exists():
+        gzip_file(model_path, gz_path)
+
+    load_times, gz_load_times = [], []
+    for _ in range(loads):
+        start = time.perf_counter()
+        model = tf.keras.models.load_model(model_path)
+        load_times.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        load_gzipped_model(gz_path)
+        gz_load_times.append((time.perf_counter() - start) * 1000)
+
+    image = np.random.default_rng(0).integers(0, 256, (1, *image_size, 3)).astype(np.float32)
+    for _ in range(3):
+        model(image, training=False)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(image, training=False)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "file_bytes": model_path.stat().st_size,
+        "gzip_bytes": gz_path.stat().st_size,
+        "load_ms": round(float(np.median(load_times)), 2),
+        "gzip_load_ms": round(float(np.median(gz_load_times)), 2),
+        "latency_p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "latency_p90_ms": round(float(np.percentile(timings, 90)), 3),
+        "sparsity": round(kernel_sparsity(model), 4),
+    }
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Registre des modèles, adressé par contenu.
+
+Chaque modèle est rangé sous le hash SHA-256 de son fichier
+(`blobs/<2 premiers caractères>/<hash>.keras`): un modèle identique n'est
+stocké qu'une fois, quel que soit le nombre de sauvegardes. Un index
+unique `index.jsonl`, en ajout seul, enregistre les événements:
+
+- "register": nouveau modèle (type, métriques, modèle parent)
+- "deploy" / "rollback": modèle mis en production
+- "retrain": résultat d'un ré-entraînement (métriques complètes)
+- "remove": fichier du modèle supprimé par le nettoyage
+
+L'index est relu en un seul passage à l'ouverture du registre; les
+requêtes (historique, dernier modèle, modèle en production, retour
+arrière) ne parcourent plus le répertoire des modèles.
+
+La mise en production (promote) remplace le chemin servi par un lien
+symbolique vers le fichier du registre, créé à côté puis renommé par
+dessus l'ancien (os.replace): l'opération est atomique et ne copie rien,
+quelle que soit la taille du modèle. Un lecteur ouvre soit l'ancien
+modèle, soit le nouveau, jamais un fichier partiel. Les fichiers du
+registre ne sont jamais réécrits: aucune écriture ne doit passer par le
+chemin servi.
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import REGISTRY_DIR
+from src.models.eval_cache import file_sha256
+
+INDEX_NAME = "index.jsonl"
+
+
+def atomic_link(source: Path, target: Path) -> str:
+    """
+    Fait pointer `target` vers `source` par un renommage atomique.
+
+    Un lien symbolique (relatif) est préféré; à défaut (système de fichiers
+    ou plateforme sans liens symboliques), un lien physique, puis une copie.
+    Dans tous les cas le nouveau chemin est préparé à côté de `target` puis
+    renommé par dessus avec os.replace.
+
+    Returns:
+        Mode utilisé: "symlink", "hardlink" ou "copy"
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    try:
+        os.symlink(os.path.relpath(source, target.parent), tmp_path)
+        mode = "symlink"
+    except (OSError, NotImplementedError):
+        try:
+            os.link(source, tmp_path)
+            mode = "hardlink"
+        except OSError:
+            shutil.copy2(source, tmp_path)
+            mode = "copy"
+
+    os.replace(tmp_path, target)
+    return mode
+
+
+class ModelRegistry:
+    """Modèles stockés par hash, événements dans un index en ajout seul."""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or REGISTRY_DIR)
+        self.blobs_dir = self.root / "blobs"
+        self.index_path = self.root / INDEX_NAME
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.retrains: List[Dict[str, Any]] = []
+        self.deployments: List[Dict[str, Any]] = []
+        self._load()
+
+    def _load(self):
+        """Relit l'index (les lignes illisibles, ex. écriture interrompue, sont ignorées)."""
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    continue
+
+    def _apply(self, event: Dict[str, Any]):
+        kind = event.get("event")
+        if kind == "register":
+            self.models[event["sha256"]] = dict(event)
+        elif kind in ("deploy", "rollback"):
+            self.deployments.append(event)
+        elif kind == "retrain":
+            self.retrains.append(event)
+        elif kind == "remove" and event.get("sha256") in self.models:
+            self.models[event["sha256"]]["removed"] = True
+
+    def _append(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Ajoute un événement: une ligne, écrite en une fois et synchronisée."""
+        event = {"event": event.pop("event"), "at": datetime.now().isoformat(), **event}
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(event)
+        return event
+
+    def blob_path(self, sha256: str) -> Path:
+        """Chemin du modèle: blobs/<2 premiers caractères>/<hash>.keras."""
+        return self.blobs_dir / sha256[:2] / f"{sha256}.keras"
+
+    def register(self, model_path: Path, kind: str,
+                 metrics: Optional[Dict[str, Any]] = None,
+                 parent: Optional[str] = None) -> str:
+        """
+        Enregistre un fichier de modèle et retourne son hash.
+
+        Un modèle déjà présent n'est ni recopié ni réenregistré.
+
+        Args:
+            model_path: Fichier .keras à enregistrer
+            kind: Origine du modèle ("trained", "retrained", "production", ...)
+            metrics: Métriques d'évaluation associées
+            parent: Hash du modèle dont il est issu
+        """
+        sha256 = file_sha256(model_path)
+        target = self.blob_path(sha256)
+        if not target.exists():
+            # Copie atomique: un lecteur ne voit jamais un fichier partiel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f".{sha256}.{os.getpid()}.tmp")
+            shutil.copy2(model_path, tmp_path)
+            os.replace(tmp_path, target)
+
+        if sha256 not in self.models or self.models[sha256].get("removed"):
+            self._append({
+                "event": "register",
+                "sha256": sha256,
+                "kind": kind,
+                "size": target.stat().st_size,
+                "source": Path(model_path).name,
+                "parent": parent,
+                "metrics": metrics or {},
+            })
+        return sha256
+
+    def promote(self, sha256: str, target: Path, event: str = "deploy") -> Dict[str, Any]:
+        """
+        Met un modèle du registre en production sous `target`, atomiquement.
+
+        Args:
+            sha256: Hash du modèle (déjà enregistré)
+            target: Chemin servi (ex. API_CONFIG["model_path"])
+            event: "deploy" ou "rollback"
+        """
+        blob = self.blob_path(sha256)
+        if not blob.exists():
+            raise FileNotFoundError(f"Modèle absent du registre: {sha256}")
+        mode = atomic_link(blob, Path(target))
+        print(f"Modèle {sha256[:12]} en production ({mode}): {target}")
+        return self.record_deployment(sha256, event=event)
+
+    def record_deployment(self, sha256: str, event: str = "deploy") -> Dict[str, Any]:
+        """Enregistre la mise en production d'un modèle ("deploy" ou "rollback")."""
+        return self._append({"event": event, "sha256": sha256, "previous": self.current()})
+
+    def record_retrain(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Enregistre le résultat d'un ré-entraînement."""
+        return self._append({"event": "retrain", **metrics})
+
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        return self.models.get(sha256)
+
+    def current(self) -> Optional[str]:
+        """Hash du modèle en production (dernier déploiement ou retour arrière)."""
+        return self.deployments[-1]["sha256"] if self.deployments else None
+
+    def latest(self, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Dernier modèle enregistré (éventuellement d'un type donné)."""
+        for entry in reversed(list(self.models.values())):
+            if not entry.get("removed") and (kind is None or entry["kind"] == kind):
+                return entry
+        return None
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ré-entraînements, du plus récent au plus ancien."""
+        records = sorted(self.retrains, key=lambda x: x.get('timestamp', x["at"]), reverse=True)
+        return records[:limit] if limit else records
+
+    def deployment_stack(self) -> List[str]:
+        """
+        Modèles successivement mis en production, le modèle actuel en dernier.
+
+        Un retour arrière retire de la pile les modèles déployés après sa
+        cible: un modèle écarté n'est plus candidat à un retour arrière
+        suivant.
+        """
+        stack: List[str] = []
+        for deployment in self.deployments:
+            sha256 = deployment["sha256"]
+            if deployment["event"] == "rollback" and sha256 in stack:
+                last = len(stack) - 1 - stack[::-1].index(sha256)
+                del stack[last + 1:]
+            else:
+                stack.append(sha256)
+        return stack
+
+    def rollback_target(self) -> Optional[str]:
+        """
+        Modèle à restaurer: le dernier modèle en production avant le modèle
+        actuel (hors modèles écartés par un retour arrière), dont le fichier
+        est encore présent.
+        """
+        stack = self.deployment_stack()
+        current = stack[-1] if stack else None
+        for sha256 in reversed(stack[:-1]):
+            if sha256 != current and self.blob_path(sha256).exists():
+                return sha256
+        return None
+
+    def prune(self, keep_last: int = 5) -> List[str]:
+        """
+        Supprime les fichiers des modèles les plus anciens.
+
+        Sont toujours conservés: les `keep_last` derniers modèles enregistrés,
+        le modèle en production et la cible d'un retour arrière.
+        """
+        protected = {self.current(), self.rollback_target()}
+        alive = [sha for sha, entry in self.models.items() if not entry.get("removed")]
+        removed = []
+        for sha256 in alive[:max(len(alive) - keep_last, 0)]:
+            if sha256 in protected:
+                continue
+            self.blob_path(sha256).unlink(missing_ok=True)
+            self._append({"event": "remove", "sha256": sha256})
+            removed.append(sha256)
+        return removed
@@ -10,15 +10,21 @@ import numpy as np
 from datetime import datetime
 import json
 import shutil
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, List, Optional, Set, Tuple
 
 # Ajouter le répertoire racine au path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from config.settings import MODEL_CONFIG, MODELS_DIR
+from config.settings import INCREMENTAL_CONFIG, MODEL_CONFIG, MODELS_DIR
 from src.models.trainer import CatDogTrainer
 from src.data.feedback_handler import FeedbackDataHandler
+from src.data.augmentation import apply_augmentation
+from src.monitoring.training_profiler import make_profiler
+from src.models.checkpointing import fit_resumable
+from src.models.eval_cache import EvaluationCache, file_sha256
+from src.models.registry import ModelRegistry
 
 
 class ModelRetrainer:
@@ -29,11 +35,12 @@ class ModelRetrainer:
         self.models_dir = MODELS_DIR
         self.feedback_handler = FeedbackDataHandler()
         self.original_trainer = CatDogTrainer()
+        self.eval_cache = EvaluationCache()
         
         # Créer les répertoires nécessaires
         self.models_dir.mkdir(parents=True, exist_ok=True)
-        self.backup_dir = self.models_dir / "backups"
-        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        # Modèles, déploiements et historique (remplace backups/ et retrain_metrics_*.json)
+        self.registry = ModelRegistry()
         
     def retrain_with_feedback(self, 
                             days_back: int = 30,
@@ -41,7 +48,12 @@ class ModelRetrainer:
                             min_negative_feedback: int = 20,
                             min_positive_rate: float = 0.7,
                             retrain_epochs: int = 5,
-                            learning_rate: float = 0.0001) -> Dict[str, Any]:
+                            learning_rate: float = 0.0001,
+                            profile: bool = False,
+                            trace_steps: Optional[Tuple[int, int]] = None,
+                            resume: bool = False,
+                            incremental: bool = False,
+                            replay_size: Optional[int] = None) -> Dict[str, Any]:
         """
         Ré-entraîne le modèle en utilisant les données de feedback.
         
@@ -52,6 +64,12 @@ class ModelRetrainer:
             min_positive_rate: Taux minimum de feedbacks positifs
             retrain_epochs: Nombre d'époques pour le ré-entraînement
             learning_rate: Taux d'apprentissage pour le ré-entraînement
+            profile: Profilage par epoch (rapport retrain_profile_*.json)
+            trace_steps: Fenêtre (début, fin) de steps à tracer avec le profiler TensorFlow
+            resume: Reprendre depuis le dernier checkpoint complet (sinon il est effacé)
+            incremental: Affiner le modèle actuel sur les seuls nouveaux feedbacks,
+                plus un échantillon de rejeu du dataset de base
+            replay_size: Taille de l'échantillon de rejeu (défaut: INCREMENTAL_CONFIG)
             
         Returns:
             Dictionnaire avec les résultats du ré-entraînement
@@ -74,12 +92,14 @@ class ModelRetrainer:
                 "timestamp": start_time.isoformat()
             }
         
-        # 2. Sauvegarder le modèle actuel
+        # 2. Sauvegarder le modèle actuel (registre: pas de copie s'il y est déjà)
         current_model_path = self.models_dir / "cats_dogs_model.keras"
+        current_sha256 = None
         if current_model_path.exists():
-            backup_path = self.backup_dir / f"model_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.keras"
-            shutil.copy2(current_model_path, backup_path)
-            print(f"Modèle actuel sauvegardé: {backup_path}")
+            current_sha256 = self.registry.register(current_model_path, kind="production")
+            if self.registry.current() != current_sha256:
+                self.registry.record_deployment(current_sha256)
+            print(f"Modèle actuel sauvegardé: {self.registry.blob_path(current_sha256)}")
         
         # 3. Récupérer les données de feedback
         feedback_data = self.feedback_handler.get_feedback_data(days_back=days_back)
@@ -87,15 +107,39 @@ class ModelRetrainer:
         
         # 4. Préparer les données d'entraînement
         print("Préparation des données d'entraînement...")
-        train_ds, val_ds = self.original_trainer.prepare_data()
+        new_feedback_ids, replay_count = [], 0
+        if incremental:
+            train_ds, val_ds, new_feedback_ids, replay_count = self._prepare_incremental_data(
+                feedback_data, replay_size if replay_size is not None else INCREMENTAL_CONFIG["replay_size"]
+            )
+            if train_ds is None:
+                return {
+                    "status": "skipped",
+                    "reason": "Aucun nouveau feedback avec image à intégrer",
+                    "mode": "incremental",
+                    "statistics": stats,
+                    "timestamp": start_time.isoformat()
+                }
+        else:
+            train_ds, val_ds = self.original_trainer.prepare_data()
+        validation_key = self.original_trainer.validation_key(
+            self.original_trainer.data_path, split="files" if incremental else None
+        )
         
-        # 5. Charger le modèle existant
+        # 5. Charger le modèle existant, évalué avant l'affinage (résultat en cache)
         if current_model_path.exists():
             model = tf.keras.models.load_model(current_model_path)
             print("Modèle existant chargé")
+            old_model_metrics = self._evaluate_old_model(val_ds, current_model_path, model, validation_key)
         else:
             print("Aucun modèle existant trouvé, création d'un nouveau modèle")
             model = self.original_trainer.create_model()
+            old_model_metrics = {"accuracy": 0.0, "loss": float('inf')}
+        
+        # Un modèle exporté pour l'inférence n'a plus de couches d'augmentation:
+        # l'augmentation est alors faite dans le pipeline tf.data
+        if self.config["augmentation"] == "model" and not self.original_trainer.has_augmentation(model):
+            train_ds = apply_augmentation(train_ds, seed=self.config["seed"])
         
         # 6. Configurer le ré-entraînement
         model.compile(
@@ -126,35 +170,62 @@ class ModelRetrainer:
                 min_lr=1e-7
             )
         ]
+        profiler = None
+        if profile or trace_steps:
+            profiler = make_profiler(
+                train_ds, self.original_trainer.batch_size, trace_steps=trace_steps,
+                output_dir=self.models_dir, run_name="retrain",
+            )
+            callbacks.append(profiler)
         
         # 8. Ré-entraînement
-        print(f"Début du ré-entraînement pour {retrain_epochs} époques...")
+        print(f"Début du ré-entraînement {'incrémental ' if incremental else ''}pour {retrain_epochs} époques...")
         
         try:
-            history = model.fit(
-                train_ds,
+            # Checkpoints de reprise périodiques (poids, optimiseur, epoch, step)
+            history = fit_resumable(
+                model, train_ds, val_ds,
                 epochs=retrain_epochs,
                 callbacks=callbacks,
-                validation_data=val_ds,
-                verbose=1
+                run_name="retrain_incremental" if incremental else "retrain",
+                resume=resume,
+                save_steps=self.config["checkpoint_steps"],
             )
             
+            # Modèle candidat exporté sans couches d'augmentation
+            self.original_trainer.export_inference_model(model, retrain_model_path)
+            
             # 9. Évaluation du nouveau modèle
             print("Évaluation du modèle ré-entraîné...")
             val_loss, val_accuracy = model.evaluate(val_ds, verbose=0)
             
-            # 10. Comparaison avec l'ancien modèle
-            old_model_metrics = self._evaluate_old_model(val_ds, current_model_path)
+            # 10. Comparaison avec l'ancien modèle (évalué à l'étape 5)
+            
+            # Candidat rangé dans le registre, avec sa lignée
+            candidate_sha256 = self.registry.register(
+                retrain_model_path, kind="retrained", parent=current_sha256,
+                metrics={"accuracy": float(val_accuracy), "loss": float(val_loss)},
+            )
+            retrain_model_path.unlink(missing_ok=True)
+            retrain_model_path = self.registry.blob_path(candidate_sha256)
             
             # 11. Décision de déploiement
             improvement_threshold = 0.02  # 2% d'amélioration minimum
             should_deploy = val_accuracy > (old_model_metrics.get('accuracy', 0) + improvement_threshold)
             
             if should_deploy:
-                # Remplacer le modèle en production
-                shutil.copy2(retrain_model_path, current_model_path)
+                # Remplacer le modèle en production (renommage atomique, sans copie)
+                self.registry.promote(candidate_sha256, current_model_path)
                 print("✅ Nouveau modèle déployé en production")
                 deployment_status = "deployed"
+                # Évaluation déjà connue pour le nouveau modèle en production
+                self.eval_cache.put(
+                    candidate_sha256, validation_key,
+                    {"accuracy": val_accuracy, "loss": val_loss},
+                )
+                # Feedbacks désormais intégrés au modèle en production
+                if new_feedback_ids:
+                    self._mark_feedback_consumed(new_feedback_ids)
             else:
                 print("❌ Nouveau modèle non déployé (amélioration insuffisante)")
                 deployment_status = "not_deployed"
@@ -162,6 +233,7 @@ class ModelRetrainer:
             # 12. Sauvegarder les métriques
             retrain_metrics = {
                 "status": "completed",
+                "mode": "incremental" if incremental else "full",
                 "deployment_status": deployment_status,
                 "retrain_epochs": retrain_epochs,
                 "final_accuracy": float(val_accuracy),
@@ -170,7 +242,11 @@ class ModelRetrainer:
                 "improvement": float(val_accuracy - old_model_metrics.get('accuracy', 0)),
                 "feedback_count": len(feedback_data),
                 "statistics": stats,
+                "new_feedback_count": len(new_feedback_ids),
+                "replay_count": replay_count,
                 "model_path": str(retrain_model_path),
+                "model_sha256": candidate_sha256,
+                "parent_sha256": current_sha256,
                 "timestamp": start_time.isoformat(),
                 "duration_minutes": (datetime.now() - start_time).total_seconds() / 60,
                 "history": {
@@ -180,11 +256,12 @@ class ModelRetrainer:
                     "val_loss": [float(x) for x in history.history['val_loss']]
                 }
             }
+            if profiler is not None:
+                retrain_metrics["profile"] = profiler.summary()
+                retrain_metrics["profile_path"] = str(profiler.report_path)
             
-            # Sauvegarder les métriques
-            metrics_path = self.models_dir / f"retrain_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(metrics_path, 'w') as f:
-                json.dump(retrain_metrics, f, indent=2)
+            # Sauvegarder les métriques (index du registre)
+            self.registry.record_retrain(retrain_metrics)
             
             print("=== RÉ-ENTRAÎNEMENT TERMINÉ ===")
             return retrain_metrics
@@ -198,39 +275,113 @@ class ModelRetrainer:
             }
             
             print(f"❌ Erreur lors du ré-entraînement: {e}")
+            self.registry.record_retrain(error_metrics)
             return error_metrics
     
-    def _evaluate_old_model(self, val_ds, model_path: Path) -> Dict[str, float]:
-        """Évalue l'ancien modèle pour comparaison."""
+    def _prepare_incremental_data(self, feedback_data: List[Dict[str, Any]], replay_size: int):
+        """
+        Données du mode incrémental: nouveaux feedbacks + rejeu, et validation
+        sur le découpage correspondant du dataset de base.
+        
+        Returns:
+            Tuple (train_ds ou None si rien à intégrer, val_ds, ids des feedbacks, taille du rejeu)
+        """
+        trainer = self.original_trainer
+        data_path = trainer.prepare_sources()
+        train_ds, feedback_ids, replay_count = self.feedback_handler.prepare_incremental_data(
+            feedback_data, data_path,
+            consumed_ids=self._load_consumed_ids(),
+            replay_size=replay_size,
+            batch_size=trainer.batch_size,
+            seed=self.config["seed"],
+        )
+        if train_ds is None:
+            return None, None, [], 0
+        
+        # Images de rejeu tirées du même découpage: validation sans recouvrement
+        _, val_ds = trainer._decode_datasets(data_path)
+        return train_ds, val_ds.prefetch(tf.data.AUTOTUNE), feedback_ids, replay_count
+    
+    def _load_consumed_ids(self) -> Set[Any]:
+        """Identifiants des feedbacks déjà intégrés au modèle en production."""
+        state_path = INCREMENTAL_CONFIG["state_path"]
+        if not state_path.exists():
+            return set()
         try:
-            if model_path.exists():
-                old_model = tf.keras.models.load_model(model_path)
-                val_loss, val_accuracy = old_model.evaluate(val_ds, verbose=0)
-                return {"accuracy": float(val_accuracy), "loss": float(val_loss)}
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return set(json.load(f).get("consumed_ids", []))
+        except (OSError, ValueError) as e:
+            print(f"État incrémental illisible ({e}), aucun feedback considéré comme intégré")
+            return set()
+    
+    def _mark_feedback_consumed(self, feedback_ids: List[Any]):
+        """Ajoute des feedbacks à l'état incrémental (écriture atomique)."""
+        state_path = INCREMENTAL_CONFIG["state_path"]
+        consumed = self._load_consumed_ids() | set(feedback_ids)
+        state = {
+            "consumed_ids": sorted(consumed),
+            "updated_at": datetime.now().isoformat(),
+        }
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = state_path.with_name(f"{state_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, state_path)
+        print(f"{len(feedback_ids)} feedbacks marqués comme intégrés ({len(consumed)} au total)")
+    
+    def _evaluate_old_model(self, val_ds, model_path: Path, model, validation_key: str) -> Dict[str, float]:
+        """
+        Évalue l'ancien modèle pour comparaison.
+        
+        `model` est le modèle déjà chargé depuis `model_path`, pas encore
+        affiné. L'évaluation est mise en cache par (hash du fichier, clé de
+        validation): elle n'est refaite que si le modèle ou les données changent.
+        """
+        try:
+            model_sha256 = file_sha256(model_path)
+            cached = self.eval_cache.get(model_sha256, validation_key)
+            if cached is not None:
+                print(f"Évaluation du modèle actuel en cache: accuracy={cached['accuracy']:.4f}")
+                return cached
+            
+            print("Évaluation du modèle actuel...")
+            val_loss, val_accuracy = model.evaluate(val_ds, verbose=0)
+            metrics = {"accuracy": float(val_accuracy), "loss": float(val_loss)}
+            self.eval_cache.put(model_sha256, validation_key, metrics)
+            return metrics
         except Exception as e:
             print(f"Erreur lors de l'évaluation de l'ancien modèle: {e}")
         
         return {"accuracy": 0.0, "loss": float('inf')}
     
     def get_retrain_history(self) -> List[Dict[str, Any]]:
-        """Récupère l'historique des ré-entraînements."""
-        history = []
+        """Récupère l'historique des ré-entraînements (index du registre)."""
+        return self.registry.history()
+    
+    def rollback(self) -> Optional[str]:
+        """
+        Remet en production le modèle déployé avant le modèle actuel.
         
-        for metrics_file in self.models_dir.glob("retrain_metrics_*.json"):
-            try:
-                with open(metrics_file, 'r') as f:
-                    data = json.load(f)
-                    history.append(data)
-            except Exception as e:
-                print(f"Erreur lors de la lecture de {metrics_file}: {e}")
+        Returns:
+            Hash du modèle restauré, ou None si aucun modèle antérieur n'est disponible
+        """
+        target = self.registry.rollback_target()
+        if target is None:
+            print("Aucun modèle antérieur disponible pour un retour arrière")
+            return None
         
-        # Trier par timestamp
-        history.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return history
+        current_model_path = self.models_dir / "cats_dogs_model.keras"
+        self.registry.promote(target, current_model_path, event="rollback")
+        print(f"Retour arrière: modèle {target[:12]} remis en production")
+        return target
     
     def cleanup_old_models(self, keep_last: int = 5):
         """Nettoie les anciens modèles et métriques."""
-        # Nettoyer les modèles ré-entraînés
+        # Registre: modèles en production et cible de retour arrière conservés
+        for sha256 in self.registry.prune(keep_last):
+            print(f"Ancien modèle supprimé du registre: {sha256[:12]}")
+        
+        # Fichiers antérieurs au registre
         retrained_models = list(self.models_dir.glob("cats_dogs_model_retrained_*.keras"))
         retrained_models.sort(key=lambda x: x.stat().st_mtime, reverse=True)
         
@@ -1,27 +1,136 @@
+import os
 import sys
+import hashlib
+import shutil
 from pathlib import Path
+from typing import Optional, Tuple
+import numpy as np
 import tensorflow as tf
 from keras import layers, models
 
 # Ajouter les chemins nécessaires
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from config.settings import MODEL_CONFIG, MODELS_DIR
-from src.data.preprocessing import clean_corrupted_images, setup_data_directory
+from config.settings import MODEL_CONFIG, MODELS_DIR, PRUNING_CONFIG, TF_CACHE_DIR
+from src.data.manifest import ValidationManifest
+from src.data.preprocessing import clean_corrupted_images, data_directory, setup_data_directory
+from src.data.shards import ensure_shards, list_labeled_files, load_shard_datasets
+from src.data.augmentation import apply_augmentation
+from src.monitoring.training_profiler import make_profiler
+from src.models.checkpointing import checkpoint_dir_for, fit_resumable
+from src.models.registry import ModelRegistry
+from src.models.distributed import (
+    adapt_model_to_strategy, distribute_dataset, get_strategy, global_batch_size, is_chief, worker_dir, worker_task,
+)
+from src.data.mmap_dataset import ensure_mmap_dataset, load_mmap_datasets
+from src.models.pruning import MagnitudePruning
+from src.models.precision import precision_policy, resolve_precision
+from src.models.feature_cache import (
+    backbone_version, build_features, features_dir_for, load_features, prune_feature_caches, read_meta,
+    split_at_embedding,
+)
+
+# Clés du cache tf.data conservées (les plus récemment utilisées)
+TF_CACHE_KEEP = 3
+
+
+def prune_tf_caches(keep: Path, root: Optional[Path] = None, keep_last: int = TF_CACHE_KEEP):
+    """
+    Supprime les caches tf.data des clés les moins récemment utilisées.
+    
+    Les caches d'une autre exécution (ex. ré-entraînement planifié avec une
+    autre taille de lot) ne sont pas supprimés tant qu'ils sont parmi les
+    `keep_last` plus récents, ni pendant leur écriture (verrous *.lockfile).
+    """
+    root = Path(root or TF_CACHE_DIR)
+    if not root.exists():
+        return
+    caches = sorted(
+        (d for d in root.iterdir() if d.is_dir() and d != Path(keep)),
+        key=lambda d: d.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in caches[max(keep_last - 1, 0):]:
+        if not any(stale.glob("*.lockfile")):
+            shutil.rmtree(stale, ignore_errors=True)
 
 class CatDogTrainer:
-    def __init__(self):
-        self.config = MODEL_CONFIG
+    def __init__(self, **overrides):
+        # Surcharges ponctuelles de MODEL_CONFIG (ex: epochs, batch_size)
+        self.config = dict(MODEL_CONFIG, **overrides) if overrides else MODEL_CONFIG
         self.models_dir = MODELS_DIR
         self.models_dir.mkdir(parents=True, exist_ok=True)
         
-    def prepare_data(self):
-        """Préparation des données"""
+        # Stratégie de distribution (à créer avant toute autre opération TF)
+        self.strategy = get_strategy(self.config["distribute"])
+        self.batch_size = global_batch_size(self.config["batch_size"], self.strategy)
+        self.precision = resolve_precision(self.config["precision"])
+        
+    def prepare_sources(self) -> Path:
+        """
+        Préparation des fichiers sources (répertoire, nettoyage, conversions)
+        
+        Exécutée une seule fois par le lanceur multi-worker avant le démarrage
+        des workers: avec MODEL_CONFIG["data_prepared"] (DATA_PREPARED=true,
+        posé par le lanceur), les workers lisent le répertoire préparé sans
+        rien réécrire, ce qui évite des préparations concurrentes sur TEMP_DIR.
+        """
+        if self.config["data_prepared"]:
+            self.data_path = data_directory()
+            return self.data_path
+        
         # Configuration du répertoire de données
         data_path = setup_data_directory()
+        self.data_path = data_path
         
         # Nettoyage
         clean_corrupted_images(data_path)
         
+        if self.config["input_backend"] == "shards":
+            ensure_shards(data_path, self.config["image_size"])
+        elif self.config["input_backend"] == "mmap":
+            ensure_mmap_dataset(data_path, self.config["image_size"])
+        
+        return data_path
+    
+    def prepare_data(self):
+        """Préparation des données"""
+        data_path = self.prepare_sources()
+        
+        train_ds, val_ds = self._load_datasets(data_path)
+        
+        # Augmentation dans le pipeline, sur les workers CPU
+        if self.config["augmentation"] == "pipeline":
+            train_ds = apply_augmentation(train_ds, seed=self.config["seed"])
+        
+        # Multi-worker: chaque worker traite sa part de chaque lot global
+        if self.config["distribute"] != "none":
+            train_ds = distribute_dataset(self.strategy, train_ds, self.batch_size)
+            val_ds = distribute_dataset(self.strategy, val_ds, self.batch_size)
+        
+        return train_ds, val_ds
+    
+    def _load_datasets(self, data_path: Path):
+        """Datasets (train, val) selon le backend configuré"""
+        # Shards pré-décodés: conversion unique, puis lecture sans décodage JPEG
+        if self.config["input_backend"] == "shards":
+            shards_dir = ensure_shards(data_path, self.config["image_size"])
+            return load_shard_datasets(shards_dir, self.batch_size)
+        
+        # Tableau mappé: lots lus par tranches, partagés via le cache de pages
+        if self.config["input_backend"] == "mmap":
+            mmap_dir = ensure_mmap_dataset(data_path, self.config["image_size"])
+            return load_mmap_datasets(mmap_dir, self.batch_size)
+        
+        AUTOTUNE = tf.data.AUTOTUNE
+        train_cache, val_cache = self._cache_files(data_path)
+        
+        # Mode pipeline: décodage explicite et parallèle, mélange reproductible
+        if self.config["augmentation"] == "pipeline":
+            train_ds, val_ds = self._decode_datasets(data_path)
+            train_ds = train_ds.cache(train_cache).shuffle(1000, seed=self.config["seed"])
+            val_ds = val_ds.cache(val_cache).prefetch(buffer_size=AUTOTUNE)
+            return train_ds, val_ds
+        
         # Création des datasets
         train_ds, val_ds = tf.keras.utils.image_dataset_from_directory(
             data_path,
@@ -29,38 +138,136 @@ class CatDogTrainer:
             subset="both",
             seed=1337,
             image_size=self.config["image_size"],
-            batch_size=self.config["batch_size"],
+            batch_size=self.batch_size,
         )
         
         # Optimisations
-        AUTOTUNE = tf.data.AUTOTUNE
-        train_ds = train_ds.cache().shuffle(1000).prefetch(buffer_size=AUTOTUNE)
-        val_ds = val_ds.cache().prefetch(buffer_size=AUTOTUNE)
+        train_ds = train_ds.cache(train_cache).shuffle(1000).prefetch(buffer_size=AUTOTUNE)
+        val_ds = val_ds.cache(val_cache).prefetch(buffer_size=AUTOTUNE)
         
         return train_ds, val_ds
     
-    def create_model(self):
-        """Création du modèle"""
-        data_augmentation = tf.keras.Sequential([
-            layers.RandomFlip("horizontal"),
-            layers.RandomRotation(0.1),
-            layers.RandomZoom(0.1),
+    def _decode_datasets(self, data_path: Path):
+        """Lecture et décodage des JPEG en parallèle (num_parallel_calls=AUTOTUNE)"""
+        AUTOTUNE = tf.data.AUTOTUNE
+        image_size = self.config["image_size"]
+        train_files, val_files = list_labeled_files(data_path, validation_split=0.2, seed=self.config["seed"])
+        
+        def decode(path, label):
+            image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+            image = tf.image.resize(image, image_size)
+            image.set_shape((*image_size, 3))
+            return image, label
+        
+        def make_dataset(samples):
+            paths = tf.constant([str(fpath) for fpath, _ in samples], dtype=tf.string)
+            labels = tf.constant([label for _, label in samples], dtype=tf.int32)
+            return (
+                tf.data.Dataset.from_tensor_slices((paths, labels))
+                .map(decode, num_parallel_calls=AUTOTUNE)
+                .batch(self.batch_size)
+            )
+        
+        return make_dataset(train_files), make_dataset(val_files)
+    
+    def validation_key(self, data_path: Path, split: Optional[str] = None) -> str:
+        """
+        Clé du jeu de validation: contenu du dataset, découpage et taille d'image
+        
+        `split` vaut "keras" (image_dataset_from_directory) ou "files"
+        (list_labeled_files, backends shards/mmap et mode pipeline); par
+        défaut, celui du chargeur configuré.
+        """
+        if split is None:
+            keras_split = self.config["input_backend"] == "directory" and self.config["augmentation"] != "pipeline"
+            split = "keras" if keras_split else "files"
+        key_source = "|".join([
+            ValidationManifest(data_path).digest(),
+            split,
+            str(self.config["seed"]),
+            "x".join(str(d) for d in self.config["image_size"]),
         ])
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:16]
+    
+    def _cache_files(self, data_path: Path):
+        """
+        Fichiers du cache tf.data sur disque ("" = cache en mémoire)
+        
+        Le cache est rangé sous une clé dérivée de l'empreinte du dataset
+        (manifeste de validation), de la taille d'image et de la taille de
+        lot: il est réutilisé tant que les données ne changent pas; seuls
+        les caches des clés les moins récemment utilisées sont supprimés
+        (voir prune_tf_caches).
+        """
+        if TF_CACHE_DIR is None:
+            return "", ""
         
+        key_source = "|".join([
+            ValidationManifest(data_path).digest(),
+            "x".join(str(d) for d in self.config["image_size"]),
+            str(self.batch_size),
+            # Les deux chargeurs "directory" n'ont pas le même découpage train/val
+            "pipeline" if self.config["augmentation"] == "pipeline" else "keras",
+        ])
+        key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()[:16]
+        cache_dir = TF_CACHE_DIR / key
+        
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Date d'utilisation: ordre de suppression des anciennes clés
+        os.utime(cache_dir)
+        prune_tf_caches(cache_dir)
+        
+        # Un fichier de cache par worker: les écritures concurrentes sont refusées
+        suffix = ""
+        if self.config["distribute"] != "none":
+            task_type, task_id = worker_task(self.strategy)
+            suffix = f"-{task_type}{task_id}"
+        train_name, val_name = f"train{suffix}", f"val{suffix}"
+        
+        # Verrous laissés par un entraînement interrompu pendant l'écriture
+        for name in (train_name, val_name):
+            for lockfile in cache_dir.glob(f"{name}_*.lockfile"):
+                lockfile.unlink()
+        
+        if (cache_dir / f"{train_name}.index").exists():
+            print(f"Cache tf.data réutilisé: {cache_dir}")
+        return str(cache_dir / train_name), str(cache_dir / val_name)
+    
+    def create_model(self, augment: Optional[bool] = None):
+        """
+        Création du modèle
+        
+        Les couches d'augmentation ne sont incluses qu'en mode "model"
+        (ou si `augment=True`); en mode "pipeline" elles s'exécutent dans tf.data.
+        """
+        if augment is None:
+            augment = self.config["augmentation"] == "model"
+        
+        # Variables créées sous la stratégie: répliquées et synchronisées entre workers;
+        # couches créées sous la politique de précision (MODEL_CONFIG["precision"])
+        with self.strategy.scope(), precision_policy(self.precision):
+            model = self._build_model(augment)
+        return adapt_model_to_strategy(model, self.strategy)
+    
+    def _build_model(self, augment: bool):
         inputs = tf.keras.Input(shape=self.config["image_size"] + (3,))
         x = layers.Rescaling(1.0/255)(inputs)
-        x = data_augmentation(x)
+        if augment:
+            data_augmentation = tf.keras.Sequential([
+                layers.RandomFlip("horizontal"),
+                layers.RandomRotation(0.1),
+                layers.RandomZoom(0.1),
+            ], name="data_augmentation")
+            x = data_augmentation(x)
         
-        x = layers.Conv2D(32, 3, activation='relu')(x)
-        x = layers.MaxPooling2D()(x)
-        x = layers.Conv2D(64, 3, activation='relu')(x)
-        x = layers.MaxPooling2D()(x)
-        x = layers.Conv2D(128, 3, activation='relu')(x)
-        x = layers.MaxPooling2D()(x)
+        for width in self.config["conv_widths"]:
+            x = layers.Conv2D(width, 3, activation='relu')(x)
+            x = layers.MaxPooling2D()(x)
         
         x = layers.GlobalAveragePooling2D()(x)
         x = layers.Dropout(0.5)(x)
-        outputs = layers.Dense(1, activation='sigmoid')(x)
+        # Sortie en float32 quelle que soit la précision de calcul
+        outputs = layers.Dense(1, activation='sigmoid', dtype='float32')(x)
         
         model = tf.keras.Model(inputs, outputs)
         model.compile(
@@ -71,16 +278,72 @@ class CatDogTrainer:
         
         return model
     
-    def train(self):
-        """Entraînement du modèle"""
+    @staticmethod
+    def _is_augmentation_layer(layer) -> bool:
+        """Couche d'augmentation aléatoire (ou Sequential qui en contient)"""
+        if isinstance(layer, tf.keras.Sequential):
+            return any(CatDogTrainer._is_augmentation_layer(l) for l in layer.layers)
+        return layer.__class__.__name__.startswith("Random")
+    
+    @staticmethod
+    def has_augmentation(model) -> bool:
+        return any(CatDogTrainer._is_augmentation_layer(layer) for layer in model.layers)
+    
+    def export_inference_model(self, model, path: Optional[Path] = None):
+        """
+        Modèle d'inférence sans couches d'augmentation
+        
+        Le graphe (linéaire) est reconstruit en réutilisant les couches
+        entraînées, sauf les couches d'augmentation, inactives à l'inférence.
+        Le modèle est compilé pour rester évaluable après rechargement.
+        """
+        if not self.has_augmentation(model):
+            inference_model = model
+        else:
+            inputs = tf.keras.Input(shape=model.input_shape[1:])
+            x = inputs
+            for layer in model.layers:
+                if isinstance(layer, tf.keras.layers.InputLayer) or self._is_augmentation_layer(layer):
+                    continue
+                x = layer(x)
+            inference_model = tf.keras.Model(inputs, x)
+            inference_model.compile(
+                optimizer=tf.keras.optimizers.Adam(learning_rate=self.config["learning_rate"]),
+                loss='binary_crossentropy',
+                metrics=['accuracy']
+            )
+            # Optimiseur construit: variables cohérentes au rechargement
+            inference_model.optimizer.build(inference_model.trainable_variables)
+        
+        if path is not None:
+            inference_model.save(path)
+        return inference_model
+    
+    def train(self, profile: bool = False, trace_steps: Optional[Tuple[int, int]] = None,
+              resume: bool = False):
+        """
+        Entraînement du modèle
+        
+        Args:
+            profile: Mesure débit, durée des steps, attente du pipeline et mémoire
+                par epoch (rapport training_profile_*.json dans models_dir)
+            trace_steps: Fenêtre (début, fin) de steps à tracer avec le profiler TensorFlow
+            resume: Reprendre depuis le dernier checkpoint complet (sinon il est effacé)
+        
+        En multi-worker, seul le chef écrit le modèle, les rapports et les
+        checkpoints partagés; les autres workers écrivent dans TEMP_DIR.
+        """
         train_ds, val_ds = self.prepare_data()
         model = self.create_model()
         
+        # Meilleur modèle écrit à part: le chemin servi n'est remplacé qu'à la fin
         model_path = self.models_dir / "cats_dogs_model.keras"
+        candidate_path = worker_dir(self.strategy, self.models_dir / "cats_dogs_model_candidate.keras")
+        candidate_path.parent.mkdir(parents=True, exist_ok=True)
         
         callbacks = [
             tf.keras.callbacks.ModelCheckpoint(
-                model_path,
+                candidate_path,
                 save_best_only=True,
                 monitor='val_accuracy',
                 verbose=1
@@ -91,14 +354,156 @@ class CatDogTrainer:
                 restore_best_weights=True
             ),
         ]
+        if profile or trace_steps:
+            callbacks.append(make_profiler(
+                train_ds, self.batch_size, trace_steps=trace_steps,
+                output_dir=candidate_path.parent, run_name="training",
+            ))
         
-        history = model.fit(
-            train_ds,
+        # Checkpoints de reprise périodiques (poids, optimiseur, epoch, step)
+        history = fit_resumable(
+            model, train_ds, val_ds,
             epochs=self.config["epochs"],
             callbacks=callbacks,
-            validation_data=val_ds,
-            verbose=1
+            run_name="train",
+            resume=resume,
+            save_steps=self.config["checkpoint_steps"],
+            checkpoint_dir=worker_dir(self.strategy, checkpoint_dir_for("train")),
         )
         
+        # Modèle servi: sans couches d'augmentation
+        if is_chief(self.strategy):
+            self.publish_model(model, candidate_path, kind="trained")
+            print(f"Modèle sauvegardé: {model_path}")
+        return model, history
+    
+    def publish_model(self, model, candidate_path: Path, kind: str) -> str:
+        """
+        Exporte le modèle, l'enregistre dans le registre et le met en production
+        
+        Le modèle est écrit dans `candidate_path`, jamais dans le chemin servi
+        (lien vers un fichier du registre, qui ne doit pas être réécrit); le
+        chemin servi est ensuite remplacé atomiquement.
+        
+        Returns:
+            Hash du modèle publié
+        """
+        self.export_inference_model(model, candidate_path)
+        registry = ModelRegistry()
+        sha256 = registry.register(candidate_path, kind=kind)
+        candidate_path.unlink(missing_ok=True)
+        registry.promote(sha256, self.models_dir / "cats_dogs_model.keras")
+        return sha256
+    
+    def train_head(self, model=None, epochs: Optional[int] = None, learning_rate: Optional[float] = None):
+        """
+        Ré-entraînement de la tête seule sur les embeddings en cache
+        
+        Le tronc convolutif du modèle (par défaut le modèle en production)
+        est gelé; ses embeddings sont calculés une seule fois par version
+        du tronc et du dataset (voir src/models/feature_cache.py), puis la
+        tête Dropout + Dense est entraînée sur ces vecteurs. Le modèle
+        complet, tête mise à jour, est exporté à la place du modèle servi.
+        """
+        model_path = self.models_dir / "cats_dogs_model.keras"
+        if model is None:
+            if not model_path.exists():
+                raise FileNotFoundError(f"Aucun modèle à affiner: {model_path} (entraîner d'abord le modèle complet)")
+            model = tf.keras.models.load_model(model_path)
+        epochs = epochs or self.config["head_epochs"]
+        learning_rate = learning_rate or self.config["learning_rate"]
+        
+        data_path = self.prepare_sources()
+        backbone, head = split_at_embedding(model)
+        backbone.trainable = False
+        
+        version = backbone_version(backbone)
+        features_dir = features_dir_for(version, data_path, self.config["image_size"])
+        if read_meta(features_dir) is None:
+            train_ds, val_ds = self._decode_datasets(data_path)
+            train_files, val_files = list_labeled_files(data_path, validation_split=0.2, seed=self.config["seed"])
+            build_features(backbone, {
+                "train": (train_ds.map(lambda image, label: image), [label for _, label in train_files]),
+                "val": (val_ds.map(lambda image, label: image), [label for _, label in val_files]),
+            }, features_dir, version)
+        else:
+            print(f"Embeddings réutilisés: {features_dir}")
+        prune_feature_caches(features_dir)
+        
+        train_x, train_y = load_features(features_dir, "train")
+        val_x, val_y = load_features(features_dir, "val")
+        
+        head.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+            loss='binary_crossentropy',
+            metrics=['accuracy']
+        )
+        print(f"Entraînement de la tête sur {len(train_y)} embeddings de dimension {train_x.shape[1]}...")
+        history = head.fit(
+            np.asarray(train_x), np.asarray(train_y),
+            validation_data=(np.asarray(val_x), np.asarray(val_y)),
+            epochs=epochs,
+            batch_size=self.config["head_batch_size"],
+            callbacks=[tf.keras.callbacks.EarlyStopping(
+                monitor='val_accuracy',
+                patience=3,
+                restore_best_weights=True
+            )],
+            verbose=2,
+        )
+        
+        # Couches de la tête partagées: les poids appris sont déjà dans `model`;
+        # tronc dégelé pour que le modèle exporté reste entièrement entraînable
+        backbone.trainable = True
+        self.publish_model(model, self.models_dir / "cats_dogs_model_candidate.keras", kind="head")
         print(f"Modèle sauvegardé: {model_path}")
-        return model, history
\ No newline at end of file
+        return model, history
+    
+    def train_pruned(self, target_sparsity: float, epochs: Optional[int] = None, base_model=None,
+                     datasets: Optional[Tuple] = None):
+        """
+        Affinage avec élagage progressif par magnitude (voir src/models/pruning.py)
+        
+        Le modèle de create_model reprend les poids du modèle en production
+        (ou de `base_model`), puis ses noyaux Conv2D / Dense sont élagués
+        jusqu'à `target_sparsity` pendant l'affinage. `datasets` (train, val)
+        évite de repréparer les données à chaque niveau de parcimonie.
+        
+        Returns:
+            (modèle d'inférence élagué, historique)
+        """
+        model_path = self.models_dir / "cats_dogs_model.keras"
+        if base_model is None and model_path.exists():
+            base_model = tf.keras.models.load_model(model_path)
+        epochs = epochs or PRUNING_CONFIG["epochs"]
+        
+        train_ds, val_ds = datasets or self.prepare_data()
+        model = self.create_model()
+        if base_model is not None:
+            # Mêmes couches à poids, dans le même ordre (l'augmentation n'en a pas)
+            weighted = [layer for layer in model.layers if layer.weights]
+            base_weighted = [layer for layer in base_model.layers if layer.weights]
+            for layer, base_layer in zip(weighted, base_weighted):
+                layer.set_weights(base_layer.get_weights())
+        model.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=PRUNING_CONFIG["learning_rate"]),
+            loss='binary_crossentropy',
+            metrics=['accuracy']
+        )
+        
+        cardinality = int(train_ds.cardinality())
+        steps_per_epoch = cardinality if cardinality >= 0 else sum(1 for _ in train_ds)
+        pruning = MagnitudePruning(
+            target_sparsity,
+            end_step=int(steps_per_epoch * epochs * PRUNING_CONFIG["end_fraction"]),
+            frequency=PRUNING_CONFIG["frequency"],
+        )
+        print(f"Élagage jusqu'à {target_sparsity:.0%} des poids sur {epochs} epochs...")
+        history = model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=epochs,
+            callbacks=[pruning],
+            verbose=2,
+        )
+        return self.export_inference_model(model), history
@@ -1,4 +1,5 @@
 import csv
+import os
 import time
 from datetime import datetime
 from pathlib import Path
@@ -14,18 +15,36 @@ from config.settings import ROOT_DIR, PROCESSED_DATA_DIR
 # Fichier CSV pour stocker les métriques
 MONITORING_FILE = PROCESSED_DATA_DIR / "monitoring_inference.csv"
 
+HEADERS = ['timestamp', 'inference_time_ms', 'success', 'model_version']
+
+# En-tête HTTP portant la version du modèle sur les réponses d'erreur:
+# l'échec est alors compté pour cette version (production ou canari)
+MODEL_VERSION_HEADER = "X-Model-Version"
+
 def ensure_monitoring_file():
     """Créer le fichier CSV avec les headers si nécessaire"""
     if not MONITORING_FILE.exists():
         with open(MONITORING_FILE, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                'timestamp',
-                'inference_time_ms',
-                'success'
-            ])
+            writer.writerow(HEADERS)
+        return
+    
+    # Fichier antérieur à la colonne model_version: ajoutée (vide) une seule fois
+    with open(MONITORING_FILE, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), None)
+    if header != HEADERS[:-1]:
+        return
+    with open(MONITORING_FILE, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    tmp_path = MONITORING_FILE.with_name(f"{MONITORING_FILE.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        for row in rows[1:]:
+            writer.writerow(row + [''] * (len(HEADERS) - len(row)))
+    os.replace(tmp_path, MONITORING_FILE)
 
-def log_inference_time(inference_time_ms: float, success: bool = True):
+def log_inference_time(inference_time_ms: float, success: bool = True, model_version: str = None):
     """Enregistrer une métrique d'inférence dans le CSV"""
     ensure_monitoring_file()
     
@@ -36,7 +55,8 @@ def log_inference_time(inference_time_ms: float, success: bool = True):
         writer.writerow([
             timestamp,
             round(inference_time_ms, 2),
-            success
+            success,
+            model_version or ''
         ])
 
 
@@ -65,6 +85,38 @@ def read_last_inference_metrics():
     except Exception:
         return None
 
+def summarize_by_version():
+    """Agrégats des inférences par version de modèle: volume, latences, erreurs."""
+    ensure_monitoring_file()
+    by_version = {}
+    with open(MONITORING_FILE, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            version = row.get('model_version') or 'unknown'
+            stats = by_version.setdefault(version, {"latencies": [], "errors": 0})
+            try:
+                stats["latencies"].append(float(row['inference_time_ms']))
+            except (TypeError, ValueError):
+                continue
+            if row.get('success') not in ("True", "true", "1"):
+                stats["errors"] += 1
+
+    summary = {}
+    for version, stats in by_version.items():
+        latencies = sorted(stats["latencies"])
+        count = len(latencies)
+        if count == 0:
+            continue
+        summary[version] = {
+            "inf_count": count,
+            "inf_errors": stats["errors"],
+            "error_rate": round(stats["errors"] / count, 4),
+            "latency_avg_ms": round(sum(latencies) / count, 2),
+            "latency_p50_ms": latencies[int(0.5 * (count - 1))],
+            "latency_p99_ms": latencies[int(0.99 * (count - 1))],
+        }
+    return summary
+
+
 def time_inference(func):
     """Décorateur pour mesurer le temps d'inférence"""
     @wraps(func)
@@ -86,7 +138,8 @@ def time_inference(func):
                     response_data = json.loads(result.body)
                     log_inference_time(
                         inference_time_ms=inference_time_ms,
-                        success=True
+                        success=True,
+                        model_version=response_data.get("model_version")
                     )
                 except:
                     log_inference_time(inference_time_ms, success=True)
@@ -94,7 +147,8 @@ def time_inference(func):
                 # Dict response
                 log_inference_time(
                     inference_time_ms=inference_time_ms,
-                    success=True
+                    success=True,
+                    model_version=result.get("model_version") if isinstance(result, dict) else None
                 )
             
             return result
@@ -103,10 +157,12 @@ def time_inference(func):
             end_time = time.perf_counter()
             inference_time_ms = (end_time - start_time) * 1000
             
-            # Logger l'erreur
+            # Logger l'erreur (avec la version qui servait la requête, si connue)
+            headers = getattr(e, 'headers', None) or {}
             log_inference_time(
                 inference_time_ms=inference_time_ms,
-                success=False
+                success=False,
+                model_version=headers.get(MODEL_VERSION_HEADER)
             )
             
             raise e
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Évaluation en ombre d'un modèle candidat sur le trafic réel.
+
+Pour une fraction des requêtes /api/predict servies par le modèle en
+production (jamais celles servies par un canari), l'image est aussi
+soumise au modèle candidat, dans un pool de threads en arrière-plan: la réponse au
+client ne dépend jamais du candidat et n'attend pas sa prédiction. Pour
+chaque échantillon sont enregistrés les scores des deux modèles, leur
+accord (même classe) et leurs latences, dans monitoring_shadow.csv.
+
+Le résumé (/api/shadow/summary) permet de juger la vitesse et le
+comportement réels d'un modèle ré-entraîné avant sa mise en production.
+"""
+
+import csv
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import SHADOW_CONFIG
+
+FIELDS = [
+    'timestamp',
+    'candidate',
+    'production_score',
+    'candidate_score',
+    'agreement',
+    'production_ms',
+    'candidate_ms',
+]
+
+
+def resolve_candidate_path(model_path: str = "") -> Optional[Path]:
+    """
+    Modèle candidat: chemin explicite, ou à défaut le dernier modèle
+    ré-entraîné du registre qui n'est pas en production.
+    """
+    if model_path:
+        return Path(model_path)
+
+    from src.models.registry import ModelRegistry
+    registry = ModelRegistry()
+    candidate = registry.latest(kind="retrained")
+    if candidate is None or candidate["sha256"] == registry.current():
+        return None
+    return registry.blob_path(candidate["sha256"])
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+
+class ShadowEvaluator:
+    """
+    Prédictions du candidat en arrière-plan sur un échantillon des requêtes.
+
+    Args:
+        candidate: Prédicteur du modèle candidat (CatDogPredictor)
+        sample_rate: Fraction des requêtes évaluées en ombre
+        max_workers: Threads du pool d'arrière-plan
+        max_pending: Évaluations en attente au-delà desquelles un
+            échantillon est abandonné (le candidat ne doit pas accumuler de retard)
+        log_path: Fichier CSV des résultats
+    """
+
+    def __init__(self, candidate, sample_rate: float = 0.1, max_workers: int = 1,
+                 max_pending: int = 32, log_path: Optional[Path] = None):
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.log_path = Path(log_path or SHADOW_CONFIG["log_path"])
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.dropped = 0
+
+    @property
+    def candidate_name(self) -> str:
+        return Path(self.candidate.model_path).stem
+
+    def submit(self, image_data: bytes, production_score: float, production_ms: float,
+               served_version: Optional[str] = None, production_version: Optional[str] = None) -> bool:
+        """
+        Soumet une requête déjà servie.
+
+        Seules les requêtes servies par le modèle en production sont
+        comparées: un score du canari fausserait l'accord et les latences.
+
+        Args:
+            served_version: Version qui a servi la requête
+            production_version: Version du modèle en production
+
+        Returns:
+            True si la requête est évaluée en ombre
+        """
+        if served_version != production_version:
+            return False
+        if random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        self.executor.submit(self._evaluate, image_data, production_score, production_ms)
+        return True
+
+    def _evaluate(self, image_data: bytes, production_score: float, production_ms: float):
+        try:
+            start = time.perf_counter()
+            candidate_score = self.candidate.predict(image_data)["raw_score"]
+            candidate_ms = (time.perf_counter() - start) * 1000
+            self._log({
+                'timestamp': datetime.now().isoformat(),
+                'candidate': self.candidate_name,
+                'production_score': round(production_score, 6),
+                'candidate_score': round(candidate_score, 6),
+                'agreement': (production_score > 0.5) == (candidate_score > 0.5),
+                'production_ms': round(production_ms, 2),
+                'candidate_ms': round(candidate_ms, 2),
+            })
+        except Exception as e:
+            # Une erreur du candidat ne concerne jamais la requête servie
+            print(f"Erreur d'évaluation en ombre: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _log(self, row: Dict[str, Any]):
+        with self._lock:
+            new_file = not self.log_path.exists()
+            with open(self.log_path, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+
+    def summary(self) -> Dict[str, Any]:
+        """Accord et latences du candidat courant, comparés à la production."""
+        rows = []
+        if self.log_path.exists():
+            with open(self.log_path, 'r', newline='', encoding='utf-8') as f:
+                rows = [row for row in csv.DictReader(f) if row['candidate'] == self.candidate_name]
+
+        production_ms = [float(row['production_ms']) for row in rows]
+        candidate_ms = [float(row['candidate_ms']) for row in rows]
+        score_diff = [abs(float(row['candidate_score']) - float(row['production_score'])) for row in rows]
+        agreements = sum(1 for row in rows if row['agreement'] == 'True')
+
+        return {
+            "enabled": True,
+            "candidate": self.candidate_name,
+            "sample_rate": self.sample_rate,
+            "samples": len(rows),
+            "pending": self._pending,
+            "dropped": self.dropped,
+            "agreement_rate": round(agreements / len(rows), 4) if rows else None,
+            "mean_abs_score_diff": round(float(np.mean(score_diff)), 4) if rows else None,
+            "latency_ms": {
+                "production": {"p50": _percentile(production_ms, 50), "p99": _percentile(production_ms, 99)},
+                "candidate": {"p50": _percentile(candidate_ms, 50), "p99": _percentile(candidate_ms, 99)},
+            },
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def create_shadow_evaluator() -> Optional[ShadowEvaluator]:
+    """Évaluateur configuré par SHADOW_CONFIG, ou None (désactivé ou sans candidat)."""
+    if not SHADOW_CONFIG["enabled"]:
+        return None
+
+    candidate_path = resolve_candidate_path(SHADOW_CONFIG["model_path"])
+    if candidate_path is None or not candidate_path.exists():
+        print("Évaluation en ombre: aucun modèle candidat disponible")
+        return None
+
+    from src.models.predictor import CatDogPredictor
+    candidate = CatDogPredictor(model_path=candidate_path, canary_percent=0)
+    if not candidate.is_loaded():
+        return None
+
+    print(f"Évaluation en ombre de {candidate_path.name} sur {SHADOW_CONFIG['sample_rate']:.0%} des requêtes")
+    return ShadowEvaluator(
+        candidate,
+        sample_rate=SHADOW_CONFIG["sample_rate"],
+        max_workers=SHADOW_CONFIG["max_workers"],
+        max_pending=SHADOW_CONFIG["max_pending"],
+    )
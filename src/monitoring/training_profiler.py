@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Profilage des entraînements (callback Keras).
+
+Mesure par epoch le débit (images/s), la durée des steps, une estimation
+de la part d'attente du pipeline d'entrée et le pic mémoire du processus,
+puis écrit le tout dans `training_profile_<horodatage>.json`, dans le
+répertoire des modèles. Une trace du profiler TensorFlow peut
+être capturée sur une fenêtre de steps.
+
+Avec Keras 3, la lecture du lot suivant a lieu dans la fonction de step:
+la durée d'un step inclut donc l'attente des données. La part d'attente
+est estimée en comparant cette durée au temps de production d'un lot par
+le pipeline seul (mesuré avant l'entraînement): proche de 1, le pipeline
+d'entrée est le facteur limitant; proche de 0, c'est le calcul.
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import tensorflow as tf
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODELS_DIR, TEMP_DIR
+
+
+def current_rss_mb() -> Optional[float]:
+    """Mémoire résidente actuelle du processus (Mo)."""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pic de mémoire résidente depuis le démarrage du processus (Mo)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en Ko sous Linux, en octets sous macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return current_rss_mb()
+
+
+def probe_input_pipeline(dataset, num_batches: int = 20) -> Optional[float]:
+    """
+    Temps moyen (s) de production d'un lot par le pipeline seul.
+
+    Le premier lot (remplissage des buffers, ouverture des fichiers) est
+    exclu de la mesure.
+    """
+    iterator = iter(dataset)
+    try:
+        next(iterator)
+    except StopIteration:
+        return None
+
+    count = 0
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        try:
+            next(iterator)
+        except StopIteration:
+            break
+        count += 1
+    elapsed = time.perf_counter() - start
+    del iterator
+    return elapsed / count if count else None
+
+
+class TrainingProfiler(tf.keras.callbacks.Callback):
+    """
+    Callback de profilage de l'entraînement.
+
+    Args:
+        batch_size: Taille des lots (pour le débit en images/s)
+        input_batch_time: Temps de production d'un lot par le pipeline seul
+            (voir probe_input_pipeline), pour estimer la part d'attente
+        trace_steps: Fenêtre (début, fin) de steps globaux à tracer avec
+            le profiler TensorFlow, ou None
+        trace_dir: Répertoire de la trace
+        output_dir: Répertoire du rapport JSON
+        run_name: Préfixe du rapport ("training" ou "retrain")
+    """
+
+    def __init__(self,
+                 batch_size: int,
+                 input_batch_time: Optional[float] = None,
+                 trace_steps: Optional[Tuple[int, int]] = None,
+                 trace_dir: Optional[Path] = None,
+                 output_dir: Optional[Path] = None,
+                 run_name: str = "training"):
+        super().__init__()
+        self.batch_size = batch_size
+        self.input_batch_time = input_batch_time
+        self.trace_steps = trace_steps
+        self.trace_dir = Path(trace_dir or TEMP_DIR / "profiler")
+        self.output_dir = Path(output_dir or MODELS_DIR)
+        self.run_name = run_name
+        self.epochs = []
+        self.report_path = None
+        self._global_step = 0
+        self._tracing = False
+
+    def on_train_begin(self, logs=None):
+        self._train_start = time.perf_counter()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._step_times = []
+        self._first_step_time = None
+        self._first_step_start = None
+        self._epoch_start = time.perf_counter()
+        self._epoch_peak_rss = current_rss_mb()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_steps and self._global_step == self.trace_steps[0] and not self._tracing:
+            self.trace_dir.mkdir(parents=True, exist_ok=True)
+            tf.profiler.experimental.start(str(self.trace_dir))
+            self._tracing = True
+        self._step_start = time.perf_counter()
+        if self._first_step_start is None:
+            self._first_step_start = self._step_start
+
+    def on_train_batch_end(self, batch, logs=None):
+        elapsed = time.perf_counter() - self._step_start
+        # Le premier step de chaque epoch inclut le traçage/la compilation
+        if self._first_step_time is None:
+            self._first_step_time = elapsed
+        else:
+            self._step_times.append(elapsed)
+        self._epoch_train_end = time.perf_counter()
+
+        rss = current_rss_mb()
+        if rss is not None:
+            self._epoch_peak_rss = max(self._epoch_peak_rss or 0.0, rss)
+
+        self._global_step += 1
+        if self._tracing and self._global_step >= self.trace_steps[1]:
+            self._stop_trace()
+
+    def on_epoch_end(self, epoch, logs=None):
+        steps = len(self._step_times) + (1 if self._first_step_time is not None else 0)
+        train_time = self._epoch_train_end - self._epoch_start if steps else 0.0
+        mean_step = (sum(self._step_times) / len(self._step_times)) if self._step_times else self._first_step_time
+
+        input_wait = None
+        if self.input_batch_time is not None and mean_step:
+            input_wait = min(1.0, self.input_batch_time / mean_step)
+
+        self.epochs.append({
+            "epoch": epoch + 1,
+            "steps": steps,
+            "train_seconds": round(train_time, 3),
+            "epoch_seconds": round(time.perf_counter() - self._epoch_start, 3),
+            "images_per_sec": round(steps * self.batch_size / train_time, 2) if train_time else None,
+            "step_time_ms": round(mean_step * 1000, 2) if mean_step else None,
+            "first_step_time_ms": round(self._first_step_time * 1000, 2) if self._first_step_time else None,
+            # Création de l'itérateur et remplissage des buffers (shuffle, prefetch)
+            "startup_ms": round((self._first_step_start - self._epoch_start) * 1000, 2) if self._first_step_start else None,
+            "input_wait_fraction": round(input_wait, 3) if input_wait is not None else None,
+            "peak_rss_mb": round(self._epoch_peak_rss, 1) if self._epoch_peak_rss else None,
+        })
+
+        last = self.epochs[-1]
+        print(f"[profil] epoch {last['epoch']}: {last['images_per_sec']} images/s, "
+              f"step {last['step_time_ms']} ms, attente entrée {last['input_wait_fraction']}, "
+              f"RSS max {last['peak_rss_mb']} Mo")
+
+    def on_train_end(self, logs=None):
+        if self._tracing:
+            self._stop_trace()
+        self.save()
+
+    def _stop_trace(self):
+        tf.profiler.experimental.stop()
+        self._tracing = False
+        print(f"Trace du profiler écrite dans {self.trace_dir}")
+
+    def summary(self) -> dict:
+        """Résumé du profil (sérialisable en JSON)."""
+        wait = [e["input_wait_fraction"] for e in self.epochs if e["input_wait_fraction"] is not None]
+        mean_wait = sum(wait) / len(wait) if wait else None
+        if mean_wait is None:
+            bound = "unknown"
+        else:
+            bound = "input" if mean_wait >= 0.5 else "compute"
+
+        return {
+            "run": self.run_name,
+            "timestamp": datetime.now().isoformat(),
+            "batch_size": self.batch_size,
+            "cpu_count": os.cpu_count(),
+            "input_batch_time_ms": round(self.input_batch_time * 1000, 2) if self.input_batch_time else None,
+            "input_wait_fraction": round(mean_wait, 3) if mean_wait is not None else None,
+            "bound": bound,
+            "peak_rss_mb": round(peak_rss_mb() or 0.0, 1),
+            "total_seconds": round(time.perf_counter() - self._train_start, 3),
+            "trace_dir": str(self.trace_dir) if self.trace_steps else None,
+            "epochs": self.epochs,
+        }
+
+    def save(self) -> Path:
+        """Écrit le rapport `<run>_profile_<horodatage>.json`."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.report_path = self.output_dir / f"{self.run_name}_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(self.report_path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        print(f"Profil d'entraînement sauvegardé: {self.report_path}")
+        return self.report_path
+
+
+def make_profiler(train_ds, batch_size: int,
+                  trace_steps: Optional[Tuple[int, int]] = None,
+                  output_dir: Optional[Path] = None,
+                  run_name: str = "training",
+                  probe_batches: int = 20) -> TrainingProfiler:
+    """Mesure le pipeline d'entrée seul puis crée le callback de profilage."""
+    print(f"Mesure du pipeline d'entrée ({probe_batches} lots)...")
+    input_batch_time = probe_input_pipeline(train_ds, probe_batches)
+    if input_batch_time is not None:
+        print(f"Pipeline seul: {input_batch_time * 1000:.1f} ms/lot")
+    return TrainingProfiler(
+        batch_size=batch_size,
+        input_batch_time=input_batch_time,
+        trace_steps=trace_steps,
+        output_dir=output_dir,
+        run_name=run_name,
+    )
@@ -317,6 +317,32 @@ class TestAPIResponseFormat:
         assert probs["cat"].endswith("%")
         assert probs["dog"].endswith("%")
 
+    def test_prediction_image_hash_dedup(self, test_image):
+        """Test du stockage des images: même image => même hash"""
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+
+        hashes = []
+        for _ in range(2):
+            with open(test_image, "rb") as f:
+                files = {"file": (test_image.name, f, "image/jpeg")}
+                response = requests.post(
+                    f"{BASE_URL}/api/predict",
+                    files=files,
+                    headers=headers
+                )
+
+            if response.status_code == 503:
+                pytest.skip("Modèle non disponible")
+
+            assert response.status_code == 200
+            data = response.json()
+            if "image_hash" not in data:
+                pytest.skip("Stockage des images désactivé (STORE_UPLOADS=false)")
+            hashes.append(data["image_hash"])
+
+        assert len(hashes[0]) == 64
+        assert hashes[0] == hashes[1]
+
 # Tests paramétrés pour plusieurs endpoints
 @pytest.mark.parametrize("endpoint,expected_status", [
     ("/", 200),
@@ -324,6 +350,8 @@ class TestAPIResponseFormat:
     ("/info", 200),
     ("/inference", 200),
     ("/api/info", 200),
+    ("/api/shadow/summary", 200),
+    ("/api/metrics/versions", 200),
     ("/docs", 200),
 ])
 def test_endpoints_status(endpoint, expected_status):
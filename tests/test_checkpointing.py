@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Tests des checkpoints de reprise de l'entraînement (hors ligne)"""
+
+import json
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.checkpointing import ResumableCheckpoint, fit_resumable
+
+NUM_BATCHES = 8
+
+
+class Interrupt(Exception):
+    pass
+
+
+class InterruptAt(tf.keras.callbacks.Callback):
+    """Simule une interruption (crash, timeout) à un lot donné"""
+
+    def __init__(self, epoch: int, batch: int):
+        super().__init__()
+        self.stop_at = (epoch, batch)
+        self.epoch = 0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+
+    def on_train_batch_end(self, batch, logs=None):
+        if (self.epoch, batch) == self.stop_at:
+            raise Interrupt()
+
+
+def make_model(units: int = 1):
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(4,)),
+        tf.keras.layers.Dense(units, activation="sigmoid"),
+    ])
+    model.compile(optimizer="adam", loss="binary_crossentropy")
+    return model
+
+
+def make_datasets():
+    rng = np.random.default_rng(0)
+    features = rng.random((NUM_BATCHES * 2, 4)).astype(np.float32)
+    labels = rng.integers(0, 2, (NUM_BATCHES * 2, 1)).astype(np.float32)
+    dataset = tf.data.Dataset.from_tensor_slices((features, labels)).batch(2)
+    return dataset, dataset.take(2)
+
+
+def read_state(checkpoint_dir: Path) -> dict:
+    with open(checkpoint_dir / "state.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_restore_without_checkpoint(tmp_path):
+    assert ResumableCheckpoint(tmp_path / "ckpt").restore(make_model()) == 0
+
+
+def test_restore_weights_and_epoch(tmp_path):
+    """Poids et epoch sauvegardés en fin d'epoch sont restaurés dans un nouveau modèle"""
+    train_ds, val_ds = make_datasets()
+    model = make_model()
+    model.fit(train_ds, epochs=2, callbacks=[ResumableCheckpoint(tmp_path / "ckpt")], verbose=0)
+
+    restored = make_model()
+    assert ResumableCheckpoint(tmp_path / "ckpt").restore(restored) == 2
+    for expected, actual in zip(model.get_weights(), restored.get_weights()):
+        np.testing.assert_allclose(actual, expected)
+
+
+def test_restore_ignores_other_architecture(tmp_path):
+    """Un checkpoint d'une autre architecture est ignoré"""
+    train_ds, _ = make_datasets()
+    make_model().fit(train_ds, epochs=1, callbacks=[ResumableCheckpoint(tmp_path / "ckpt")], verbose=0)
+
+    assert ResumableCheckpoint(tmp_path / "ckpt").restore(make_model(units=2)) == 0
+
+
+def test_fit_without_resume_clears_checkpoint(tmp_path):
+    """Sans reprise, un checkpoint existant est effacé et l'entraînement part de zéro"""
+    train_ds, val_ds = make_datasets()
+    checkpoint_dir = tmp_path / "ckpt"
+    with pytest.raises(Interrupt):
+        fit_resumable(make_model(), train_ds, val_ds, epochs=3, callbacks=[InterruptAt(1, 0)],
+                      run_name="test", checkpoint_dir=checkpoint_dir, verbose=0)
+    assert read_state(checkpoint_dir)["epoch"] == 1
+
+    history = fit_resumable(make_model(), train_ds, val_ds, epochs=3, callbacks=[],
+                            run_name="test", checkpoint_dir=checkpoint_dir, verbose=0)
+
+    assert history.epoch == [0, 1, 2]
+    assert not checkpoint_dir.exists()
+
+
+def test_fit_resumes_interrupted_epoch(tmp_path):
+    """La reprise saute les lots déjà faits de l'epoch interrompue, puis continue"""
+    train_ds, val_ds = make_datasets()
+    checkpoint_dir = tmp_path / "ckpt"
+    with pytest.raises(Interrupt):
+        fit_resumable(make_model(), train_ds, val_ds, epochs=3, callbacks=[InterruptAt(1, 3)],
+                      run_name="test", resume=True, save_steps=1,
+                      checkpoint_dir=checkpoint_dir, verbose=0)
+    state = read_state(checkpoint_dir)
+    assert (state["epoch"], state["step"]) == (1, 3)
+
+    batches = []
+    counter = tf.keras.callbacks.LambdaCallback(on_train_batch_end=lambda batch, logs: batches.append(batch))
+    history = fit_resumable(make_model(), train_ds, val_ds, epochs=3, callbacks=[counter],
+                            run_name="test", resume=True, checkpoint_dir=checkpoint_dir, verbose=0)
+
+    assert history.epoch == [1, 2]
+    assert len(history.history["loss"]) == 2
+    # L'epoch interrompue est terminée sans les callbacks sans état, puis une epoch complète
+    assert len(batches) == NUM_BATCHES
+    assert not checkpoint_dir.exists()
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Tests des contournements Keras pour l'entraînement multi-worker (hors ligne)"""
+
+import inspect
+import os
+import pytest
+import subprocess
+import sys
+from pathlib import Path
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+from train_distributed import free_ports
+
+# Worker minimal: modèle adapté à la stratégie, dataset réparti, une epoch
+WORKER_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import numpy as np
+import tensorflow as tf
+from src.models.distributed import adapt_model_to_strategy, distribute_dataset, get_strategy, global_batch_size
+
+strategy = get_strategy("multi_worker")
+batch_size = global_batch_size(4, strategy)
+with strategy.scope():
+    inputs = tf.keras.Input(shape=(8,))
+    outputs = tf.keras.layers.Dense(1, activation="sigmoid")(inputs)
+    model = tf.keras.Model(inputs, outputs)
+    model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
+model = adapt_model_to_strategy(model, strategy)
+
+rng = np.random.default_rng(0)
+features = rng.random((64, 8)).astype(np.float32)
+labels = rng.integers(0, 2, (64, 1)).astype(np.float32)
+dataset = tf.data.Dataset.from_tensor_slices((features, labels)).batch(batch_size)
+history = model.fit(distribute_dataset(strategy, dataset, batch_size), epochs=1, verbose=0)
+assert "accuracy" in history.history
+"""
+
+
+PREPARE_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from src.models.trainer import CatDogTrainer
+print(CatDogTrainer().prepare_sources())
+"""
+
+
+def prepare_sources(temp_dir: Path, **env) -> Path:
+    """prepare_sources() dans un processus séparé, avec TEMP_DIR isolé"""
+    env = dict(os.environ, TEMP_DIR=str(temp_dir), MODELS_DIR=str(temp_dir / "models"), **env)
+    output = subprocess.run(
+        [sys.executable, "-c", PREPARE_SCRIPT.format(root=str(ROOT_DIR))],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return Path(output.strip().splitlines()[-1])
+
+
+def test_workers_do_not_prepare_data_again(tmp_path):
+    """Avec DATA_PREPARED=true (posé par le lanceur), un worker ne réécrit rien dans TEMP_DIR"""
+    prepared = prepare_sources(tmp_path, DATA_PREPARED="false")
+    assert prepared == tmp_path / "PetImages"
+    manifest = tmp_path / "PetImages.manifest.json"
+    before = sorted(p.relative_to(tmp_path) for p in prepared.rglob("*"))
+    manifest_mtime = manifest.stat().st_mtime_ns
+
+    assert prepare_sources(tmp_path, DATA_PREPARED="true") == prepared
+    assert sorted(p.relative_to(tmp_path) for p in prepared.rglob("*")) == before
+    assert manifest.stat().st_mtime_ns == manifest_mtime
+
+
+def test_symbolic_build_hook_exists():
+    """Le point d'entrée interne surchargé existe, avec la signature attendue"""
+    import tensorflow as tf
+    from src.models.distributed import SYMBOLIC_BUILD_HOOK
+
+    inputs = tf.keras.Input(shape=(2,))
+    model = tf.keras.Model(inputs, tf.keras.layers.Dense(1)(inputs))
+    hook = getattr(model, SYMBOLIC_BUILD_HOOK, None)
+    assert hook is not None, f"Keras {tf.keras.__version__}: {SYMBOLIC_BUILD_HOOK} a disparu"
+    assert {"iterator", "data_batch"} <= set(inspect.signature(hook).parameters)
+
+
+def test_multi_worker_fit_with_two_local_workers():
+    """fit() aboutit sur deux workers locaux avec les contournements"""
+    from src.models.distributed import make_tf_config
+
+    ports = free_ports(2)
+    processes = []
+    for index in range(2):
+        env = dict(os.environ, TF_CONFIG=make_tf_config(2, index, ports),
+                   TF_NUM_INTRAOP_THREADS="1", TF_NUM_INTEROP_THREADS="1")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-c", WORKER_SCRIPT.format(root=str(ROOT_DIR))],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        ))
+    outputs = []
+    try:
+        for process in processes:
+            outputs.append(process.communicate(timeout=300)[0])
+    finally:
+        for process in processes:
+            process.kill()
+
+    for process, output in zip(processes, outputs):
+        assert process.returncode == 0, output[-2000:]
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
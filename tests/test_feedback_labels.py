@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests des labels de ré-entraînement déduits des feedbacks (sans base de données)"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.data.feedback_handler import FeedbackDataHandler
+
+
+def make_feedback(feedback_id, positive, predicted_class, confidence=0.9, image_hash=None):
+    return {
+        "id_feedback_user": feedback_id,
+        "feedback": positive,
+        "resultat_prediction": confidence,
+        "predicted_class": predicted_class,
+        "image_hash": image_hash,
+    }
+
+
+@pytest.fixture
+def handler():
+    return FeedbackDataHandler()
+
+
+def test_positive_cat_feedback_is_labeled_cat(handler):
+    """Un "Cat" confirmé reste un chat, même avec une confiance > 0.5"""
+    samples = handler._feedback_samples([make_feedback(1, True, "cat", confidence=0.95)], include_positive=True)
+    assert samples == [(1, 0, None)]
+
+
+def test_positive_dog_feedback_is_labeled_dog(handler):
+    samples = handler._feedback_samples([make_feedback(2, True, "dog")], include_positive=True)
+    assert samples == [(2, 1, None)]
+
+
+def test_negative_feedback_inverts_predicted_class(handler):
+    """Un "Cat" infirmé devient un chien, un "Dog" infirmé un chat"""
+    samples = handler._feedback_samples([
+        make_feedback(3, False, "cat", image_hash="a" * 64),
+        make_feedback(4, False, "dog"),
+    ])
+    assert samples == [(3, 1, "a" * 64), (4, 0, None)]
+
+
+def test_positive_feedback_excluded_by_default(handler):
+    assert handler._feedback_samples([make_feedback(5, True, "cat")]) == []
+
+
+def test_feedback_without_predicted_class_is_skipped(handler):
+    """Sans classe enregistrée, la confiance seule ne donne pas le label"""
+    assert handler._feedback_samples([make_feedback(6, False, None)], include_positive=True) == []
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
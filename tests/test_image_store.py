@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tests du magasin d'images adressé par contenu (hors ligne)"""
+
+import io
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.data.image_store import ImageBlobStore
+
+
+def png_bytes(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((32, 32, 3), color, dtype=np.uint8)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageBlobStore(root=tmp_path, downscale=False, image_size=(16, 16))
+
+
+def test_identical_uploads_are_stored_once(store):
+    """Deux envois identiques: même hash, un seul fichier"""
+    image = png_bytes(120)
+    first = store.put(image)
+    second = store.put(image)
+
+    assert first == second == ImageBlobStore.hash_bytes(image)
+    assert len([p for p in store.objects_dir.rglob("*") if p.is_file()]) == 1
+    assert store.get_bytes(first) == image
+
+
+def test_different_uploads_get_different_hashes(store):
+    assert store.put(png_bytes(0)) != store.put(png_bytes(255))
+    assert len([p for p in store.objects_dir.rglob("*") if p.is_file()]) == 2
+
+
+def test_load_array_resizes_to_model_size(store):
+    image_hash = store.put(png_bytes(200))
+    array = store.load_array(image_hash)
+    assert array.shape == (16, 16, 3)
+    assert array.dtype == np.uint8
+
+
+@pytest.mark.parametrize("image_hash", ["../..", "../" + "a" * 61, "A" * 64, "a" * 63, ""])
+def test_invalid_hash_is_rejected(store, image_hash):
+    """Seuls les hash SHA-256 hexadécimaux désignent un objet (pas de traversée de chemin)"""
+    assert not store.exists(image_hash)
+    with pytest.raises(ValueError):
+        store.path_for(image_hash)
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
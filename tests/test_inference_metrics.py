@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Tests des métriques d'inférence par version de modèle (hors ligne)"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+from fastapi import HTTPException
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.monitoring import metrics
+from src.monitoring.metrics import MODEL_VERSION_HEADER, summarize_by_version, time_inference
+
+
+@pytest.fixture(autouse=True)
+def monitoring_file(tmp_path, monkeypatch):
+    """Métriques écrites dans un fichier temporaire, pas dans data/processed"""
+    path = tmp_path / "monitoring_inference.csv"
+    monkeypatch.setattr(metrics, "MONITORING_FILE", path)
+    return path
+
+
+@time_inference
+async def predict(version: str, fail: bool = False):
+    if fail:
+        raise HTTPException(status_code=500, detail="Erreur de prédiction",
+                            headers={MODEL_VERSION_HEADER: version})
+    return {"model_version": version}
+
+
+def call(version: str, fail: bool = False):
+    try:
+        asyncio.run(predict(version, fail))
+    except HTTPException:
+        pass
+
+
+def test_errors_are_counted_per_version():
+    """Les échecs sont attribués à la version qui servait la requête"""
+    for _ in range(3):
+        call("prod")
+    call("prod", fail=True)
+    call("canari")
+    call("canari", fail=True)
+
+    summary = summarize_by_version()
+
+    assert set(summary) == {"prod", "canari"}
+    assert (summary["prod"]["inf_count"], summary["prod"]["inf_errors"]) == (4, 1)
+    assert summary["prod"]["error_rate"] == 0.25
+    assert summary["canari"]["error_rate"] == 0.5
+
+
+def test_errors_without_version_are_unknown():
+    """Un échec sans version (ex. requête invalide) reste sous "unknown" """
+    @time_inference
+    async def invalid():
+        raise HTTPException(status_code=400, detail="Format d'image invalide")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(invalid())
+
+    assert summarize_by_version()["unknown"]["inf_errors"] == 1
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Tests du manifeste de validation du dataset (hors ligne)"""
+
+import json
+import os
+import pytest
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.data.manifest import ValidationManifest, manifest_path_for
+from src.data.preprocessing import clean_corrupted_images
+
+
+def make_dataset(root: Path) -> Path:
+    """Deux images valides par classe et une image corrompue"""
+    data_path = root / "PetImages"
+    for folder_name in ("Cat", "Dog"):
+        (data_path / folder_name).mkdir(parents=True)
+        for index in range(2):
+            Image.new("RGB", (8, 8), (index * 100, 0, 0)).save(data_path / folder_name / f"{index}.jpg")
+    (data_path / "Dog" / "corrompue.jpg").write_bytes(b"pas une image")
+    return data_path
+
+
+def valid_result(sha256: str = "a" * 64):
+    return {"valid": True, "sha256": sha256, "width": 8, "height": 8}
+
+
+def test_lookup_uses_size_and_mtime(tmp_path):
+    """Une entrée n'est réutilisée que si la taille et la date de modification sont inchangées"""
+    data_path = make_dataset(tmp_path)
+    fpath = data_path / "Cat" / "0.jpg"
+    manifest = ValidationManifest(data_path)
+    manifest.update(fpath, fpath.stat(), valid_result())
+
+    assert manifest.lookup(fpath, fpath.stat())["valid"]
+
+    stat = fpath.stat()
+    os.utime(fpath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert manifest.lookup(fpath, fpath.stat()) is None
+
+    manifest.update(fpath, fpath.stat(), valid_result())
+    with open(fpath, 'ab') as f:
+        f.write(b"\0")
+    os.utime(fpath, ns=(stat.st_atime_ns, manifest.entries["Cat/0.jpg"]["mtime_ns"]))
+    assert manifest.lookup(fpath, fpath.stat()) is None
+
+
+def test_save_and_reload(tmp_path):
+    data_path = make_dataset(tmp_path)
+    fpath = data_path / "Cat" / "0.jpg"
+    manifest = ValidationManifest(data_path)
+    manifest.update(fpath, fpath.stat(), valid_result())
+    manifest.save()
+
+    assert manifest.path == manifest_path_for(data_path) == tmp_path / "PetImages.manifest.json"
+    assert ValidationManifest(data_path).entries == manifest.entries
+
+
+def test_other_version_is_ignored(tmp_path):
+    """Un manifeste d'un autre format est ignoré: toutes les images sont revérifiées"""
+    data_path = make_dataset(tmp_path)
+    manifest_path_for(data_path).write_text(
+        json.dumps({"version": 0, "entries": {"Cat/0.jpg": {}}}), encoding='utf-8'
+    )
+
+    assert ValidationManifest(data_path).entries == {}
+
+
+def test_prune_keeps_invalid_entries(tmp_path):
+    """Les fichiers disparus sont retirés, sauf les images invalides"""
+    data_path = make_dataset(tmp_path)
+    manifest = ValidationManifest(data_path)
+    for name in ("0.jpg", "1.jpg"):
+        fpath = data_path / "Cat" / name
+        manifest.update(fpath, fpath.stat(), valid_result())
+    corrupted = data_path / "Dog" / "corrompue.jpg"
+    manifest.update(corrupted, corrupted.stat(), {"valid": False, "sha256": "b" * 64})
+
+    manifest.prune({"Cat/0.jpg"})
+
+    assert set(manifest.entries) == {"Cat/0.jpg", "Dog/corrompue.jpg"}
+
+
+def test_digest_depends_on_valid_content_only(tmp_path):
+    data_path = make_dataset(tmp_path)
+    fpath = data_path / "Cat" / "0.jpg"
+    corrupted = data_path / "Dog" / "corrompue.jpg"
+    manifest = ValidationManifest(data_path)
+    manifest.update(fpath, fpath.stat(), valid_result("a" * 64))
+    digest = manifest.digest()
+
+    manifest.update(corrupted, corrupted.stat(), {"valid": False, "sha256": "b" * 64})
+    assert manifest.digest() == digest
+
+    manifest.update(fpath, fpath.stat(), valid_result("c" * 64))
+    assert manifest.digest() != digest
+
+
+def test_clean_corrupted_images_reuses_manifest(tmp_path, capsys):
+    """Une seconde exécution ne relit aucune image"""
+    data_path = make_dataset(tmp_path)
+
+    assert clean_corrupted_images(data_path, workers=1) == 1
+    assert not (data_path / "Dog" / "corrompue.jpg").exists()
+    assert len(ValidationManifest(data_path).entries) == 5
+
+    capsys.readouterr()
+    assert clean_corrupted_images(data_path, workers=1) == 0
+    assert "Manifeste: 4/4 images déjà vérifiées" in capsys.readouterr().out
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
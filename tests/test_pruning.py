@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tests du calendrier et du callback d'élagage par magnitude (hors ligne)"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.pruning import MagnitudePruning, kernel_sparsity, polynomial_sparsity
+
+
+def test_polynomial_sparsity_schedule():
+    """Parcimonie nulle avant le début, cible atteinte à end_step, croissante entre les deux"""
+    assert polynomial_sparsity(0, 0.8, begin_step=0, end_step=100) == 0.0
+    assert polynomial_sparsity(100, 0.8, begin_step=0, end_step=100) == 0.8
+    assert polynomial_sparsity(150, 0.8, begin_step=0, end_step=100) == 0.8
+
+    values = [polynomial_sparsity(step, 0.8, begin_step=0, end_step=100) for step in range(0, 101, 10)]
+    assert values == sorted(values)
+    # Ordre 3: l'essentiel de l'élagage a lieu au début
+    assert polynomial_sparsity(50, 0.8, begin_step=0, end_step=100) == pytest.approx(0.7)
+
+
+def make_model():
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(8, 8, 3)),
+        tf.keras.layers.Conv2D(8, 3, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(1, activation="sigmoid"),
+    ])
+    model.compile(optimizer="adam", loss="binary_crossentropy")
+    return model
+
+
+def test_magnitude_pruning_reaches_target():
+    """Après fit(), les noyaux ont la parcimonie cible, même si l'optimiseur a modifié les poids"""
+    model = make_model()
+    rng = np.random.default_rng(0)
+    images = rng.random((32, 8, 8, 3)).astype(np.float32)
+    labels = rng.integers(0, 2, (32, 1)).astype(np.float32)
+
+    pruning = MagnitudePruning(0.75, end_step=4, frequency=2)
+    model.fit(images, labels, batch_size=4, epochs=2, callbacks=[pruning], verbose=0)
+
+    assert kernel_sparsity(model) == pytest.approx(0.75, abs=0.02)
+    # Les biais ne sont pas élagués
+    assert np.count_nonzero(model.layers[0].bias.numpy() == 0) < model.layers[0].bias.shape[0]
+
+
+def test_kernel_sparsity_of_dense_model():
+    assert kernel_sparsity(make_model()) == 0.0
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Tests du registre des modèles: enregistrement, mise en production, retour arrière (hors ligne)"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(root=tmp_path / "registry")
+
+
+@pytest.fixture
+def served(tmp_path):
+    return tmp_path / "models" / "cats_dogs_model.keras"
+
+
+def make_model(tmp_path, name: str) -> Path:
+    """Fichier de modèle factice: le registre ne lit que ses octets"""
+    path = tmp_path / f"{name}.keras"
+    path.write_bytes(f"modele {name}".encode("utf-8"))
+    return path
+
+
+def deploy_models(registry, tmp_path, served, names):
+    hashes = []
+    for name in names:
+        sha256 = registry.register(make_model(tmp_path, name), kind="trained")
+        registry.promote(sha256, served)
+        hashes.append(sha256)
+    return hashes
+
+
+def test_register_is_content_addressed(registry, tmp_path):
+    """Un même contenu n'est stocké et enregistré qu'une fois"""
+    first = registry.register(make_model(tmp_path, "a"), kind="trained")
+    second = registry.register(make_model(tmp_path, "a"), kind="retrained")
+
+    assert first == second
+    assert registry.blob_path(first).read_bytes() == b"modele a"
+    assert len(registry.models) == 1
+    assert registry.get(first)["kind"] == "trained"
+
+
+def test_promote_points_served_path_to_blob(registry, tmp_path, served):
+    a, b = deploy_models(registry, tmp_path, served, ["a", "b"])
+
+    assert registry.current() == b
+    assert served.read_bytes() == b"modele b"
+
+
+def test_index_is_reloaded(registry, tmp_path, served):
+    a, b = deploy_models(registry, tmp_path, served, ["a", "b"])
+    reopened = ModelRegistry(root=registry.root)
+
+    assert set(reopened.models) == {a, b}
+    assert reopened.current() == b
+    assert reopened.rollback_target() == a
+
+
+def test_two_rollbacks_in_a_row_walk_back(registry, tmp_path, served):
+    """Le second retour arrière ne redéploie pas le modèle qui vient d'être écarté"""
+    a, b, c = deploy_models(registry, tmp_path, served, ["a", "b", "c"])
+
+    assert registry.rollback_target() == b
+    registry.promote(b, served, event="rollback")
+    assert registry.current() == b
+
+    assert registry.rollback_target() == a
+    registry.promote(a, served, event="rollback")
+    assert registry.current() == a
+    assert served.read_bytes() == b"modele a"
+
+    assert registry.rollback_target() is None
+
+
+def test_rollback_skips_removed_blobs(registry, tmp_path, served):
+    a, b, c = deploy_models(registry, tmp_path, served, ["a", "b", "c"])
+    registry.blob_path(b).unlink()
+
+    assert registry.rollback_target() == a
+
+
+def test_redeploy_after_rollback(registry, tmp_path, served):
+    """Un modèle redéployé après un retour arrière redevient une cible possible"""
+    a, b = deploy_models(registry, tmp_path, served, ["a", "b"])
+    registry.promote(a, served, event="rollback")
+    registry.promote(b, served)
+
+    assert registry.rollback_target() == a
+
+
+def test_prune_keeps_production_and_rollback_target(registry, tmp_path, served):
+    hashes = deploy_models(registry, tmp_path, served, ["a", "b", "c", "d"])
+    removed = registry.prune(keep_last=1)
+
+    assert removed == hashes[:2]
+    assert registry.blob_path(hashes[2]).exists()
+    assert registry.blob_path(hashes[3]).exists()
+    assert registry.latest()["sha256"] == hashes[3]
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
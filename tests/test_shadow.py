@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Tests de l'évaluation en ombre d'un modèle candidat (hors ligne)"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.monitoring.shadow import ShadowEvaluator
+
+
+class FixedPredictor:
+    """Candidat minimal: score constant, sans modèle à charger"""
+
+    def __init__(self, score: float):
+        self.score = score
+        self.model_path = Path("candidat.keras")
+
+    def predict(self, image_data: bytes):
+        return {"raw_score": self.score}
+
+
+@pytest.fixture
+def evaluator(tmp_path):
+    evaluator = ShadowEvaluator(FixedPredictor(0.9), sample_rate=1.0, log_path=tmp_path / "shadow.csv")
+    yield evaluator
+    evaluator.executor.shutdown(wait=True)
+
+
+def test_only_production_served_requests_are_compared(evaluator):
+    """Une requête servie par le canari n'est pas comparée au candidat"""
+    assert not evaluator.submit(b"image", 0.2, 5.0, served_version="canari", production_version="prod")
+    assert evaluator.submit(b"image", 0.8, 5.0, served_version="prod", production_version="prod")
+    evaluator.executor.shutdown(wait=True)
+
+    summary = evaluator.summary()
+    assert summary["samples"] == 1
+    assert summary["agreement_rate"] == 1.0
+    assert summary["mean_abs_score_diff"] == pytest.approx(0.1)
+
+
+def test_disagreement_is_recorded(evaluator):
+    evaluator.submit(b"image", 0.2, 5.0, served_version="prod", production_version="prod")
+    evaluator.executor.shutdown(wait=True)
+
+    assert evaluator.summary()["agreement_rate"] == 0.0
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
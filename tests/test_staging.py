@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests de la préparation incrémentale des images brutes (hors ligne)"""
+
+import pytest
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.data.manifest import ValidationManifest
+from src.data.preprocessing import _stage_file, clean_corrupted_images, sync_data_directory
+
+
+def make_source(root: Path) -> Path:
+    """Une image valide par classe et une image corrompue"""
+    source_path = root / "raw" / "PetImages"
+    for folder_name in ("Cat", "Dog"):
+        (source_path / folder_name).mkdir(parents=True)
+        Image.new("RGB", (8, 8)).save(source_path / folder_name / "0.jpg")
+    (source_path / "Dog" / "corrompue.jpg").write_bytes(b"pas une image")
+    return source_path
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "symlink", "copy"])
+def test_stage_file_accepts_concurrently_staged_target(tmp_path, mode):
+    """Un fichier déjà placé par un autre processus n'est pas une erreur"""
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"image")
+    dst = tmp_path / "dst.jpg"
+    _stage_file(src, dst, mode)
+
+    _stage_file(src, dst, mode)
+
+    assert dst.read_bytes() == b"image"
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_stage_file_replaces_outdated_target(tmp_path):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"nouvelle image")
+    dst = tmp_path / "dst.jpg"
+    dst.write_bytes(b"ancienne")
+
+    assert _stage_file(src, dst, "hardlink") == "copy"
+    assert dst.read_bytes() == b"nouvelle image"
+
+
+def test_invalid_images_are_not_staged_again(tmp_path):
+    """Une image supprimée par le nettoyage n'est plus replacée à chaque préparation"""
+    source_path = make_source(tmp_path)
+    target_path = tmp_path / "staged" / "PetImages"
+
+    stats = sync_data_directory(source_path, target_path, "hardlink", ValidationManifest(target_path))
+    assert stats["staged"] == 3
+    assert clean_corrupted_images(target_path, workers=1) == 1
+
+    stats = sync_data_directory(source_path, target_path, "hardlink", ValidationManifest(target_path))
+    assert (stats["staged"], stats["unchanged"], stats["invalid"]) == (0, 2, 1)
+    assert not (target_path / "Dog" / "corrompue.jpg").exists()
+
+    # Image corrigée dans la source: de nouveau placée
+    Image.new("RGB", (8, 8)).save(source_path / "Dog" / "corrompue.jpg")
+    stats = sync_data_directory(source_path, target_path, "hardlink", ValidationManifest(target_path))
+    assert stats["staged"] == 1
+    assert (target_path / "Dog" / "corrompue.jpg").exists()
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
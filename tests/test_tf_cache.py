@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Tests du nettoyage du cache tf.data sur disque (hors ligne)"""
+
+import os
+import pytest
+import sys
+from pathlib import Path
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.trainer import prune_tf_caches
+
+
+def make_caches(root: Path, names):
+    """Répertoires de cache, du plus ancien au plus récent"""
+    caches = []
+    for age, name in enumerate(reversed(names)):
+        cache_dir = root / name
+        cache_dir.mkdir(parents=True)
+        (cache_dir / "train.index").write_bytes(b"")
+        mtime = 1_000_000 - age * 100
+        os.utime(cache_dir, (mtime, mtime))
+        caches.append(cache_dir)
+    return list(reversed(caches))
+
+
+def test_keeps_most_recent_keys(tmp_path):
+    """Les clés récemment utilisées par une autre exécution sont conservées"""
+    oldest, old, recent, current = make_caches(tmp_path, ["a", "b", "c", "d"])
+
+    prune_tf_caches(current, root=tmp_path, keep_last=3)
+
+    assert sorted(d.name for d in tmp_path.iterdir()) == ["b", "c", "d"]
+
+
+def test_keeps_cache_being_written(tmp_path):
+    """Un cache en cours d'écriture (verrou présent) n'est jamais supprimé"""
+    writing, current = make_caches(tmp_path, ["a", "b"])
+    (writing / "train_0.lockfile").write_bytes(b"")
+
+    prune_tf_caches(current, root=tmp_path, keep_last=1)
+
+    assert writing.exists()
+
+
+# Permet l'exécution directe du fichier
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])